@@ -494,7 +494,8 @@ bool ExecuteStepRecursive(ExecutionStepWrapper& stepWrapper) {
 bool RunPlanOnWorkspace(
     Workspace* ws,
     const PlanDef& plan,
-    ShouldContinue shouldContinue) {
+    ShouldContinue shouldContinue,
+    bool reuse_existing_nets) {
   LOG(INFO) << "Started executing plan.";
   if (plan.execution_step_size() == 0) {
     LOG(WARNING) << "Nothing to run - did you define a correct plan?";
@@ -511,8 +512,10 @@ bool RunPlanOnWorkspace(
         net_def.name(),
         "\", which should not happen. Check your plan to see "
         "if you made a programming error in creating the plan.");
-    auto netAlreadyExists = ws->GetNet(net_def.name()) != nullptr;
-    net_defs[net_def.name()] = NetDefInfo{&net_def, netAlreadyExists};
+    // Existing nets are re-created from the plan unless asked to reuse them.
+    auto needsOverride =
+        !reuse_existing_nets && ws->GetNet(net_def.name()) != nullptr;
+    net_defs[net_def.name()] = NetDefInfo{&net_def, needsOverride};
   }
   WorkspaceIdInjector ws_id_injector;
   Timer plan_timer;
@@ -28,7 +28,11 @@ class PlanDef;
 
 typedef std::function<bool(int)> ShouldContinue;
 
-bool RunPlanOnWorkspace(Workspace* ws, const PlanDef& plan, ShouldContinue);
+bool RunPlanOnWorkspace(
+    Workspace* ws,
+    const PlanDef& plan,
+    ShouldContinue,
+    bool reuse_existing_nets = false);
 
 #ifndef CAFFE2_MOBILE
 struct PlanExecutionTime {
@@ -316,8 +316,11 @@ bool Workspace::RunNetOnce(const NetDef& net_def) {
   return true;
 }
 
-bool Workspace::RunPlan(const PlanDef& plan, ShouldContinue shouldContinue) {
-  return RunPlanOnWorkspace(this, plan, shouldContinue);
+bool Workspace::RunPlan(
+    const PlanDef& plan,
+    ShouldContinue shouldContinue,
+    bool reuse_existing_nets) {
+  return RunPlanOnWorkspace(this, plan, shouldContinue, reuse_existing_nets);
 }
 
 ThreadPool* Workspace::GetThreadPool() {
@@ -281,9 +281,15 @@ class Workspace {
 
   /**
    * Runs a plan that has multiple nets and execution steps.
+   *
+   * If reuse_existing_nets is true, nets of the plan which already exist in
+   * the workspace are run as they are instead of being re-created from the
+   * plan, which saves instantiating them again when running a plan multiple
+   * times.
    */
   bool RunPlan(const PlanDef& plan_def,
-               ShouldContinue should_continue = StopOnSignal{});
+               ShouldContinue should_continue = StopOnSignal{},
+               bool reuse_existing_nets = false);
 
   /*
    * Returns a CPU threadpool instace for parallel execution of
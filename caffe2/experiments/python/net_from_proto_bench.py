@@ -0,0 +1,109 @@
+# Copyright (c) 2016-present, Facebook, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+
+## @package net_from_proto_bench
+# Module caffe2.experiments.python.net_from_proto_bench
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import logging
+import time
+
+from caffe2.proto import caffe2_pb2
+from caffe2.python import core, workspace
+
+'''
+Benchmark that wraps large synthetic NetDefs into core.Net objects and
+clones them, and measures the time per operator. The time per operator
+should stay flat as the number of operators grows.
+'''
+
+
+logging.basicConfig()
+log = logging.getLogger("net_from_proto_bench")
+log.setLevel(logging.DEBUG)
+
+
+def CreateNetDef(num_ops, fan_in):
+    '''
+    Creates a chain-like NetDef where every op reads the outputs of up to
+    fan_in previous ops, plus a few autogenerated-looking blob names.
+    '''
+    proto = caffe2_pb2.NetDef()
+    proto.name = "net_from_proto_bench_{}".format(num_ops)
+    proto.external_input.extend(["data"])
+    prev_outputs = ["data"]
+    for i in range(num_ops):
+        op = proto.op.add()
+        op.type = "Sum"
+        op.input.extend(prev_outputs[-fan_in:])
+        output = "{}_blob_{}".format(proto.name, i) if i % 10 == 0 \
+            else "out_{}".format(i)
+        op.output.extend([output])
+        prev_outputs.append(output)
+    proto.external_output.extend([prev_outputs[-1]])
+    return proto
+
+
+def Benchmark(num_ops, fan_in, num_iter):
+    proto = CreateNetDef(num_ops, fan_in)
+
+    start_time = time.time()
+    for _ in range(num_iter):
+        net = core.Net(proto)
+        net.NextName()
+        net.BlobIsDefined("data")
+    wrap_time = (time.time() - start_time) / num_iter
+
+    start_time = time.time()
+    for _ in range(num_iter):
+        clone = net.Clone("clone")
+        clone.BlobIsDefined("data")
+    clone_time = (time.time() - start_time) / num_iter
+
+    log.info(
+        "{} ops: wrap {:.4f} secs ({:.2f} us/op), "
+        "clone {:.4f} secs ({:.2f} us/op)".format(
+            num_ops,
+            wrap_time, 1e6 * wrap_time / num_ops,
+            clone_time, 1e6 * clone_time / num_ops,
+        )
+    )
+    return wrap_time, clone_time
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Caffe2: Benchmark for wrapping NetDefs into core.Net"
+    )
+    parser.add_argument("--num_ops", type=int, nargs="+",
+                        default=[1000, 10000, 50000],
+                        help="Numbers of operators to benchmark.")
+    parser.add_argument("--fan_in", type=int, default=4,
+                        help="Number of inputs per operator.")
+    parser.add_argument("--num_iter", type=int, default=3,
+                        help="Number of iterations per size.")
+    args = parser.parse_args()
+
+    for num_ops in args.num_ops:
+        Benchmark(num_ops, args.fan_in, args.num_iter)
+
+
+if __name__ == '__main__':
+    workspace.GlobalInit(['caffe2', '--caffe2_log_level=2'])
+    main()
@@ -30,6 +30,9 @@ REGISTER_CPU_OPERATOR(
 REGISTER_CPU_OPERATOR(
     GivenTensorStringFill,
     GivenTensorFillOp<std::string, CPUContext>);
+REGISTER_CPU_OPERATOR(
+    GivenTensorByteStringFill,
+    GivenTensorByteStringFillOp<CPUContext>);
 
 NO_GRADIENT(GivenTensorFill);
 NO_GRADIENT(GivenTensorDoubleFill);
@@ -37,6 +40,35 @@ NO_GRADIENT(GivenTensorBoolFill);
 NO_GRADIENT(GivenTensorIntFill);
 NO_GRADIENT(GivenTensorInt64Fill);
 NO_GRADIENT(GivenTensorStringFill);
+NO_GRADIENT(GivenTensorByteStringFill);
+
+namespace {
+
+// The type of the filled tensor comes from the "dtype" argument, which may be
+// given either as a TensorProto.DataType value or by name.
+std::vector<TensorShape> GivenTensorByteStringFillInference(
+    const OperatorDef& def,
+    const vector<TensorShape>& in) {
+  vector<TensorShape> out(1);
+  ArgumentHelper helper(def);
+  out[0].set_data_type(cast::GetCastDataType(helper, "dtype"));
+  if (in.size()) {
+    if (helper.GetSingleArgument<bool>("input_as_shape", false)) {
+      out[0].set_unknown_shape(true);
+      return out;
+    }
+    for (int d : in[0].dims()) {
+      out[0].add_dims(d);
+    }
+  } else {
+    for (int d : helper.GetRepeatedArgument<int>("shape")) {
+      out[0].add_dims(d);
+    }
+  }
+  return out;
+}
+
+} // namespace
 
 OPERATOR_SCHEMA(GivenTensorFill)
     .NumInputs(0, 1)
@@ -70,5 +102,19 @@ OPERATOR_SCHEMA(GivenTensorStringFill)
     .AllowInplace({{0, 0}})
     .TensorInferenceFunction(
         FillerTensorInference<TensorProto_DataType_STRING>);
+OPERATOR_SCHEMA(GivenTensorByteStringFill)
+    .NumInputs(0, 1)
+    .NumOutputs(1)
+    .AllowInplace({{0, 0}})
+    .TensorInferenceFunction(GivenTensorByteStringFillInference)
+    .SetDoc(R"DOC(
+Fills the output with the given values, passed as the raw little endian bytes
+of the elements in the single string argument "values". This is much more
+compact than the repeated "values" argument of GivenTensorFill, and can be
+parsed without per element work.
+)DOC")
+    .Arg("values", "Raw bytes of the values, in row major order.")
+    .Arg("dtype", "Data type of the values (TensorProto.DataType).")
+    .Arg("shape", "Shape of the output tensor.");
 
 } // namespace caffe2
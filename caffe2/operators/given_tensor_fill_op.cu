@@ -30,4 +30,7 @@ REGISTER_CUDA_OPERATOR(
 REGISTER_CUDA_OPERATOR(
     GivenTensorBoolFill,
     GivenTensorFillOp<bool, CUDAContext>);
+REGISTER_CUDA_OPERATOR(
+    GivenTensorByteStringFill,
+    GivenTensorByteStringFillOp<CUDAContext>);
 }
@@ -19,6 +19,7 @@
 #include "caffe2/core/context.h"
 #include "caffe2/core/logging.h"
 #include "caffe2/core/operator.h"
+#include "caffe2/core/types.h"
 #include "caffe2/operators/filler_op.h"
 #include "caffe2/utils/cast.h"
 #include "caffe2/utils/math.h"
@@ -101,4 +102,59 @@ class GivenTensorFillOp final : public FillerOp<Context> {
   bool (GivenTensorFillOp::*body_)(Tensor<Context>* output);
   TensorCPU values_;
 };
+
+// Fills the output with the raw little endian bytes of its elements given in
+// the single string argument "values", so that large tensors don't need to be
+// stored and parsed as repeated arguments.
+template <class Context>
+class GivenTensorByteStringFillOp final : public FillerOp<Context> {
+ public:
+  USE_OPERATOR_CONTEXT_FUNCTIONS;
+  GivenTensorByteStringFillOp(const OperatorDef& operator_def, Workspace* ws)
+      : FillerOp<Context>(operator_def, ws) {
+    const int kValue = 1;
+    CAFFE_ENFORCE_EQ(
+        reinterpret_cast<const char*>(&kValue)[0],
+        1,
+        "GivenTensorByteStringFill on big endian platform "
+        "is not written yet.");
+    const ArgumentHelper helper(operator_def);
+    const auto dtype = cast::GetCastDataType(helper, "dtype");
+    CAFFE_ENFORCE(
+        dtype != TensorProto_DataType_STRING &&
+            dtype != TensorProto_DataType_UNDEFINED,
+        "GivenTensorByteStringFill only supports fundamental types.");
+    meta_ = DataTypeToTypeMeta(dtype);
+    const auto& bytes =
+        OperatorBase::template GetSingleArgument<string>("values", "");
+    CAFFE_ENFORCE_EQ(
+        bytes.size() % meta_.itemsize(),
+        0,
+        "Size of values is not a multiple of the dtype size.");
+    values_.Resize(bytes.size() / meta_.itemsize());
+    if (bytes.size()) {
+      memcpy(values_.raw_mutable_data(meta_), bytes.data(), bytes.size());
+    }
+  }
+
+  bool Fill(Tensor<Context>* output) override {
+    CAFFE_ENFORCE_EQ(
+        output->size(),
+        values_.size(),
+        "output size: ",
+        output->size(),
+        " given size: ",
+        values_.size());
+    auto* data = output->raw_mutable_data(meta_);
+    if (output->size()) {
+      context_.template CopyBytes<CPUContext, Context>(
+          output->nbytes(), values_.raw_data(), data);
+    }
+    return true;
+  }
+
+ private:
+  TypeMeta meta_;
+  TensorCPU values_;
+};
 } // namespace caffe2
@@ -0,0 +1,239 @@
+/**
+ * Copyright (c) 2016-present, Facebook, Inc.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#ifndef _WIN32
+
+#include <errno.h>
+#include <fcntl.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include <memory>
+#include <mutex>
+#include <unordered_map>
+
+#include "caffe2/core/operator.h"
+#include "caffe2/core/types.h"
+#include "caffe2/proto/caffe2.pb.h"
+
+namespace caffe2 {
+
+namespace {
+
+// Layout of a mapped parameter file, all integers are little endian uint64:
+//   [magic "C2MAPPED"][index size][data offset][TensorProtos index]...[data]
+// Every TensorProto of the index has name, dims and data_type set, and its
+// segment gives the byte range of its data relative to the data offset.
+constexpr char kMappedParamsMagic[] = "C2MAPPED";
+constexpr size_t kMappedParamsHeaderSize = 24;
+
+class MappedParamFile {
+ public:
+  MappedParamFile(const string& filename, size_t size)
+      : size_(size), mapping_(nullptr, Unmapper{size}) {
+    int fd = open(filename.c_str(), O_RDONLY);
+    CAFFE_ENFORCE(fd >= 0, "Cannot open ", filename, ": ", strerror(errno));
+    // Read-only shared mapping so that all the processes mapping the file
+    // share the same page cache pages.
+    void* addr = mmap(nullptr, size_, PROT_READ, MAP_SHARED, fd, 0);
+    close(fd);
+    CAFFE_ENFORCE(
+        addr != MAP_FAILED, "Cannot mmap ", filename, ": ", strerror(errno));
+    // Owned from here on, so that a corrupted file that fails one of the
+    // checks below is unmapped too.
+    mapping_.reset(static_cast<char*>(addr));
+    const char* data = mapping_.get();
+
+    CAFFE_ENFORCE_GE(size_, kMappedParamsHeaderSize, "Truncated ", filename);
+    CAFFE_ENFORCE(
+        memcmp(data, kMappedParamsMagic, 8) == 0,
+        filename,
+        " is not a mapped parameter file.");
+    uint64_t index_size, data_offset;
+    memcpy(&index_size, data + 8, sizeof(uint64_t));
+    memcpy(&data_offset, data + 16, sizeof(uint64_t));
+    CAFFE_ENFORCE_LE(
+        kMappedParamsHeaderSize + index_size, data_offset, "Corrupted index");
+    CAFFE_ENFORCE_LE(data_offset, size_, "Truncated ", filename);
+    CAFFE_ENFORCE(
+        index_.ParseFromArray(data + kMappedParamsHeaderSize, index_size),
+        "Cannot parse the index of ", filename);
+    for (int i = 0; i < index_.protos_size(); ++i) {
+      const auto& proto = index_.protos(i);
+      CAFFE_ENFORCE_LE(
+          proto.segment().begin(), proto.segment().end(), proto.name());
+      CAFFE_ENFORCE_LE(
+          data_offset + proto.segment().end(),
+          size_,
+          "Truncated data of ",
+          proto.name());
+      CAFFE_ENFORCE(
+          protos_.emplace(proto.name(), &proto).second,
+          "Duplicated blob ",
+          proto.name());
+    }
+    tensor_data_ = data + data_offset;
+  }
+
+  const TensorProto* Find(const string& name) const {
+    auto it = protos_.find(name);
+    return it == protos_.end() ? nullptr : it->second;
+  }
+
+  const char* tensor_data() const {
+    return tensor_data_;
+  }
+
+ private:
+  struct Unmapper {
+    size_t size;
+    void operator()(char* data) const {
+      munmap(data, size);
+    }
+  };
+
+  size_t size_;
+  std::unique_ptr<char, Unmapper> mapping_;
+  const char* tensor_data_;
+  TensorProtos index_;
+  std::unordered_map<string, const TensorProto*> protos_;
+
+  DISABLE_COPY_AND_ASSIGN(MappedParamFile);
+};
+
+// Returns the mapping of 'filename', shared by all the operators of the
+// process that use the same version of the file.
+std::shared_ptr<MappedParamFile> GetMappedParamFile(const string& filename) {
+  static std::mutex mutex;
+  static std::unordered_map<string, std::weak_ptr<MappedParamFile>> files;
+
+  struct stat st;
+  CAFFE_ENFORCE(
+      stat(filename.c_str(), &st) == 0,
+      "Cannot stat ",
+      filename,
+      ": ",
+      strerror(errno));
+#ifdef __APPLE__
+  const auto mtime_nsec = st.st_mtimespec.tv_nsec;
+#else
+  const auto mtime_nsec = st.st_mtim.tv_nsec;
+#endif
+  // A new file written at the same path must not reuse the old mapping.
+  const string key = filename + ":" + caffe2::to_string(st.st_dev) + ":" +
+      caffe2::to_string(st.st_ino) + ":" + caffe2::to_string(st.st_size) +
+      ":" + caffe2::to_string(st.st_mtime) + "." +
+      caffe2::to_string(mtime_nsec);
+
+  std::lock_guard<std::mutex> guard(mutex);
+  auto it = files.find(key);
+  if (it != files.end()) {
+    auto file = it->second.lock();
+    if (file) {
+      return file;
+    }
+  }
+  auto file = std::make_shared<MappedParamFile>(filename, st.st_size);
+  // Forget the mappings released since, e.g. of the previous versions of
+  // rewritten files.
+  for (it = files.begin(); it != files.end();) {
+    if (it->second.expired()) {
+      it = files.erase(it);
+    } else {
+      ++it;
+    }
+  }
+  files[key] = file;
+  return file;
+}
+
+class LoadMappedOp final : public Operator<CPUContext> {
+ public:
+  LoadMappedOp(const OperatorDef& operator_def, Workspace* ws)
+      : Operator<CPUContext>(operator_def, ws),
+        ws_(ws),
+        absolute_path_(
+            OperatorBase::GetSingleArgument<int>("absolute_path", false)),
+        db_name_(OperatorBase::GetSingleArgument<string>("db", "")) {
+    CAFFE_ENFORCE_GT(db_name_.size(), 0, "Must specify a db name.");
+  }
+
+  bool RunOnDevice() override {
+    const string filename =
+        absolute_path_ ? db_name_ : (ws_->RootFolder() + "/" + db_name_);
+    auto file = GetMappedParamFile(filename);
+    for (int i = 0; i < OutputSize(); ++i) {
+      const string& name = def().output(i);
+      const TensorProto* proto = file->Find(name);
+      CAFFE_ENFORCE(proto, "Blob ", name, " not found in ", filename);
+      const TypeMeta& meta = DataTypeToTypeMeta(proto->data_type());
+      CAFFE_ENFORCE(
+          meta.id() && !meta.ctor(),
+          "Unsupported data type for mapped blob ",
+          name);
+      auto* output = Output(i);
+      output->Resize(
+          vector<TIndex>(proto->dims().begin(), proto->dims().end()));
+      CAFFE_ENFORCE_EQ(
+          proto->segment().end() - proto->segment().begin(),
+          output->size() * meta.itemsize(),
+          "Size mismatch for mapped blob ",
+          name);
+      // The tensor keeps the mapping alive.
+      output->ShareExternalPointer(
+          const_cast<char*>(file->tensor_data() + proto->segment().begin()),
+          meta,
+          0,
+          [file](void*) {});
+    }
+    return true;
+  }
+
+ private:
+  Workspace* ws_;
+  bool absolute_path_;
+  string db_name_;
+};
+
+} // namespace
+
+REGISTER_CPU_OPERATOR(LoadMapped, LoadMappedOp);
+
+OPERATOR_SCHEMA(LoadMapped)
+    .NumInputs(0)
+    .NumOutputs(0, INT_MAX)
+    .SetDoc(R"DOC(
+Loads the output blobs from a mapped parameter file, as written by
+caffe2.python.predictor.mapped_params.save_mapped_params(). Instead of copying
+the data, the blobs point into a read-only, shared memory mapping of the file.
+All the workspaces and processes loading the same file share one copy of the
+data in the page cache, and only the pages that are used are read from disk.
+
+The loaded blobs are read-only: operators must not modify them in place.
+)DOC")
+    .Arg("db", "Path of the mapped parameter file.")
+    .Arg(
+        "absolute_path",
+        "(int, default 0) if set, use the db path directly and do not "
+        "prepend the current root folder of the workspace.");
+
+NO_GRADIENT(LoadMapped);
+
+} // namespace caffe2
+
+#endif // _WIN32
@@ -14,6 +14,10 @@
  * limitations under the License.
  */
 
+#include <cerrno>
+#include <cstring>
+#include <limits>
+
 #include "caffe2/core/context.h"
 #include "caffe2/core/operator.h"
 #include "caffe2/core/tensor.h"
@@ -27,10 +31,10 @@ struct TextFileReaderInstance {
   TextFileReaderInstance(
       const std::vector<char>& delims,
       char escape,
-      const std::string& filename,
+      const std::vector<std::string>& filenames,
       int numPasses,
       const std::vector<int>& types)
-      : fileReader(filename),
+      : fileReader(filenames),
         tokenizer(Tokenizer(delims, escape), &fileReader, numPasses),
         fieldTypes(types) {
     for (const auto dt : fieldTypes) {
@@ -56,25 +60,77 @@ class CreateTextFileReaderOp : public Operator<CPUContext> {
  public:
   CreateTextFileReaderOp(const OperatorDef& operator_def, Workspace* ws)
       : Operator<CPUContext>(operator_def, ws),
-        filename_(GetSingleArgument<string>("filename", "")),
+        filenames_(GetRepeatedArgument<string>("filenames")),
         numPasses_(GetSingleArgument<int>("num_passes", 1)),
+        numShards_(GetSingleArgument<int>("num_shards", 1)),
         fieldTypes_(GetRepeatedArgument<int>("field_types")) {
+    if (HasArgument("filename")) {
+      CAFFE_ENFORCE(
+          filenames_.empty(), "Only one of filename and filenames can be set");
+      filenames_.push_back(GetSingleArgument<string>("filename", ""));
+    }
     CAFFE_ENFORCE(fieldTypes_.size() > 0, "field_types arg must be non-empty");
+    CAFFE_ENFORCE(numShards_ > 0, "num_shards must be positive");
   }
 
   bool RunOnDevice() override {
+    int64_t shardId = 0;
+    if (InputSize() > 0) {
+      const auto& shard = Input(0);
+      CAFFE_ENFORCE_EQ(shard.size(), 1, "shard_id must be a scalar");
+      shardId = shard.IsType<int>() ? shard.data<int>()[0]
+                                    : shard.data<int64_t>()[0];
+    }
+    // The files of a shard are the ones whose index is the shard id modulo
+    // the number of shards.
+    std::vector<std::string> filenames;
+    for (int i = 0; i < filenames_.size(); ++i) {
+      if (i % numShards_ == shardId) {
+        filenames.push_back(filenames_[i]);
+      }
+    }
     *OperatorBase::Output<std::unique_ptr<TextFileReaderInstance>>(0) =
         std::unique_ptr<TextFileReaderInstance>(new TextFileReaderInstance(
-            {'\n', '\t'}, '\0', filename_, numPasses_, fieldTypes_));
+            {'\n', '\t'}, '\0', filenames, numPasses_, fieldTypes_));
     return true;
   }
 
  private:
-  std::string filename_;
+  std::vector<std::string> filenames_;
   int numPasses_;
+  int numShards_;
   std::vector<int> fieldTypes_;
 };
 
+// strto* functions need a null-terminated string. Fields are usually short,
+// so they are copied on the stack rather than into a std::string.
+template <typename T, typename Parse>
+inline void parseNumber(
+    const char* src_start,
+    const char* src_end,
+    const char* type_name,
+    Parse parse,
+    void* dst) {
+  char buffer[64];
+  std::string str_copy;
+  const char* src_copy = buffer;
+  const size_t size = src_end - src_start;
+  if (size < sizeof(buffer)) {
+    std::memcpy(buffer, src_start, size);
+    buffer[size] = '\0';
+  } else {
+    str_copy.assign(src_start, src_end);
+    src_copy = str_copy.c_str();
+  }
+  char* src_copy_end;
+  bool valid = parse(src_copy, &src_copy_end, static_cast<T*>(dst));
+  if (!valid || src_copy == src_copy_end) {
+    throw std::runtime_error(
+        std::string("Invalid ") + type_name + ": " +
+        std::string(src_start, src_end));
+  }
+}
+
 inline void convert(
     TensorProto_DataType dst_type,
     const char* src_start,
@@ -85,15 +141,53 @@ inline void convert(
       static_cast<std::string*>(dst)->assign(src_start, src_end);
     } break;
     case TensorProto_DataType_FLOAT: {
-      // TODO(azzolini): avoid copy, use faster convertion
-      std::string str_copy(src_start, src_end);
-      const char* src_copy = str_copy.c_str();
-      char* src_copy_end;
-      float val = strtof(src_copy, &src_copy_end);
-      if (src_copy == src_copy_end) {
-        throw std::runtime_error("Invalid float: " + str_copy);
-      }
-      *static_cast<float*>(dst) = val;
+      parseNumber<float>(
+          src_start,
+          src_end,
+          "float",
+          [](const char* str, char** str_end, float* val) {
+            *val = strtof(str, str_end);
+            return true;
+          },
+          dst);
+    } break;
+    case TensorProto_DataType_DOUBLE: {
+      parseNumber<double>(
+          src_start,
+          src_end,
+          "double",
+          [](const char* str, char** str_end, double* val) {
+            *val = strtod(str, str_end);
+            return true;
+          },
+          dst);
+    } break;
+    case TensorProto_DataType_INT32: {
+      parseNumber<int32_t>(
+          src_start,
+          src_end,
+          "int32",
+          [](const char* str, char** str_end, int32_t* val) {
+            errno = 0;
+            auto parsed = strtoll(str, str_end, 10);
+            *val = parsed;
+            return errno != ERANGE &&
+                parsed >= std::numeric_limits<int32_t>::min() &&
+                parsed <= std::numeric_limits<int32_t>::max();
+          },
+          dst);
+    } break;
+    case TensorProto_DataType_INT64: {
+      parseNumber<int64_t>(
+          src_start,
+          src_end,
+          "int64",
+          [](const char* str, char** str_end, int64_t* val) {
+            errno = 0;
+            *val = strtoll(str, str_end, 10);
+            return errno != ERANGE;
+          },
+          dst);
     } break;
     default:
       throw std::runtime_error("Unsupported type.");
@@ -181,14 +275,26 @@ REGISTER_CPU_OPERATOR(CreateTextFileReader, CreateTextFileReaderOp);
 REGISTER_CPU_OPERATOR(TextFileReaderRead, TextFileReaderReadOp);
 
 OPERATOR_SCHEMA(CreateTextFileReader)
-    .NumInputs(0)
+    .NumInputs(0, 1)
     .NumOutputs(1)
-    .SetDoc("Create a text file reader. Fields are delimited by <TAB>.")
+    .SetDoc(R"DOC(
+Create a text file reader. Fields are delimited by <TAB>. Reads the files one
+after the other; files with a .gz extension are decompressed on the fly when
+Caffe2 is built with zlib. Numeric fields are parsed into tensors of the given
+type; supported types are STRING, FLOAT, DOUBLE, INT32 and INT64.
+
+The files can be split into `num_shards` shards, the i-th file belonging to
+shard i % num_shards. The reader then only reads the files of the shard given
+by the optional `shard_id` input.
+)DOC")
     .Arg("filename", "Path to the file.")
-    .Arg("num_passes", "Number of passes over the file.")
+    .Arg("filenames", "List of paths of the files, instead of filename.")
+    .Arg("num_passes", "Number of passes over the files.")
+    .Arg("num_shards", "Number of shards the files are split into.")
     .Arg(
         "field_types",
         "List with type of each field. Type enum is found at core.DataType.")
+    .Input(0, "shard_id", "Optional scalar, the shard to read. Defaults to 0.")
     .Output(0, "handler", "Pointer to the created TextFileReaderInstance.");
 
 OPERATOR_SCHEMA(TextFileReaderRead)
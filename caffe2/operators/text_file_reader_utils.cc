@@ -21,6 +21,12 @@
 #include <cstring>
 #include <sstream>
 
+#include "caffe2/core/macros.h"
+
+#ifdef CAFFE2_USE_ZLIB
+#include <zlib.h>
+#endif
+
 namespace caffe2 {
 
 Tokenizer::Tokenizer(const std::vector<char>& delims, char escape)
@@ -94,42 +100,118 @@ void Tokenizer::next(char* start, char* end, TokenizedString& tokenized) {
   }
 }
 
-FileReader::FileReader(const std::string& path, size_t bufferSize)
-    : bufferSize_(bufferSize), buffer_(new char[bufferSize]) {
-  fd_ = open(path.c_str(), O_RDONLY, 0777);
-  if (fd_ < 0) {
-    throw std::runtime_error(
-        "Error opening file for reading: " + std::string(std::strerror(errno)) +
-        " Path=" + path);
+class FileSource {
+ public:
+  explicit FileSource(const std::string& path) : path_(path) {
+    if (path.size() > 3 && path.compare(path.size() - 3, 3, ".gz") == 0) {
+#ifdef CAFFE2_USE_ZLIB
+      gzFile_ = gzopen(path.c_str(), "rb");
+      if (gzFile_ == nullptr) {
+        throw std::runtime_error(
+            "Error opening file for reading: " +
+            std::string(std::strerror(errno)) + " Path=" + path);
+      }
+      return;
+#else
+      throw std::runtime_error(
+          "Reading gzip compressed files requires Caffe2 to be built with "
+          "zlib (USE_ZLIB). Path=" +
+          path);
+#endif
+    }
+    fd_ = open(path.c_str(), O_RDONLY, 0777);
+    if (fd_ < 0) {
+      throw std::runtime_error(
+          "Error opening file for reading: " +
+          std::string(std::strerror(errno)) + " Path=" + path);
+    }
   }
-}
 
-void FileReader::reset() {
-  if (lseek(fd_, 0, SEEK_SET) == -1) {
-    throw std::runtime_error(
-        "Error reseting file cursor: " + std::string(std::strerror(errno)));
+  ~FileSource() {
+#ifdef CAFFE2_USE_ZLIB
+    if (gzFile_ != nullptr) {
+      gzclose(gzFile_);
+    }
+#endif
+    if (fd_ >= 0) {
+      close(fd_);
+    }
+  }
+
+  // Returns the number of bytes read, 0 at end of file.
+  size_t read(char* buffer, size_t size) {
+#ifdef CAFFE2_USE_ZLIB
+    if (gzFile_ != nullptr) {
+      auto numRead = gzread(gzFile_, buffer, size);
+      if (numRead < 0) {
+        int errnum;
+        throw std::runtime_error(
+            "Error reading file: " + std::string(gzerror(gzFile_, &errnum)) +
+            " Path=" + path_);
+      }
+      return numRead;
+    }
+#endif
+    auto numRead = ::read(fd_, buffer, size);
+    if (numRead == -1) {
+      throw std::runtime_error(
+          "Error reading file: " + std::string(std::strerror(errno)) +
+          " Path=" + path_);
+    }
+    return numRead;
   }
+
+ private:
+  const std::string path_;
+  int fd_{-1};
+#ifdef CAFFE2_USE_ZLIB
+  gzFile gzFile_{nullptr};
+#endif
+};
+
+FileReader::FileReader(const std::string& path, size_t bufferSize)
+    : FileReader(std::vector<std::string>{path}, bufferSize) {}
+
+FileReader::FileReader(const std::vector<std::string>& paths, size_t bufferSize)
+    : paths_(paths), bufferSize_(bufferSize), buffer_(new char[bufferSize]) {
+  reset();
 }
 
-FileReader::~FileReader() {
-  if (fd_ >= 0) {
-    close(fd_);
+void FileReader::reset() {
+  file_.reset();
+  pathIndex_ = 0;
+  lastChar_ = '\n';
+  if (!paths_.empty()) {
+    file_.reset(new FileSource(paths_[0]));
   }
 }
 
+FileReader::~FileReader() {}
+
 void FileReader::operator()(CharRange& range) {
   char* buffer = buffer_.get();
-  auto numRead = read(fd_, buffer, bufferSize_);
-  if (numRead == -1) {
-    throw std::runtime_error(
-        "Error reading file: " + std::string(std::strerror(errno)));
-  }
-  if (numRead == 0) {
-    range.start = nullptr;
-    range.end = nullptr;
-    return;
+  while (file_) {
+    auto numRead = file_->read(buffer, bufferSize_);
+    if (numRead > 0) {
+      lastChar_ = buffer[numRead - 1];
+      range.start = buffer;
+      range.end = buffer + numRead;
+      return;
+    }
+    file_.reset();
+    if (++pathIndex_ < paths_.size()) {
+      file_.reset(new FileSource(paths_[pathIndex_]));
+    }
+    if (lastChar_ != '\n') {
+      // terminate the last row of the file we just finished
+      lastChar_ = '\n';
+      buffer[0] = '\n';
+      range.start = buffer;
+      range.end = buffer + 1;
+      return;
+    }
   }
-  range.start = buffer;
-  range.end = buffer + numRead;
+  range.start = nullptr;
+  range.end = nullptr;
 }
 }
@@ -120,16 +120,28 @@ class BufferedTokenizer {
   int pass_{0};
 };
 
+// A single open file, decompressed on the fly if its name ends with ".gz".
+class FileSource;
+
+// Reads a list of files one after the other, as if they were a single file.
+// A newline is inserted after a file that does not end with one, so that its
+// last row is not merged with the first row of the next file.
 class FileReader : public StringProvider {
  public:
   explicit FileReader(const std::string& path, size_t bufferSize = 65536);
+  explicit FileReader(
+      const std::vector<std::string>& paths,
+      size_t bufferSize = 65536);
   ~FileReader();
   void operator()(CharRange& range) override;
   void reset() override;
 
  private:
+  const std::vector<std::string> paths_;
   const size_t bufferSize_;
-  int fd_;
+  size_t pathIndex_{0};
+  char lastChar_{'\n'};
+  std::unique_ptr<FileSource> file_;
   std::unique_ptr<char[]> buffer_;
 };
 
@@ -20,13 +20,18 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import numpy as np
 import os
+import shutil
+import threading
 
-from caffe2.python import core
-from caffe2.python.dataio import Reader
+from caffe2.proto import caffe2_pb2
+from caffe2.python import core, schema, utils, workspace
+from caffe2.python.dataio import Reader, Writer
 from caffe2.python.dataset import Dataset
 from caffe2.python.pipeline import pipe
 from caffe2.python.task import Cluster, TaskGroup
+from six.moves import queue as Queue
 
 
 class CachedReader(Reader):
@@ -46,7 +51,8 @@ class CachedReader(Reader):
     ignore original reader (i.e. no additional data will be read from it).
     """
 
-    def __init__(self, reader, db_type='leveldb', name='cached_reader'):
+    def __init__(self, reader, db_type='leveldb', name='cached_reader',
+                 batch_size=100):
         super(CachedReader, self).__init__(reader.schema())
         self.original_reader = reader
         self.cache_path = None
@@ -54,13 +60,14 @@ class CachedReader(Reader):
         self.ds = Dataset(self._schema, name)
         self.db_type = db_type
         self.name = name
+        self.batch_size = batch_size
         self.field_names = self._schema.field_names()
 
     def setup_ex(self, init_net, finish_net):
         assert self.cache_path, 'build_cache must be called first'
         self._init_dataset(init_net)
         self._load_from_file(init_net)
-        self.ds_reader = self.ds.reader(init_net, batch_size=100)
+        self.ds_reader = self.ds.reader(init_net, batch_size=self.batch_size)
 
     def read(self, read_net):
         assert self.ds_reader, 'setup must be called first'
@@ -109,3 +116,249 @@ class CachedReader(Reader):
             absolute_path=True,
             source_blob_names=self.field_names,
         )
+
+
+def _slice_rows(field, arrays, begin, end, offsets, first=0):
+    """
+    Returns the arrays of the rows [begin, end) of `field`, given the arrays
+    of all the fields of the record in which `field` starts at `first`.
+    `offsets` caches the offsets of the values of the lists, by field id.
+    """
+    if isinstance(field, schema.Scalar):
+        return [arrays[first][begin:end]]
+    if isinstance(field, schema.List):
+        if first not in offsets:
+            offsets[first] = np.concatenate(
+                [[0], np.cumsum(arrays[first], dtype=np.int64)])
+        return [arrays[first][begin:end]] + _slice_rows(
+            field['values'], arrays,
+            offsets[first][begin], offsets[first][end], offsets, first + 1)
+    assert isinstance(field, schema.Struct), \
+        'Unsupported field type {}'.format(type(field))
+    sliced = []
+    for _, child in field.get_children():
+        sliced += _slice_rows(child, arrays, begin, end, offsets, first)
+        first += len(child.field_names())
+    return sliced
+
+
+def _num_rows(arrays):
+    # The first field blob of a record always has one entry per row.
+    return len(arrays[0])
+
+
+def _remove_path(path):
+    # leveldb and rocksdb dbs are directories, minidb is a single file.
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _chunk_key(chunk_id):
+    return 'chunk_{:010d}'.format(chunk_id).encode('ascii')
+
+
+class _ChunkWriter(Writer):
+    """
+    Writes the batches to the db in chunks of `chunk_size` rows, as soon as
+    they are produced. The db is written to a temporary path and renamed once
+    complete, so that a partially written cache is never read.
+    """
+
+    def __init__(self, cached_reader):
+        self._schema = cached_reader.schema()
+        self.cached_reader = cached_reader
+        self._lock = threading.Lock()
+
+    def _start(self, inputs, outputs):
+        reader = self.cached_reader
+        self._tmp_path = reader.cache_path + '.tmp'
+        # Left over by a build which did not finish
+        _remove_path(self._tmp_path)
+        self._db = workspace.C.create_db(
+            reader.db_type, self._tmp_path, workspace.C.Mode.new)
+        self._batches = []
+        self._num_rows = 0
+        self._num_chunks = 0
+
+    def _append(self, inputs, outputs):
+        batch = [i.fetch() for i in inputs]
+        with self._lock:
+            self._batches.append(batch)
+            self._num_rows += _num_rows(batch)
+            if self._num_rows >= self.cached_reader.chunk_size:
+                self._flush(final=False)
+
+    def _finish(self, inputs, outputs):
+        with self._lock:
+            self._flush(final=True)
+            self._db.close()
+            self._db = None
+            cache_path = self.cached_reader.cache_path
+            # A non empty directory can't be renamed over, so the old cache
+            # is moved aside first and removed once the new one is in place.
+            old_path = cache_path + '.old'
+            _remove_path(old_path)
+            if os.path.exists(cache_path):
+                os.rename(cache_path, old_path)
+            os.rename(self._tmp_path, cache_path)
+            _remove_path(old_path)
+
+    def _flush(self, final):
+        if not self._batches:
+            return
+        rows = [np.concatenate(field) for field in zip(*self._batches)]
+        chunk_size = self.cached_reader.chunk_size
+        num_rows = _num_rows(rows)
+        offsets = {}
+        begin = 0
+        while num_rows - begin >= chunk_size or (final and begin < num_rows):
+            end = min(begin + chunk_size, num_rows)
+            chunk = _slice_rows(self._schema, rows, begin, end, offsets)
+            protos = caffe2_pb2.TensorProtos()
+            protos.protos.extend([
+                utils.NumpyArrayToCaffe2Tensor(arr, name)
+                for arr, name in zip(chunk, self.cached_reader.field_names)])
+            transaction = self._db.new_transaction()
+            transaction.put(
+                _chunk_key(self._num_chunks), protos.SerializeToString())
+            transaction.commit()
+            self._num_chunks += 1
+            begin = end
+        self._batches = [
+            _slice_rows(self._schema, rows, begin, num_rows, offsets)]
+        self._num_rows = num_rows - begin
+
+    def setup_ex(self, init_net, finish_net):
+        init_net.Python(self._start)([], [])
+        finish_net.Python(self._finish)([], [])
+
+    def write(self, writer_net, fields):
+        writer_net.Python(self._append)(fields, [])
+
+
+class ChunkedCachedReader(CachedReader):
+    """
+    CachedReader with a cache stored in chunks, for datasets which do not fit
+    in memory.
+
+    build_cache writes the rows to the cache in chunks of `chunk_size` rows as
+    they are produced by the original reader. Reading loads the chunks in a
+    background thread, keeping at most `prefetch_chunks` chunks ahead of the
+    one being read, and returns batches of `batch_size` rows. Memory usage is
+    bounded by (prefetch_chunks + 2) * chunk_size rows regardless of the size
+    of the dataset.
+
+    Chunks are written and read by Python operators, so the nets must be run
+    in the process that created them.
+    """
+
+    def __init__(self, reader, db_type='leveldb', name='cached_reader',
+                 batch_size=100, chunk_size=100000, prefetch_chunks=2):
+        super(ChunkedCachedReader, self).__init__(
+            reader, db_type=db_type, name=name, batch_size=batch_size)
+        assert chunk_size > 0 and prefetch_chunks > 0
+        self.chunk_size = chunk_size
+        self.prefetch_chunks = prefetch_chunks
+        self._lock = threading.Lock()
+        self._loader = None
+
+    def build_cache(self, cache_path, overwrite=False):
+        if not self.has_cache() or overwrite:
+            self.cache_path = cache_path
+        if self.has_cache() and not overwrite:
+            # cache already exists, no need to rebuild it
+            return core.execution_step('build_step', [])
+
+        writer = _ChunkWriter(self)
+        with Cluster(), core.NameScope(self.name), TaskGroup() as copy_tg:
+            pipe(self.original_reader, writer, num_threads=16)
+            copy_step = copy_tg.to_task().get_step()
+
+        return core.execution_step('build_cache', [copy_step])
+
+    def _load_chunks(self, chunks, stop):
+        db = workspace.C.create_db(
+            self.db_type, self.cache_path, workspace.C.Mode.read)
+        cursor = db.new_cursor()
+        try:
+            while cursor.valid() and not stop.is_set():
+                protos = caffe2_pb2.TensorProtos()
+                protos.ParseFromString(cursor.value())
+                chunk = [
+                    utils.Caffe2TensorToNumpyArray(p) for p in protos.protos]
+                while not stop.is_set():
+                    try:
+                        chunks.put(chunk, timeout=0.1)
+                        break
+                    except Queue.Full:
+                        pass
+                cursor.next()  # noqa: B305
+        finally:
+            del cursor
+            db.close()
+            chunks.put(None)
+
+    def _start(self, inputs, outputs):
+        self._stop(inputs, outputs)
+        with self._lock:
+            self._chunks = Queue.Queue(maxsize=self.prefetch_chunks)
+            self._stop_loading = threading.Event()
+            self._chunk = None
+            self._done = False
+            self._loader = threading.Thread(
+                target=self._load_chunks,
+                args=(self._chunks, self._stop_loading))
+            self._loader.daemon = True
+            self._loader.start()
+
+    def _stop(self, inputs, outputs):
+        with self._lock:
+            if self._loader is None:
+                return
+            self._stop_loading.set()
+            # Unblock the loader if it waits for room in the window.
+            while self._loader.is_alive():
+                try:
+                    self._chunks.get(timeout=0.1)
+                except Queue.Empty:
+                    pass
+            self._loader = None
+
+    def _read(self, inputs, outputs):
+        with self._lock:
+            batch = None
+            while batch is None and not self._done:
+                if self._chunk is None:
+                    arrays = self._chunks.get()
+                    if arrays is None:
+                        self._done = True
+                        break
+                    self._chunk = (arrays, 0, {})
+                arrays, begin, offsets = self._chunk
+                end = min(begin + self.batch_size, _num_rows(arrays))
+                if begin < end:
+                    batch = _slice_rows(
+                        self._schema, arrays, begin, end, offsets)
+                    self._chunk = (arrays, end, offsets)
+                else:
+                    self._chunk = None
+        outputs[0].feed(np.array(batch is None))
+        if batch is None:
+            batch = [
+                np.empty((0, ), dtype=t) for t in self._schema.field_types()]
+        for output, arr in zip(outputs[1:], batch):
+            output.feed(arr)
+
+    def setup_ex(self, init_net, finish_net):
+        assert self.cache_path, 'build_cache must be called first'
+        init_net.Python(self._start)([], [])
+        finish_net.Python(self._stop)([], [])
+
+    def read(self, read_net):
+        should_stop = read_net.NextScopedBlob('should_stop')
+        fields = [
+            read_net.NextScopedBlob(name) for name in self.field_names]
+        read_net.Python(self._read)([], [should_stop] + fields)
+        return should_stop, fields
@@ -155,6 +155,30 @@ def db_name(epoch, node_name, db_prefix, path_prefix=None):
     return db_name
 
 
+def shard_db_name(db_name, shard_id, num_shards):
+    """Returns the name of the db holding one shard of a checkpoint.
+
+    Args:
+        db_name: A string. The full db name of the checkpoint, see `db_name`.
+        shard_id: An integer. The index of the shard.
+        num_shards: An integer. The number of dbs the checkpoint is split
+            across. Unsharded checkpoints (num_shards=1) use `db_name` as is.
+    Returns:
+        shard_db_name: A string. The full db name of the shard.
+    """
+    if num_shards == 1:
+        return db_name
+    return '{}.shard_{}_of_{}'.format(db_name, shard_id, num_shards)
+
+
+def _concurrent_step(name, nets):
+    return core.execution_step(
+        name,
+        [core.execution_step('%s_%d' % (name, i), net)
+         for i, net in enumerate(nets)],
+        concurrent_substeps=True)
+
+
 class CheckpointManager(object):
     """
     Controls saving and loading of workspaces on every epoch boundary of a job.
@@ -168,12 +192,18 @@ class CheckpointManager(object):
         db_type: Type of database to use for storing checkpoint.
         metadata_handler: An optional object capable of reading/writing
             checkpoint info in storage of choice.
+        num_shards: Number of dbs the blobs of a checkpoint are split across.
+            The shards are saved and loaded concurrently, see
+            `shard_db_name` for their names.
     """
-    def __init__(self, db_prefix, node_name, db_type, metadata_handler=None):
+    def __init__(self, db_prefix, node_name, db_type, metadata_handler=None,
+                 num_shards=1):
+        assert num_shards >= 1, 'num_shards must be positive.'
         self._db_prefix = db_prefix
         self._node_name = node_name
         self._db_type = db_type
         self._metadata_handler = metadata_handler
+        self._num_shards = num_shards
         # make sure these blobs are the first in the checkpoint file.
         self._net = core.Net('!!checkpoint_mngr')
         self._blob_names = self._net.AddExternalInput('blob_names')
@@ -221,9 +251,10 @@ class CheckpointManager(object):
                 db_type = path_type or self._db_type
                 logger.info("Initializing checkpoints from = %s"
                             % full_db_name)
+                # the blob names are always saved in the first shard
                 ops.Load(
                     [], self._blob_names,
-                    db=full_db_name,
+                    db=shard_db_name(full_db_name, 0, self._num_shards),
                     db_type=db_type,
                     absolute_path=True)
         self._names_output = task.outputs()[0]
@@ -233,15 +264,58 @@ class CheckpointManager(object):
         assert self._names_output
         return self._names_output.fetch().tolist()
 
+    def shard_blob_lists(self, blob_names=None):
+        """
+        Splits `blob_names` (defaults to `blob_list()`) into one list per
+        shard. The split only depends on the order of the names, so it is the
+        same at save time and at load time. The blob holding the names of the
+        checkpointed blobs always goes to the first shard, since `init` reads
+        it from there.
+        """
+        if blob_names is None:
+            blob_names = self.blob_list()
+        if self._num_shards == 1:
+            return [list(blob_names)]
+        names_blob = str(self._blob_names)
+        shards = [[] for _ in range(self._num_shards)]
+        if names_blob in blob_names:
+            shards[0].append(names_blob)
+        others = [b for b in blob_names if b != names_blob]
+        for i, blob in enumerate(others):
+            shards[i % self._num_shards].append(blob)
+        return shards
+
+    def shard_db_names(self, epoch, path_prefix=None):
+        """Returns the full db names of all the shards of a checkpoint."""
+        full_db_name = db_name(
+            epoch, self._node_name, self._db_prefix, path_prefix)
+        return [
+            shard_db_name(full_db_name, i, self._num_shards)
+            for i in range(self._num_shards)]
+
     def load(self, epoch, path_prefix=None, path_type=None):
         """
         Build a Task that will be run by JobRunner when the job is to be
         resumed from a given epoch. This task will run a Load op that will
         load and deserialize all relevant blobs from a persistent storage.
+        With several shards, one Load op per shard is run concurrently.
         """
         full_db_name = db_name(epoch, self._node_name, self._db_prefix, path_prefix)
         db_type = path_type or self._db_type
         logger.info("Loading checkpoints from = %s" % full_db_name)
+        if self._num_shards > 1:
+            nets = []
+            for shard_db, blobs in zip(
+                    self.shard_db_names(epoch, path_prefix),
+                    self.shard_blob_lists()):
+                net = core.Net('checkpoint_load_shard')
+                net.Load(
+                    [], blobs,
+                    db=shard_db,
+                    db_type=db_type,
+                    absolute_path=True)
+                nets.append(net)
+            return Task(step=_concurrent_step('checkpoint_load', nets))
         with Task() as task:
             ops.Load(
                 [],
@@ -268,26 +342,31 @@ class CheckpointManager(object):
         """
         logger.info('Load from %s' % db_name(epoch, self._node_name, self._db_prefix))
         with Task() as task:
-            ops.Load(
-                [],
-                blob_names,
-                db=db_name(epoch, self._node_name, self._db_prefix),
-                db_type=self._db_type,
-                absolute_path=True,
-                allow_incomplete=True)
+            for shard_db in self.shard_db_names(epoch):
+                ops.Load(
+                    [],
+                    blob_names,
+                    db=shard_db,
+                    db_type=self._db_type,
+                    absolute_path=True,
+                    allow_incomplete=True)
         return task
 
     def check_db_exists(self, epoch):
         logger.info('Check existence of %s' %
                     db_name(epoch, self._node_name, self._db_prefix))
         with Task() as task:
-            existence = ops.Const(False)
-            ops.DBExists(
-                [],
-                [existence],
-                db_name=db_name(epoch, self._node_name, self._db_prefix),
-                db_type=self._db_type,
-                absolute_path=True)
+            existence = None
+            for shard_db in self.shard_db_names(epoch):
+                shard_existence = ops.Const(False)
+                ops.DBExists(
+                    [],
+                    [shard_existence],
+                    db_name=shard_db,
+                    db_type=self._db_type,
+                    absolute_path=True)
+                existence = shard_existence if existence is None else \
+                    ops.And([existence, shard_existence])
             task.add_output(existence)
         return task
 
@@ -295,9 +374,21 @@ class CheckpointManager(object):
         """
         Build a Task that is run once after `init_group` and after each
         epoch is run. This will execute a Save ops to serialize and persist
-        blobs present in the global workspace.
+        blobs present in the global workspace. With several shards, one Save
+        op per shard is run concurrently.
         """
         logger.info('Saving to %s' % db_name(epoch, self._node_name, self._db_prefix))
+        if self._num_shards > 1:
+            nets = []
+            for shard_db, blobs in zip(
+                    self.shard_db_names(epoch), self.shard_blob_lists()):
+                net = core.Net('checkpoint_save_shard')
+                net.Save(
+                    blobs, [],
+                    db=shard_db,
+                    db_type=self._db_type, absolute_path=True)
+                nets.append(net)
+            return Task(step=_concurrent_step('checkpoint_save', nets))
         with Task() as task:
             ops.Save(
                 self.blob_list(), [],
@@ -381,12 +472,16 @@ class MultiNodeCheckpointManager(object):
         db_type: Type of database to use for storing checkpoint.
         metadata_handler: An optional object capable of reading/writing
             checkpoint info in storage of choice.
+        num_shards: Number of dbs the checkpoint of each node is split across,
+            see `CheckpointManager`.
     """
-    def __init__(self, db_prefix, db_type, metadata_handler=None):
+    def __init__(self, db_prefix, db_type, metadata_handler=None,
+                 num_shards=1):
         self._node_managers = None
         self._db_prefix = db_prefix
         self._db_type = db_type
         self._metadata_handler = metadata_handler
+        self._num_shards = num_shards
         self._path_prefix = None
         self._path_type = None
 
@@ -418,7 +513,8 @@ class MultiNodeCheckpointManager(object):
                 manager = CheckpointManager(
                     db_prefix=self._db_prefix,
                     node_name=str(node),
-                    db_type=self._db_type)
+                    db_type=self._db_type,
+                    num_shards=self._num_shards)
                 self._node_managers.append((node, manager))
         return self._task_group(
             CheckpointManager.init,
@@ -452,7 +548,8 @@ class MultiNodeCheckpointManager(object):
                     manager = CheckpointManager(
                         db_prefix=self._db_prefix,
                         node_name=str(node),
-                        db_type=self._db_type)
+                        db_type=self._db_type,
+                        num_shards=self._num_shards)
                     self._node_managers.append((node, manager))
         assert self._node_managers is not None, 'must initialize node managers'
         for _, manager in self._node_managers:
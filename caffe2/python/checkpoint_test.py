@@ -25,7 +25,7 @@ from caffe2.python.dataset import Dataset
 from caffe2.python.pipeline import pipe
 from caffe2.python.checkpoint import (
     CheckpointManager, MultiNodeCheckpointManager, Job, JobRunner, epoch_limiter,
-    UploadTaskGroupBuilder, db_name)
+    UploadTaskGroupBuilder, db_name, shard_db_name)
 from caffe2.python.net_builder import ops
 from caffe2.python.task import Node, Task, TaskGroup, WorkspaceType, Cluster
 from caffe2.python.test_util import TestCase
@@ -135,6 +135,53 @@ class TestCheckpoint(TestCase):
         finally:
             shutil.rmtree(tmpdir)
 
+    def test_sharded_checkpoint(self):
+        num_shards = 3
+        # test single node
+        try:
+            tmpdir = tempfile.mkdtemp()
+
+            def builder():
+                ws = workspace.C.Workspace()
+                session = LocalSession(ws)
+                checkpoint = CheckpointManager(
+                    tmpdir, 'temp_node', 'minidb', num_shards=num_shards)
+                return session, checkpoint
+
+            self.run_with(builder)
+            for shard_id in range(num_shards):
+                self.assertTrue(os.path.exists(shard_db_name(
+                    db_name(1, 'temp_node', tmpdir), shard_id, num_shards)))
+            self.assertFalse(os.path.exists(db_name(1, 'temp_node', tmpdir)))
+        finally:
+            shutil.rmtree(tmpdir)
+
+        # test multi-node
+        try:
+            tmpdir = tempfile.mkdtemp()
+
+            def builder():
+                ws = workspace.C.Workspace()
+                session = LocalSession(ws)
+                checkpoint = MultiNodeCheckpointManager(
+                    tmpdir, 'minidb', num_shards=num_shards)
+                return session, checkpoint
+
+            self.run_with(builder)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_shard_blob_lists(self):
+        checkpoint = CheckpointManager(
+            '/tmp', 'temp_node', 'minidb', num_shards=2)
+        names_blob = str(checkpoint._blob_names)
+        shards = checkpoint.shard_blob_lists(['a', 'b', names_blob, 'c'])
+        self.assertEquals(shards, [[names_blob, 'a', 'c'], ['b']])
+        self.assertEquals(
+            CheckpointManager('/tmp', 'temp_node', 'minidb').shard_blob_lists(
+                ['a', names_blob]),
+            [['a', names_blob]])
+
     def test_ckpt_name_and_load_model_from_ckpts(self):
         try:
             num_nodes = 3
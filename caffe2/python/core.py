@@ -34,6 +34,7 @@ from caffe2.python.control_ops_grad import \
 import caffe2.python._import_c_extension as C
 import pickle
 import numpy as np
+import re
 import sys
 import traceback
 import os
@@ -1120,6 +1121,69 @@ GradientRegistry.RegisterGradient('If')(gen_if_gradient)
 GradientRegistry.RegisterGradient('While')(gen_while_gradient)
 
 
+class SSAIndex(object):
+    """
+    Def-use index of a net in the format of get_ssa(), which can be extended
+    with new operators and external inputs without re-walking the net.
+
+    Attributes:
+        ssa:            list of tuples (versioned_inputs, versioned_outputs)
+                        for each op, as returned by get_ssa().
+        blob_versions:  map with the latest version of each blob.
+        producers:      map from versioned blob to the index of the op that
+                        produces it, as returned by get_output_producers().
+        consumers:      map from versioned blob to the list of indices of the
+                        ops that read it.
+    """
+
+    def __init__(self, proto, blob_versions=None):
+        assert isinstance(proto, caffe2_pb2.NetDef)
+        self.ssa = []
+        self.blob_versions = {} if blob_versions is None else blob_versions
+        self.producers = {}
+        self.consumers = defaultdict(list)
+        # Without external inputs, get_ssa() registers every blob used
+        # before being produced at version 0.
+        self._add_op_inputs = not proto.external_input
+        for i in proto.external_input:
+            if i not in self.blob_versions:
+                self.blob_versions[str(i)] = 0
+        self.add_ops(proto.op)
+
+    def add_ops(self, ops):
+        blob_versions = self.blob_versions
+        for op in ops:
+            op_id = len(self.ssa)
+            if self._add_op_inputs:
+                for i in op.input:
+                    if i not in blob_versions:
+                        blob_versions[i] = 0
+            inputs = [(str(i), blob_versions.get(str(i), 0)) for i in op.input]
+            for i in inputs:
+                self.consumers[i].append(op_id)
+            for o in op.output:
+                blob_versions[str(o)] = blob_versions.get(str(o), 0) + 1
+            outputs = [(str(o), blob_versions[str(o)]) for o in op.output]
+            for o in outputs:
+                self.producers[o] = op_id
+            self.ssa.append((inputs, outputs))
+
+    def add_external_inputs(self, inputs):
+        """
+        Registers inputs newly added to the external inputs of the net.
+        Returns False if the index can't be updated in place and has to be
+        rebuilt from the net instead.
+        """
+        if self._add_op_inputs and self.ssa:
+            return False
+        self._add_op_inputs = False
+        for i in inputs:
+            if self.blob_versions.get(str(i), 0) > 0:
+                return False
+            self.blob_versions[str(i)] = 0
+        return True
+
+
 def get_ssa(net, blob_versions=None):
     """
     Given a net, return a structure containing the version of each input and
@@ -1138,27 +1202,16 @@ def get_ssa(net, blob_versions=None):
         blob_versions:  updated map with latest version of each blob found in
                         the net.
     """
-    proto = net.Proto() if isinstance(net, Net) else net
-    assert isinstance(proto, caffe2_pb2.NetDef)
-    if blob_versions is None:
-        blob_versions = {}
     if isinstance(net, list):
+        if blob_versions is None:
+            blob_versions = {}
         return [get_ssa(n, blob_versions) for n in net], blob_versions
-    for i in proto.external_input:
-        if i not in blob_versions:
-            blob_versions[str(i)] = 0
-    ssa = []
-    for op in proto.op:
-        if not proto.external_input:
-            for i in op.input:
-                if i not in blob_versions:
-                    blob_versions[i] = 0
-        inputs = [(str(i), blob_versions.get(str(i), 0)) for i in op.input]
-        for o in op.output:
-            blob_versions[str(o)] = blob_versions.get(str(o), 0) + 1
-        outputs = [(str(o), blob_versions[str(o)]) for o in op.output]
-        ssa.append((inputs, outputs))
-    return ssa, blob_versions
+    if isinstance(net, Net) and blob_versions is None:
+        index = net._GetSSAIndex()
+        return list(index.ssa), dict(index.blob_versions)
+    proto = net.Proto() if isinstance(net, Net) else net
+    index = SSAIndex(proto, blob_versions)
+    return index.ssa, index.blob_versions
 
 
 def get_undefined_blobs(ssa):
@@ -1185,15 +1238,17 @@ def get_output_producers(ssa):
     return producers
 
 
-def get_op_ids_in_path(ssa, blob_versions, inputs, outputs):
+def get_op_ids_in_path(ssa, blob_versions, inputs, outputs, producers=None):
     """
     Given a ssa and blob_versions as produced by get_ssa(), returns the list
     of op indices that are necessary in order to generate the blobs in
     `outputs`, given blobs in `inputs`.
     Consider that the `inputs` are given in their latest version.
+    `producers`, if given, is the result of get_output_producers(ssa).
     """
     inputs_set = set((str(i), blob_versions[str(i)]) for i in inputs)
-    producers = get_output_producers(ssa)
+    if producers is None:
+        producers = get_output_producers(ssa)
     queue = [(str(o), blob_versions[str(o)]) for o in outputs]
     used_op_ids = set()
     while len(queue) > 0:
@@ -1318,8 +1373,7 @@ def clone_and_bind_net(net, name, prefix, blob_remap=None, inputs=None,
         for fn, fb in zip(inputs.field_names(), inputs.field_blobs()):
             if fn in original_mapping:
                 blob_remap[str(original_mapping[fn])] = str(fb)
-    proto = net.Proto()
-    ssa, blob_versions = get_ssa(proto)
+    ssa, blob_versions = get_ssa(net)
     undef_blobs = get_undefined_blobs(ssa)
 
     for blob in viewkeys(blob_versions):
@@ -1357,6 +1411,33 @@ def _recover_record_by_prefix(names, prefix=''):
         col_blobs=[_get_blob_ref(prefix + name) for name in column_names])
 
 
+_AUTOGEN_INDEX_RE = re.compile(r'\d+')
+
+_operator_traceback_mode = 'full'
+_operator_traceback_sample_every = 1
+
+
+def SetOperatorTracebackMode(mode, sample_every=100, max_tracebacks=None):
+    """Controls the capture of the Python stack trace of every operator added
+    through a Net, which is printed when the operator fails.
+
+    Inputs:
+      mode: 'full' captures the stack trace of every operator, 'sampled' of
+          every sample_every-th operator of a net, and 'off' disables it.
+      sample_every: sampling period used in 'sampled' mode.
+      max_tracebacks (optional): maximum number of stack traces kept in
+          workspace.operator_tracebacks.
+    """
+    global _operator_traceback_mode, _operator_traceback_sample_every
+    assert mode in ('off', 'sampled', 'full'), \
+        "Unknown operator traceback mode: {}".format(mode)
+    assert sample_every > 0, "sample_every should be positive"
+    _operator_traceback_mode = mode
+    _operator_traceback_sample_every = sample_every
+    if max_tracebacks is not None:
+        workspace.operator_tracebacks.max_tracebacks = max_tracebacks
+
+
 class Net(object):
     _net_names_used = set()
     operator_registry_ = {}
@@ -1394,6 +1475,7 @@ class Net(object):
         self._recreate_lookup_tables = False
         self._op_outputs = set()
         self._external_input_map = set()
+        self._ssa_index = None
         self._attr_dict = defaultdict(list)
         if type(name_or_proto) is caffe2_pb2.NetDef:
             proto = name_or_proto
@@ -1402,33 +1484,10 @@ class Net(object):
             self._net = caffe2_pb2.NetDef()
             self._net.CopyFrom(proto)
 
-            existing_outputs = [list(op.output) for op in self._net.op]
-
-            self._external_input_map.update(list(self._net.external_input))
-
-            # Set the next name index properly.
-            existing_names = set(
-                sum(
-                    [list(op.input) for op in self._net.op], []
-                ) + sum(
-                    existing_outputs, []
-                )
-            )
-            for outs in existing_outputs:
-                self._op_outputs.update(outs)
-
-            prefix_len = len(self._net.name + '_blob_')
-            autogen_indices = []
-            for s in existing_names:
-                if s.startswith(self._net.name + '_blob_'):
-                    try:
-                        autogen_indices.append(int(s[prefix_len]))
-                    except ValueError:
-                        pass
-            if len(autogen_indices):
-                self._next_name_index = max(autogen_indices) + 1
-            else:
-                self._next_name_index = 0
+            # The lookup tables and the next autogenerated name index are
+            # built lazily from the proto, on first use.
+            self._recreate_lookup_tables = True
+            self._next_name_index = None
             name = self._net.name
         else:
             name = name_or_proto
@@ -1440,6 +1499,8 @@ class Net(object):
 
     def AppendNet(self, net):
         assert isinstance(net, Net)
+        if self._recreate_lookup_tables:
+            self._RecreateLookupTables()
         for i in net.Proto().external_input:
             if (
                 i not in self.Proto().external_input and
@@ -1550,6 +1611,8 @@ class Net(object):
         Returns true iff the given BlobReference is used by any operator
         or this net, or if it is one of the external inputs of the net.
         """
+        if self._recreate_lookup_tables:
+            self._RecreateLookupTables()
         blob_name = str(blob)
         for op in self._net.op:
             for input in op.input:
@@ -1696,11 +1759,15 @@ class Net(object):
             assert self.BlobIsDefined(output)
         input_names = {str(k): str(v) for k, v in viewitems(inputs)}
         output_names = [str(o) for o in outputs]
-        proto = self._net
-        blob_versions = {str(i): 0 for i in inputs}
-        ssa, blob_versions = get_ssa(proto, blob_versions)
-        used_op_ids = get_op_ids_in_path(ssa, blob_versions, inputs, outputs)
-        disallowed_op_ids = get_op_ids_in_path(ssa, blob_versions, [], inputs)
+        index = self._GetSSAIndex()
+        ssa = index.ssa
+        blob_versions = dict(index.blob_versions)
+        for i in inputs:
+            blob_versions.setdefault(str(i), 0)
+        used_op_ids = get_op_ids_in_path(
+            ssa, blob_versions, inputs, outputs, index.producers)
+        disallowed_op_ids = get_op_ids_in_path(
+            ssa, blob_versions, [], inputs, index.producers)
         assert len(set(used_op_ids) & set(disallowed_op_ids)) == 0, (
             'Cannot partially clone net: some of the ops required would ' +
             'generate the given input.')
@@ -1780,20 +1847,51 @@ class Net(object):
                     output_name += ':' + str(output_id)
                 index += 1
         else:
+            if self._next_name_index is None:
+                self._next_name_index = self._GetNextAutogenNameIndex()
             output_name = self._net.name + '_blob_' + str(self._next_name_index)
             self._next_name_index += 1
         return str(output_name)
 
+    def _GetNextAutogenNameIndex(self):
+        """Returns the index following the largest one used by the names
+        NextName() autogenerated for this net, looking at all op inputs and
+        outputs."""
+        prefix = self._net.name + '_blob_'
+        prefix_len = len(prefix)
+        next_index = 0
+        for op in self._net.op:
+            for name in chain(op.input, op.output):
+                if name.startswith(prefix):
+                    digits = _AUTOGEN_INDEX_RE.match(name, prefix_len)
+                    if digits:
+                        next_index = max(next_index, int(digits.group()) + 1)
+        return next_index
+
     def _ExtendOps(self, new_ops):
         self._net.op.extend(new_ops)
         for op in new_ops:
             self._op_outputs.update([text_type(o) for o in op.output])
+        if self._ssa_index is not None:
+            self._ssa_index.add_ops(new_ops)
+
+    def _GetSSAIndex(self):
+        """
+        Returns the SSAIndex of this net. It is extended as operators are
+        added through the Net and dropped whenever the proto is handed out
+        for modification.
+        """
+        if self._ssa_index is None:
+            self._ssa_index = SSAIndex(self._net)
+        return self._ssa_index
 
     def _CheckLookupTables(self):
         '''
         Called from unit tests to validate the internal lookup tables
         match the protobuf contents.
         '''
+        if self._recreate_lookup_tables:
+            self._RecreateLookupTables()
         test_op_outputs = set()
         for op in self._net.op:
             for o in op.output:
@@ -1808,17 +1906,12 @@ class Net(object):
 
     def _InvalidateLookupTables(self):
         self._recreate_lookup_tables = True
+        self._ssa_index = None
 
     def _RecreateLookupTables(self):
-        self._op_outputs = set()
-        for op in self._net.op:
-            for o in op.output:
-                self._op_outputs.add(o)
-
-        self._external_input_map = set()
-        for inp in self._net.external_input:
-            self._external_input_map.add(inp)
-
+        self._op_outputs = set(
+            chain.from_iterable(op.output for op in self._net.op))
+        self._external_input_map = set(self._net.external_input)
         self._recreate_lookup_tables = False
 
     def AddGradientOperators(self, ys, skip=0):
@@ -1857,6 +1950,8 @@ class Net(object):
 
     def AddExternalInput(self, *inputs):
         assert len(inputs) > 0
+        if self._recreate_lookup_tables:
+            self._RecreateLookupTables()
         refs = []
         for input in inputs:
             input_name = str(input)
@@ -1867,6 +1962,9 @@ class Net(object):
             self._net.external_input.extend([input_name])
             self._external_input_map.update([input_name])
             refs.append(_get_blob_ref(input_name))
+        if self._ssa_index is not None and \
+                not self._ssa_index.add_external_inputs(inputs):
+            self._ssa_index = None
 
         return refs[0] if len(refs) == 1 else refs
 
@@ -2026,8 +2124,13 @@ class Net(object):
         op = CreateOperator(op_type, inputs, outputs, **kwargs)
         self._ExtendOps([op])
 
-        workspace.operator_tracebacks[self.Name()][
-            len(self._net.op) - 1] = _extract_stacktrace()
+        op_id = len(self._net.op) - 1
+        if _operator_traceback_mode == 'full' or (
+            _operator_traceback_mode == 'sampled' and
+            op_id % _operator_traceback_sample_every == 0
+        ):
+            workspace.operator_tracebacks.add(
+                self.Name(), op_id, _extract_stacktrace())
 
         if len(op.output) == 0:
             return
@@ -2140,6 +2243,8 @@ class Net(object):
         )
 
     def is_external_input(self, blob):
+        if self._recreate_lookup_tables:
+            self._RecreateLookupTables()
         name = str(blob)
         return name in self._external_input_map
 
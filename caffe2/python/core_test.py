@@ -214,6 +214,29 @@ class TestCloneNet(test_util.TestCase):
         n._CheckLookupTables()
 
 
+class TestSSAIndex(test_util.TestCase):
+    def test_incremental_index_matches_get_ssa(self):
+        net = core.Net("ssa_index")
+        a, b = net.AddExternalInput("a", "b")
+        c = net.Mul([a, b], "c")
+        index = net._GetSSAIndex()
+        d = net.Relu(c, "d")
+        net.Add([d, a], "c")
+        net.Relu(c, c)
+
+        self.assertIs(net._GetSSAIndex(), index)
+        self.assertEqual(
+            (index.ssa, index.blob_versions),
+            core.get_ssa(caffe2_pb2.NetDef.FromString(
+                net.Proto().SerializeToString())))
+        self.assertEqual(index.producers[("c", 3)], 3)
+        self.assertEqual(index.consumers[("c", 1)], [1])
+        self.assertEqual(index.consumers[("a", 0)], [0, 2])
+
+        # Handing out the proto for modification drops the index.
+        self.assertIsNot(net._GetSSAIndex(), index)
+
+
 class TestCreateOperator(test_util.TestCase):
     def testCreate(self):
         device_option = caffe2_pb2.DeviceOption()
@@ -334,6 +357,39 @@ class TestAutoNaming(test_util.TestCase):
         a._CheckLookupTables()
         b._CheckLookupTables()
 
+    def test_auto_naming_from_proto(self):
+        proto = caffe2_pb2.NetDef()
+        proto.name = 'auto_naming_from_proto'
+        proto.external_input.extend(['x'])
+        op = proto.op.add()
+        op.type = 'Relu'
+        op.input.extend(['x'])
+        op.output.extend(['auto_naming_from_proto_blob_11'])
+        op = proto.op.add()
+        op.type = 'Relu'
+        op.input.extend(['auto_naming_from_proto_blob_11'])
+        op.output.extend(['auto_naming_from_proto_blob_3_relu'])
+
+        net = core.Net(proto)
+        self.assertTrue(net.BlobIsDefined('x'))
+        self.assertTrue(net.BlobIsDefined('auto_naming_from_proto_blob_11'))
+        self.assertFalse(net.BlobIsDefined('y'))
+        self.assertEqual(net.NextName(), 'auto_naming_from_proto_blob_12')
+        net._CheckLookupTables()
+
+    def test_uses_unused_external_input_from_proto(self):
+        proto = caffe2_pb2.NetDef()
+        proto.name = 'uses_unused_external_input_from_proto'
+        proto.external_input.extend(['x', 'unused'])
+        op = proto.op.add()
+        op.type = 'Relu'
+        op.input.extend(['x'])
+        op.output.extend(['y'])
+
+        net = core.Net(proto)
+        self.assertTrue(net.UsesBlob('unused'))
+        self.assertFalse(net.UsesBlob('y'))
+
 
 class TestAppendNet(test_util.TestCase):
 
@@ -466,6 +522,26 @@ class TestOperatorTraceback(test_util.TestCase):
             ws.run(net)
         self.op_name_check(net, cf, line, func)
 
+    def test_traceback_modes(self):
+        try:
+            core.SetOperatorTracebackMode('off')
+            net = core.Net("test_traceback_off")
+            net.Relu(net.AddExternalInput("a"), "b")
+            self.assertIsNone(workspace.operator_tracebacks.get(net.Name()))
+
+            core.SetOperatorTracebackMode('sampled', sample_every=2)
+            net = core.Net("test_traceback_sampled")
+            a = net.AddExternalInput("a")
+            for _ in range(4):
+                a = net.Relu(a)
+            net_tb = workspace.operator_tracebacks.get(net.Name())
+            self.assertEqual(len(net_tb), 2)
+            self.assertIn(0, net_tb)
+            self.assertNotIn(1, net_tb)
+            self.assertEqual(net_tb[2][0][2], 'test_traceback_modes')
+        finally:
+            core.SetOperatorTracebackMode('full')
+
     def test_async_exception_handling(self):
         net = core.Net("test")
         net.Proto().type = 'dag'  # this runs operators on background threads
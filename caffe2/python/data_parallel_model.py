@@ -70,6 +70,7 @@ def Parallelize(
     num_threads_per_device=4,
     shared_model=False,
     combine_spatial_bn=False,
+    allreduce_bucket_size_bytes=None,
 ):
     '''
     Function to create a model that can run on many GPUs or CPUs.
@@ -120,6 +121,13 @@ def Parallelize(
                         all devices within the node. If False, batch
                         normalization will be done separately for each device.
                         This option is currently only supported on the CPU.
+      allreduce_bucket_size_bytes:
+                        If set, dense gradients of the same type are packed
+                        into flat buffers of about this many bytes, and each
+                        buffer is reduced with a single collective instead
+                        of one per gradient. Useful for models with many
+                        small gradients, where the latency of the
+                        collectives dominates.
     '''
     assert scope.CurrentDeviceScope() is None \
         or scope.CurrentDeviceScope().device_type == caffe2_pb2.CPU, \
@@ -284,6 +292,7 @@ def Parallelize(
             rendezvous,
             use_nccl,
             max_concurrent_distributed_ops,
+            allreduce_bucket_size_bytes,
         )
     else:
         log.info("NOTE: Param builder function did not create any parameters.")
@@ -1145,8 +1154,19 @@ def _SyncAllParamsSingleHost(devices, model, net, unique_param_names):
 
 
 def _AllReduceBlobs(blob_names, devices, model, net, rendezvous, use_nccl,
-                    max_concurrent_distributed_ops):
-    if rendezvous is None or rendezvous['num_shards'] <= 1:
+                    max_concurrent_distributed_ops, bucket_size_bytes=None):
+    if bucket_size_bytes is not None:
+        _AllReduceBlobsBucketed(
+            blob_names,
+            devices,
+            model,
+            net,
+            rendezvous,
+            use_nccl,
+            max_concurrent_distributed_ops,
+            bucket_size_bytes,
+        )
+    elif rendezvous is None or rendezvous['num_shards'] <= 1:
         _AllReduceBlobsSingleHost(
             blob_names,
             devices,
@@ -1165,6 +1185,138 @@ def _AllReduceBlobs(blob_names, devices, model, net, rendezvous, use_nccl,
         )
 
 
+_ELEMENT_SIZE_BYTES = {
+    caffe2_pb2.TensorProto.FLOAT: 4,
+    caffe2_pb2.TensorProto.FLOAT16: 2,
+    caffe2_pb2.TensorProto.DOUBLE: 8,
+    caffe2_pb2.TensorProto.INT32: 4,
+    caffe2_pb2.TensorProto.INT64: 8,
+}
+
+
+def _BucketGradients(model, blob_names, devices, bucket_size_bytes):
+    '''
+    Groups the gradients of blob_names into buckets of gradients of the same
+    type, closed once they hold at least bucket_size_bytes. Returns the
+    buckets and the gradients that can't be packed, in the order they can be
+    reduced: a bucket comes at the position of its last gradient. A bucket
+    is a list of (blob_name, shape).
+    '''
+    # Gradients of dense parameters have the shape and type of the parameter
+    shapes, types = workspace.InferShapesAndTypes([model.param_init_net], {})
+    grad_to_param = {
+        str(g): str(p) for p, g in viewitems(model.param_to_grad)
+        if isinstance(g, core.BlobReference)
+    }
+    ordered = []
+    open_buckets = OrderedDict()
+    for blob_name in blob_names:
+        grads = model._device_grouped_blobs[blob_name]
+        master_grad = grads.get(devices[0])
+        param = grad_to_param.get(str(master_grad)) \
+            if isinstance(master_grad, core.BlobReference) else None
+        if (len(grads) != len(devices) or param not in shapes or
+                types[param] not in _ELEMENT_SIZE_BYTES):
+            ordered.append(blob_name)
+            continue
+        dtype = types[param]
+        bucket, size = open_buckets.get(dtype, ([], 0))
+        bucket.append((blob_name, shapes[param]))
+        size += int(np.prod(shapes[param])) * _ELEMENT_SIZE_BYTES[dtype]
+        if size >= bucket_size_bytes:
+            ordered.append(bucket)
+            del open_buckets[dtype]
+        else:
+            open_buckets[dtype] = (bucket, size)
+    ordered.extend(bucket for bucket, _ in viewvalues(open_buckets))
+    # A bucket of one gradient is reduced in place
+    return [
+        b[0][0] if isinstance(b, list) and len(b) == 1 else b
+        for b in ordered
+    ]
+
+
+def _AllReduceBlobsBucketed(
+    blob_names,
+    devices,
+    model,
+    net,
+    rendezvous,
+    use_nccl,
+    max_concurrent_distributed_ops,
+    bucket_size_bytes,
+):
+    '''
+    Packs the gradients of each device into flat buffers, reduces the
+    buffers instead of the gradients, and copies the reduced values back.
+    Sparse gradients and gradients of unknown shape are reduced one by one.
+    '''
+    if len(devices) == 1 and (
+            rendezvous is None or rendezvous['num_shards'] <= 1):
+        return
+
+    reduced_names = []
+    buckets = OrderedDict()
+    for item in _BucketGradients(model, blob_names, devices, bucket_size_bytes):
+        if not isinstance(item, list):
+            reduced_names.append(item)
+            continue
+        bucket_name = "allreduce_bucket_{}".format(len(buckets))
+        buckets[bucket_name] = item
+        reduced_names.append(bucket_name)
+        model._device_grouped_blobs[bucket_name] = {}
+        for device in devices:
+            grads = [
+                model._device_grouped_blobs[blob_name][device]
+                for blob_name, _ in item
+            ]
+            ns = "{}_{}".format(model._device_prefix, device)
+            device_opt = core.DeviceOption(model._device_type, device)
+            with core.DeviceScope(device_opt):
+                flat_grads = [
+                    net.FlattenToVec(g, "{}_flat".format(g)) for g in grads
+                ]
+                buffer, _ = net.Concat(
+                    flat_grads,
+                    ["{}/{}".format(ns, bucket_name),
+                     "{}/{}_splitinfo".format(ns, bucket_name)],
+                    axis=0,
+                )
+            model._device_grouped_blobs[bucket_name][device] = buffer
+    log.info("Reducing {} gradients in {} buckets".format(
+        sum(len(b) for b in viewvalues(buckets)), len(buckets)))
+
+    _AllReduceBlobs(
+        reduced_names,
+        devices,
+        model,
+        net,
+        rendezvous,
+        use_nccl,
+        max_concurrent_distributed_ops,
+    )
+
+    for bucket_name, bucket in viewitems(buckets):
+        for device in devices:
+            grads = [
+                model._device_grouped_blobs[blob_name][device]
+                for blob_name, _ in bucket
+            ]
+            device_opt = core.DeviceOption(model._device_type, device)
+            with core.DeviceScope(device_opt):
+                net.Split(
+                    model._device_grouped_blobs[bucket_name][device],
+                    grads,
+                    split=[int(np.prod(shape)) for _, shape in bucket],
+                    axis=0,
+                )
+                for g, (_, shape) in zip(grads, bucket):
+                    net.Reshape(
+                        g, [g, "{}_flat_shape".format(g)], shape=shape)
+        # Buffers are not gradients, don't expose them to other syncs
+        del model._device_grouped_blobs[bucket_name]
+
+
 def _PruneParametersForSharing(model):
     assert model._shared_model
     master_prefix = "{}_{}/".format(model._device_prefix, model._devices[0])
@@ -17,7 +17,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from future.utils import viewkeys
+from future.utils import viewitems, viewkeys
 from multiprocessing import Process, Queue
 import numpy as np
 import os
@@ -366,6 +366,92 @@ class DataParallelModelTest(TestCase):
                 device_option=None,
                 tmpdir=tmpdir)
 
+    def test_allreduce_bucketed(self):
+
+        def run(comm_rank, comm_size, tmpdir, devices):
+            def add_input_ops(model):
+                pass
+
+            def add_model_ops(model, loss_scale):
+                blob = "data"
+                for i in range(4):
+                    blob = model.FC(
+                        blob, "fc{}".format(i), 8, 8,
+                        ("ConstantFill", {"value": 0.1 * (i + 1)}),
+                        ("ConstantFill", {}))
+                sq = model.SquaredL2Distance([blob, "label"], "sq")
+                loss = model.AveragedLoss(sq, "loss")
+                loss = model.Scale(loss, scale=loss_scale)
+                return [loss]
+
+            def add_optimizer(model):
+                optimizer.build_sgd(model, 0.1, policy="fixed")
+
+            def run_model(name, bucket_size_bytes):
+                workspace.ResetWorkspace()
+                store_handler = "store_handler"
+                workspace.RunOperatorOnce(
+                    core.CreateOperator(
+                        "FileStoreHandlerCreate",
+                        [],
+                        [store_handler],
+                        path=os.path.join(tmpdir, name)))
+                rendezvous = dict(
+                    kv_handler=store_handler,
+                    shard_id=comm_rank,
+                    num_shards=comm_size,
+                    engine='GLOO',
+                )
+                model = cnn.CNNModelHelper(order="NHWC", name=name)
+                data_parallel_model.Parallelize_CPU(
+                    model,
+                    input_builder_fun=add_input_ops,
+                    forward_pass_builder_fun=add_model_ops,
+                    optimizer_builder_fun=add_optimizer,
+                    devices=devices,
+                    rendezvous=rendezvous,
+                    allreduce_bucket_size_bytes=bucket_size_bytes,
+                )
+                num_allreduces = len([
+                    op for op in model.net.Proto().op
+                    if op.type == "Allreduce"])
+                rng = np.random.RandomState(comm_rank)
+                for device in devices:
+                    workspace.FeedBlob(
+                        "cpu_{}/data".format(device),
+                        rng.rand(4, 8).astype(np.float32))
+                    workspace.FeedBlob(
+                        "cpu_{}/label".format(device),
+                        rng.rand(4, 8).astype(np.float32))
+                data_parallel_model.RunInitNet(model)
+                data_parallel_model.RunNet(model, 1)
+                grads = {
+                    "cpu_{}/{}".format(device, g): workspace.FetchBlob(
+                        "cpu_{}/{}".format(device, g))
+                    for g in model._grad_names for device in devices
+                }
+                return num_allreduces, grads
+
+            num_allreduces, grads = run_model("per_blob", None)
+            num_bucketed, bucketed_grads = run_model("bucketed", 1 << 20)
+            self.assertEqual(num_allreduces, 8)
+            self.assertEqual(num_bucketed, 1)
+            self.assertEqual(sorted(grads.keys()), sorted(bucketed_grads.keys()))
+            for name, grad in viewitems(grads):
+                self.assertEqual(bucketed_grads[name].shape, grad.shape)
+                np.testing.assert_allclose(
+                    bucketed_grads[name], grad, rtol=1e-5)
+
+        with TemporaryDirectory() as tmpdir:
+            for name in ["per_blob", "bucketed"]:
+                os.mkdir(os.path.join(tmpdir, name))
+            self.run_test_locally(
+                run,
+                comm_size=2,
+                device_option=None,
+                tmpdir=tmpdir,
+                devices=[0, 1])
+
     def test_device_scope_check(self):
         with self.assertRaises(AssertionError):
             with core.DeviceScope(core.DeviceOption(caffe2_pb2.CUDA, 0)):
@@ -61,6 +61,14 @@ for each of the inputs. Default is 0 for all iputs.
 'timeout' is the timeout in seconds after which if no data is available, the
 net will fail (default 600s = 10 mins).
 
+If 'use_processes' is set to True, each fetcher runs in its own process
+instead of a thread, which helps CPU-heavy fetchers (decoding, augmentation)
+that would otherwise be serialized by the GIL. The fetched arrays are passed
+back through shared memory slots of 'shm_slot_bytes' bytes; results that are
+larger, or that are not numeric numpy arrays, are pickled instead. The fetcher
+function must not use the Caffe2 workspace in that mode. The processes are
+forked when the coordinator starts, before the fetcher and enqueuer threads.
+
 This function returns a list of numpy arrays corresponding to the different
 input blobs. In the example above, it would return two arrays, one for the
 data blob and another for the labels. These arrays can have arbitrary number
@@ -91,7 +99,8 @@ import time
 from caffe2.python import workspace, core, scope, utils
 from caffe2.proto import caffe2_pb2
 from caffe2.python.parallel_workers import Metrics, State, \
-    WorkerCoordinator, GlobalWorkerCoordinator, Worker, run_worker
+    WorkerCoordinator, GlobalWorkerCoordinator, Worker, ProcessWorker, \
+    run_worker
 
 log = logging.getLogger("data_workers")
 log.setLevel(logging.INFO)
@@ -114,7 +123,9 @@ def init_data_input_workers(
     external_loggers=None,
     dont_rebatch=False,
     batch_columns=None,
-    timeout=600
+    timeout=600,
+    use_processes=False,
+    shm_slot_bytes=64 * 1024 * 1024,
 ):
     global global_coordinator
     device_option = scope.CurrentDeviceScope()
@@ -145,15 +156,31 @@ def init_data_input_workers(
         global_coordinator.get_new_worker_id()
         for i in range(num_worker_threads)
     ]
-    workers = [
-        threading.Thread(
-            target=run_worker,
-            name="data_workers fetcher id {}".format(worker_id),
-            args=[coordinator,
-                  DataWorker(coordinator, worker_id, fetch_fun, metrics,
-                             batch_size, batch_feeder)],
-        ) for worker_id in worker_ids
-    ]
+    if use_processes:
+        process_workers = [
+            DataProcessWorker(coordinator, worker_id, fetch_fun, metrics,
+                              batch_size, batch_feeder, shm_slot_bytes)
+            for worker_id in worker_ids
+        ]
+        workers = [
+            threading.Thread(
+                target=run_worker,
+                name="data_workers process fetcher id {}".format(
+                    worker._worker_id),
+                args=[coordinator, worker],
+            ) for worker in process_workers
+        ]
+        coordinator._process_workers = process_workers
+    else:
+        workers = [
+            threading.Thread(
+                target=run_worker,
+                name="data_workers fetcher id {}".format(worker_id),
+                args=[coordinator,
+                      DataWorker(coordinator, worker_id, fetch_fun, metrics,
+                                 batch_size, batch_feeder)],
+            ) for worker_id in worker_ids
+        ]
 
     workers.append(threading.Thread(
         target=enqueuer,
@@ -185,7 +212,10 @@ class BatchFeeder(State):
         self._prev_seconds = 0
         self._last_warning = time.time()
         self._dont_rebatch = dont_rebatch
+        self._batch_buffers = [None for _ in input_blob_names]
+        self._leftover = None
         self._init_scratch()
+        self._create_enqueue_nets()
         self._metrics = metrics
 
         if batch_columns is None:
@@ -206,6 +236,11 @@ class BatchFeeder(State):
             self._log_inputs_per_interval(0, force=True)
 
     def cleanup(self):
+        self._batch_buffers = [None for _ in self._input_blob_names]
+        self._leftover = None
+        for net_name in self._enqueue_nets.values():
+            workspace.DeleteNet(net_name)
+        self._enqueue_nets = {}
         utils.ResetBlobs(self._scratch_blob.values())
         utils.ResetBlobs(self._scratch_status.values())
 
@@ -278,54 +313,60 @@ class BatchFeeder(State):
         '''
         This pulls data from the python-side queue and collects them
         into batch-sized pieces, unless dont_rebatch is set to true.
+
+        Chunks are copied once into a preallocated per-input batch buffer.
+        Whatever does not fit into the current batch is kept as a view
+        and consumed first when assembling the next batch. If a single
+        chunk covers a whole batch, a view of it is enqueued directly.
         '''
         if self._dont_rebatch:
             self._enqueue_batch_direct(data_input_coordinator)
             return
 
-        cur_batch = [np.array([]) for d in self._input_blob_names]
+        batch_size = self._batch_size
         first_batch_col = self._batch_columns[0]
+        cur_batch = None
+        filled = 0
 
         # Collect data until we have a full batch size
-        while (
-            cur_batch[0].shape[0] == 0 or
-            cur_batch[0].shape[first_batch_col] < self._batch_size
-        ) and data_input_coordinator.is_active():
-            chunk = self._get(data_input_coordinator)
-            if chunk is None:
+        while filled < batch_size and data_input_coordinator.is_active():
+            if self._leftover is not None:
+                chunk = self._leftover
+                self._leftover = None
+            else:
+                chunk = self._get(data_input_coordinator)
+                if chunk is None:
+                    continue
+
+            num_rows = chunk[0].shape[first_batch_col]
+            if num_rows == 0:
                 continue
-
-            for j, chunk_elem in enumerate(chunk):
-                if cur_batch[j].shape[0] == 0:
-                    cur_batch[j] = chunk_elem.copy()
-                else:
-                    cur_batch[j] = np.append(
-                        cur_batch[j], chunk_elem, axis=self._batch_columns[j]
-                    )
+            num_taken = min(num_rows, batch_size - filled)
+
+            if filled == 0 and num_taken == batch_size:
+                cur_batch = [
+                    _batch_slice(c, self._batch_columns[j], 0, batch_size)
+                    for j, c in enumerate(chunk)
+                ]
+            else:
+                cur_batch = []
+                for j, c in enumerate(chunk):
+                    col = self._batch_columns[j]
+                    buf = self._get_batch_buffer(j, c, filled)
+                    _batch_slice(buf, col, filled, filled + num_taken)[...] = \
+                        _batch_slice(c, col, 0, num_taken)
+                    cur_batch.append(buf)
+            filled += num_taken
+
+            if num_taken < num_rows:
+                self._leftover = [
+                    _batch_slice(c, self._batch_columns[j], num_taken, num_rows)
+                    for j, c in enumerate(chunk)
+                ]
 
         start_time = time.time()
         try:
-            # Return data over the batch size back to queue
-            if cur_batch[0].shape[0] > 0 and cur_batch[0].shape[
-                first_batch_col
-            ] > self._batch_size:
-                leftover = []
-                trimmed_batch = []
-                for j, b in enumerate(cur_batch):
-                    [c, l] = np.split(
-                        b, [self._batch_size], axis=self._batch_columns[j]
-                    )
-                    leftover.append(l)
-                    trimmed_batch.append(c)
-                cur_batch = trimmed_batch
-                try:
-                    self._internal_queue.put(leftover, block=False)
-                except Queue.Full:
-                    pass
-
-                assert cur_batch[0].shape[first_batch_col] == self._batch_size
-
-            if data_input_coordinator.is_active():
+            if filled == batch_size and data_input_coordinator.is_active():
                 for b, q, c in zip(
                     self._input_blob_names, self._queues, cur_batch
                 ):
@@ -333,6 +374,33 @@ class BatchFeeder(State):
         finally:
             self._metrics.put_metric('enqueue_time', time.time() - start_time)
 
+    def _get_batch_buffer(self, j, chunk_elem, filled):
+        '''
+        Returns the preallocated batch buffer for the j-th input, (re)allocating
+        it when the batch size, trailing shape or dtype of the input changes.
+        '''
+        col = self._batch_columns[j]
+        shape = list(chunk_elem.shape)
+        shape[col] = self._batch_size
+        shape = tuple(shape)
+        buf = self._batch_buffers[j]
+        if buf is not None and buf.shape == shape:
+            if buf.dtype == chunk_elem.dtype or (
+                filled > 0 and
+                np.can_cast(chunk_elem.dtype, buf.dtype, casting='safe')
+            ):
+                return buf
+
+        dtype = chunk_elem.dtype
+        if buf is not None and filled > 0:
+            dtype = np.result_type(buf.dtype, dtype)
+        new_buf = np.empty(shape, dtype=dtype)
+        if filled > 0:
+            _batch_slice(new_buf, col, 0, filled)[...] = \
+                _batch_slice(buf, col, 0, filled)
+        self._batch_buffers[j] = new_buf
+        return new_buf
+
     def _init_scratch(self):
         self._scratch_blob = {}
         self._scratch_status = {}
@@ -356,6 +424,25 @@ class BatchFeeder(State):
                 device_option=self._device_option,
             )
 
+    def _create_enqueue_nets(self):
+        '''
+        Creates one net per input blob that moves its scratch blob into the
+        corresponding Caffe2 queue. The nets are instantiated once here so
+        that enqueueing a batch only needs to feed the scratch blob and run
+        the net by name.
+        '''
+        self._enqueue_nets = {}
+        for blob_name, q in zip(self._input_blob_names, self._queues):
+            scratch = self._scratch_blob[blob_name]
+            net = core.Net(str(scratch) + "_enqueue")
+            with core.DeviceScope(self._device_option):
+                net.SafeEnqueueBlobs(
+                    [q, scratch],
+                    [scratch, self._scratch_status[blob_name]],
+                )
+            workspace.CreateNet(net, overwrite=True)
+            self._enqueue_nets[blob_name] = net.Name()
+
     def _enqueue(self, blob_name, queue, data_arr):
         '''
         Enqueue the correctly sized batch arrays to Caffe2's queue.
@@ -365,14 +452,7 @@ class BatchFeeder(State):
             data_arr,
             device_option=self._device_option
         )
-
-        op = core.CreateOperator(
-            "SafeEnqueueBlobs",
-            [queue, self._scratch_blob[blob_name]],
-            [self._scratch_blob[blob_name], self._scratch_status[blob_name]],
-            device_option=self._device_option
-        )
-        workspace.RunOperatorOnce(op)
+        workspace.RunNet(self._enqueue_nets[blob_name])
 
     def _create_caffe2_queues(self, net):
         '''
@@ -471,9 +551,44 @@ class DataWorker(Worker):
             'fetcher_time', time.time() - self._start_time)
 
 
+class DataProcessWorker(ProcessWorker):
+    def __init__(
+        self,
+        coordinator,
+        worker_id,
+        worker_fun,
+        metrics,
+        batch_size,
+        batch_feeder,
+        shm_slot_bytes,
+    ):
+        ProcessWorker.__init__(
+            self, coordinator, worker_id, worker_fun, metrics,
+            worker_args=(worker_id, batch_size),
+            shm_slot_bytes=shm_slot_bytes,
+        )
+        self._batch_feeder = batch_feeder
+
+    def handle_result(self, input_data, elapsed):
+        self._metrics.put_metric('fetcher_time', elapsed)
+        self._batch_feeder.put(input_data, self._coordinator)
+
+    def finish(self):
+        pass
+
+
 global_coordinator = GlobalCoordinator()
 
 
+def _batch_slice(arr, axis, start, end):
+    '''
+    Returns a view of arr restricted to [start, end) along the given axis.
+    '''
+    index = [slice(None)] * arr.ndim
+    index[axis] = slice(start, end)
+    return arr[tuple(index)]
+
+
 def enqueuer(coordinator, batch_feeder):
     while coordinator.is_active():
         batch_feeder._enqueue_batch(coordinator)
@@ -91,6 +91,80 @@ class DataWorkersTest(unittest.TestCase):
         coordinator.stop_coordinator("unittest")
         self.assertEqual(coordinator._coordinators, [])
 
+    def testProcessWorkers(self):
+        workspace.ResetWorkspace()
+
+        model = model_helper.ModelHelper(name="process_test")
+        coordinator = data_workers.init_data_input_workers(
+            model,
+            ["process_data", "process_label"],
+            dummy_fetcher,
+            32,
+            2,
+            input_source_name="process_unittest",
+            use_processes=True,
+            shm_slot_bytes=64 * 1024,
+        )
+        coordinator.start()
+
+        workspace.RunNetOnce(model.param_init_net)
+        workspace.CreateNet(model.net)
+
+        for _i in range(50):
+            with timeout_guard.CompleteInTimeOrDie(5):
+                workspace.RunNet(model.net.Proto().name)
+
+            data = workspace.FetchBlob("process_data")
+            labels = workspace.FetchBlob("process_label")
+            self.assertEqual(data.shape, (32, 3))
+            self.assertEqual(labels.shape, (32,))
+            np.testing.assert_array_equal(labels, data[:, 0])
+
+        coordinator.stop_coordinator("process_unittest")
+        self.assertEqual(coordinator._coordinators, [])
+
+    def testRebatchKeepsOrder(self):
+        workspace.ResetWorkspace()
+        self.next_value = 0
+
+        def counting_fetcher(fetcher_id, batch_size):
+            # Chunks smaller and larger than the batch size
+            n = np.random.randint(80) + 1
+            values = np.arange(
+                self.next_value, self.next_value + n).astype(np.float32)
+            self.next_value += n
+            return [values.reshape(n, 1), values.astype(np.int64)]
+
+        model = model_helper.ModelHelper(name="rebatch_test")
+        coordinator = data_workers.init_data_input_workers(
+            model,
+            ["rebatch_data", "rebatch_label"],
+            counting_fetcher,
+            32,
+            1,
+            input_source_name="rebatch_unittest"
+        )
+        coordinator.start()
+
+        workspace.RunNetOnce(model.param_init_net)
+        workspace.CreateNet(model.net)
+
+        expected = 0
+        for _i in range(50):
+            with timeout_guard.CompleteInTimeOrDie(5):
+                workspace.RunNet(model.net.Proto().name)
+
+            data = workspace.FetchBlob("rebatch_data")
+            labels = workspace.FetchBlob("rebatch_label")
+            self.assertEqual(data.shape, (32, 1))
+            self.assertEqual(labels.dtype, np.int64)
+            np.testing.assert_array_equal(
+                labels, np.arange(expected, expected + 32))
+            np.testing.assert_array_equal(data[:, 0], labels)
+            expected += 32
+
+        coordinator.stop_coordinator("rebatch_unittest")
+
     def testRNNInput(self):
         workspace.ResetWorkspace()
         model = model_helper.ModelHelper(name="rnn_test")
@@ -25,7 +25,7 @@ from caffe2.python.schema import Struct, NewRecord, FeedRecord
 from caffe2.python.session import LocalSession
 from caffe2.python.task import TaskGroup, final_output, WorkspaceType
 from caffe2.python.test_util import TestCase
-from caffe2.python.cached_reader import CachedReader
+from caffe2.python.cached_reader import CachedReader, ChunkedCachedReader
 from caffe2.python import core, workspace
 from caffe2.python.net_builder import ops
 
@@ -295,3 +295,54 @@ class TestReaderWithLimit(TestCase):
             self.assertEqual(sorted(data), list(range(300)))
 
             shutil.rmtree(path)
+
+    def test_chunked_cached_reader(self):
+        ws = workspace.C.Workspace()
+        session = LocalSession(ws)
+
+        def build_source_reader(size):
+            src_ds = init_dataset(ws, size)
+            return src_ds.reader(batch_size=7)
+
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            path = f.name
+            f.close()
+            os.remove(path)
+
+            # Read data for the first time, chunks do not align with batches.
+            cached_reader1 = ChunkedCachedReader(
+                build_source_reader(100), batch_size=3, chunk_size=16,
+                prefetch_chunks=1)
+            init_step = cached_reader1.build_cache(path)
+            session.run(init_step)
+            self.assertFalse(os.path.exists(path + '.tmp'))
+
+            data = read_all_data(ws, cached_reader1, session)
+            self.assertEqual(sorted(data), list(range(100)))
+
+            # Read data from cache.
+            workspace.ResetWorkspace()
+            cached_reader2 = ChunkedCachedReader(
+                build_source_reader(200), batch_size=5, chunk_size=16)
+            init_step = cached_reader2.build_cache(path)
+            session.run(init_step)
+
+            data = read_all_data(ws, cached_reader2, session)
+            self.assertEqual(sorted(data), list(range(100)))
+
+            # Overwrite the cache, with a stale tmp dir from a failed build.
+            os.mkdir(path + '.tmp')
+            with open(os.path.join(path + '.tmp', 'LOCK'), 'w'):
+                pass
+            workspace.ResetWorkspace()
+            cached_reader3 = ChunkedCachedReader(
+                build_source_reader(300), batch_size=5, chunk_size=16)
+            init_step = cached_reader3.build_cache(path, overwrite=True)
+            session.run(init_step)
+            self.assertFalse(os.path.exists(path + '.tmp'))
+            self.assertFalse(os.path.exists(path + '.old'))
+
+            data = read_all_data(ws, cached_reader3, session)
+            self.assertEqual(sorted(data), list(range(300)))
+
+            shutil.rmtree(path)
@@ -35,6 +35,7 @@ from caffe2.python.dataio import Reader, Writer
 from caffe2.python.schema import (
     Struct, from_blob_list, from_column_list, InitEmptyRecord)
 import numpy as np
+import threading
 
 
 class _DatasetReader(Reader):
@@ -71,6 +72,95 @@ class _DatasetReader(Reader):
         net.ResetCursor([self.cursor], [])
 
 
+class _EpochShuffler(object):
+    """
+    Computes the order in which a random reader reads the dataset, like
+    SortAndShuffle: sorted by the given keys, shuffled within chunks of
+    batch_size * shuffle_size entries, then shuffled by batch. A new order is
+    used for every epoch, and the order of the next epoch is computed in a
+    background thread while the current epoch is read.
+    """
+
+    def __init__(self, batch_size, shuffle_size, loop_over,
+                 enforce_batch_size, seed=None):
+        self.batch_size = batch_size
+        self.shuffle_size = shuffle_size
+        self.loop_over = loop_over
+        self.enforce_batch_size = enforce_batch_size
+        self._rng = np.random.RandomState(seed)
+        self._lock = threading.Lock()
+        self._order = None
+        self._pos = 0
+        self._next_order = None
+        self._thread = None
+
+    def _compute_order(self, num_entries, keys):
+        if keys:
+            # lexsort sorts by its last key first
+            order = np.lexsort(keys[::-1])
+        else:
+            order = np.arange(num_entries)
+        chunk_size = self.batch_size * self.shuffle_size
+        if chunk_size > 1:
+            # shuffle within each chunk, keeping the chunks in sorted order
+            chunks = np.arange(num_entries) // chunk_size
+            order = order[np.lexsort((self._rng.rand(num_entries), chunks))]
+        num_batches = num_entries // self.batch_size
+        full_size = num_batches * self.batch_size
+        batches = order[:full_size].reshape(num_batches, self.batch_size)
+        batches = batches[self._rng.permutation(num_batches)]
+        if self.enforce_batch_size:
+            order = batches.reshape(-1)
+        else:
+            order = np.concatenate([batches.reshape(-1), order[full_size:]])
+        return order.astype(np.int64)
+
+    def _compute_next_order(self):
+        def compute():
+            self._next_order = self._compute_order(
+                self._num_entries, self._keys)
+        self._thread = threading.Thread(target=compute)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _start(self, inputs):
+        self._num_entries = inputs[0].data.shape[0]
+        self._keys = [np.array(key.data) for key in inputs[1:]]
+        for key in self._keys:
+            assert key.shape[0] == self._num_entries, (
+                'Can only sort by fields at the root level of the dataset.')
+        self._order = self._compute_order(self._num_entries, self._keys)
+        self._pos = 0
+        self._compute_next_order()
+
+    def _next_epoch(self):
+        self._thread.join()
+        self._order = self._next_order
+        self._pos = 0
+        self._compute_next_order()
+
+    def reset(self, inputs, outputs):
+        with self._lock:
+            if self._order is None:
+                return
+            if inputs[0].data.shape[0] != self._num_entries:
+                # the dataset changed, start over from its new content
+                self._thread.join()
+                self._order = None
+            else:
+                self._next_epoch()
+
+    def next_batch(self, inputs, outputs):
+        with self._lock:
+            if self._order is None:
+                self._start(inputs)
+            if self._pos >= len(self._order) and self.loop_over:
+                self._next_epoch()
+            batch = self._order[self._pos:self._pos + self.batch_size]
+            self._pos += self.batch_size
+        outputs[0].feed(batch)
+
+
 class _DatasetRandomReader(Reader):
     def __init__(self, dataset, name, indices, batch_size=1, loop_over=False,
                  enforce_batch_size=False):
@@ -83,6 +173,7 @@ class _DatasetRandomReader(Reader):
         self.batch_size = batch_size
         self.loop_over = loop_over
         self.enforce_batch_size = enforce_batch_size
+        self.shuffler = None
 
     def setup_ex(self, init_net, exit_net):
         if self.cursor is None:
@@ -93,6 +184,8 @@ class _DatasetRandomReader(Reader):
 
     def reset(self, net):
         net.ResetCursor([self.cursor], [])
+        if self.shuffler is not None:
+            net.Python(self.shuffler.reset)(self._shuffler_inputs(), [])
 
     def computeoffset(self, net):
         self.reset(net)
@@ -120,15 +213,59 @@ class _DatasetRandomReader(Reader):
             batch_size=batch_size)
         self.indices = indices
 
+    def sort_and_shuffle_ahead(self, sort_by_fields=None, shuffle_size=1,
+                               seed=None):
+        """
+        Like sort_and_shuffle, but reads the dataset in a new order at every
+        epoch. The orders are computed with numpy by the read net, the one of
+        the next epoch in a background thread while the current epoch is
+        read. A new epoch starts when the reader loops over or is reset.
+
+        Args:
+            sort_by_fields: names of root level fields to sort the entries
+                            by, e.g. the lengths of sequences to bucket them
+                            by length. The entries are sorted by the first
+                            field, then by the second one, and so on.
+            shuffle_size: the entries are shuffled within chunks of
+                          batch_size * shuffle_size entries, then by batch.
+            seed: seed of the random orders.
+        """
+        content = self.dataset.content()
+        self.sort_by_field_idx = []
+        for field in (sort_by_fields or []):
+            assert field in content.field_names(), (
+                'Must be valid field.')
+            self.sort_by_field_idx.append(content.field_names().index(field))
+        self.shuffler = _EpochShuffler(
+            self.batch_size, shuffle_size, self.loop_over,
+            self.enforce_batch_size, seed)
+
+    def _shuffler_inputs(self):
+        field_blobs = self.dataset.content().field_blobs()
+        return [field_blobs[0]] + [
+            field_blobs[i] for i in self.sort_by_field_idx]
+
     def read(self, read_net):
         with core.NameScope(read_net.NextName(self.name)):
+            if self.shuffler is not None:
+                # The shuffler gives the indices of the batch, which are all
+                # read at once.
+                indices = read_net.Python(self.shuffler.next_batch)(
+                    self._shuffler_inputs(),
+                    [core.ScopedBlobReference('batch_indices')])
+                loop_over = True
+                enforce_batch_size = False
+            else:
+                indices = self.indices
+                loop_over = self.loop_over
+                enforce_batch_size = self.enforce_batch_size
             fields = read_net.ReadRandomBatch(
-                [self.cursor, self.indices, self.offsets] + (
+                [self.cursor, indices, self.offsets] + (
                     self.dataset.content().field_blobs()),
                 self.dataset.content().field_names(),
                 batch_size=self.batch_size,
-                enforce_batch_size=self.enforce_batch_size,
-                loop_over=self.loop_over)
+                enforce_batch_size=enforce_batch_size,
+                loop_over=loop_over)
             return (read_net.IsEmpty([fields[0]]), fields)
 
 
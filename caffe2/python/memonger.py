@@ -24,6 +24,7 @@ import networkx as nx
 import collections
 import time
 import copy
+import numpy as np
 from caffe2.python import workspace, core
 from caffe2.proto import caffe2_pb2
 import enum
@@ -35,6 +36,19 @@ log = logging.getLogger("memonger")
 log.setLevel(logging.INFO)
 LiveRange = collections.namedtuple('LiveRange', ["defined", "used", "size"])
 
+_DATA_TYPE_NBYTES = {
+    caffe2_pb2.TensorProto.DOUBLE: 8,
+    caffe2_pb2.TensorProto.FLOAT: 4,
+    caffe2_pb2.TensorProto.FLOAT16: 2,
+    caffe2_pb2.TensorProto.INT32: 4,
+    caffe2_pb2.TensorProto.INT8: 1,
+    caffe2_pb2.TensorProto.UINT8: 1,
+    caffe2_pb2.TensorProto.UINT16: 2,
+    caffe2_pb2.TensorProto.INT16: 2,
+    caffe2_pb2.TensorProto.BOOL: 1,
+    caffe2_pb2.TensorProto.INT64: 8,
+}
+
 
 def share_grad_blobs(
     net,
@@ -121,7 +135,13 @@ def share_grad_blobs(
     return optim
 
 
-def optimize_inference_for_dag(net, input_blobs, namescope=""):
+def optimize_inference_for_dag(net, input_blobs, namescope="",
+                               blob_shapes=None):
+    '''
+    blob_shapes: optional {blob: dims} used to prefer reusing blobs of a
+                 matching size, e.g. the shapes returned by
+                 workspace.InferShapesAndTypes([net]).
+    '''
     netproto = copy.deepcopy(net.Proto())
     external_input = set(net.Proto().external_input)
     external_output = set(net.Proto().external_output)
@@ -156,7 +176,7 @@ def optimize_inference_for_dag(net, input_blobs, namescope=""):
         set(str(s).encode('utf-8') for s in activation_blobs),
         namescope.encode('utf-8'),
         set(),
-        {}
+        {} if blob_shapes is None else blob_shapes
     )
 
     log.info("Memonger memory optimization took {} secs".format(
@@ -186,19 +206,6 @@ def estimate_memory_usage(protos, shapes, types, devicescope):
 
     Returns (total, highwater, by op type) memory allocation in bytes.
     '''
-    sizeofs = {
-        caffe2_pb2.TensorProto.DOUBLE: 8,
-        caffe2_pb2.TensorProto.FLOAT: 4,
-        caffe2_pb2.TensorProto.FLOAT16: 2,
-        caffe2_pb2.TensorProto.INT32: 4,
-        caffe2_pb2.TensorProto.INT8: 1,
-        caffe2_pb2.TensorProto.UINT8: 1,
-        caffe2_pb2.TensorProto.UINT16: 2,
-        caffe2_pb2.TensorProto.INT16: 2,
-        caffe2_pb2.TensorProto.BOOL: 1,
-        caffe2_pb2.TensorProto.INT64: 8,
-    }
-
     def split_net(proto):
         ops = [op for op in proto.op if
                op.device_option == devicescope or op.type in {"Free", "Alias"}]
@@ -210,7 +217,7 @@ def estimate_memory_usage(protos, shapes, types, devicescope):
         if blob not in shapes or blob not in types:
             log.warning("Unknown blob encountered: {}".format(blob))
             return 0
-        sizeof = sizeofs[types[blob]]
+        sizeof = _DATA_TYPE_NBYTES[types[blob]]
         return sizeof * np.prod(shapes[blob])
 
     protos = [split_net(proto) for proto in protos]
@@ -550,32 +557,79 @@ def get_memory_usage(assignments):
     return ret
 
 
+class _AssignmentIndex(object):
+    '''
+    Keeps, for every assignment, the last use of its last blob and its max
+    blob size in NumPy arrays, so that the assignments a candidate range is
+    compatible with (see is_compatible()) can be found with vectorized
+    comparisons instead of a Python loop.
+    '''
+    def __init__(self, assignments):
+        self._count = 0
+        self._last_used = np.empty(max(len(assignments), 16))
+        self._max_size = np.empty(max(len(assignments), 16))
+        for assignment in assignments:
+            self.append(assignment[-1][1], _get_max_size(assignment))
+
+    @staticmethod
+    def _last_used_key(range_):
+        # Assignments ending with an incomplete range accept no candidate.
+        if range_.defined is None or range_.used is None:
+            return np.inf
+        return range_.used
+
+    def append(self, range_, max_size=None):
+        if self._count == len(self._last_used):
+            self._last_used = np.resize(self._last_used, 2 * self._count)
+            self._max_size = np.resize(self._max_size, 2 * self._count)
+        self._last_used[self._count] = self._last_used_key(range_)
+        if max_size is None:
+            max_size = range_.size or 0
+        self._max_size[self._count] = max_size
+        self._count += 1
+
+    def update(self, idx, range_):
+        self._last_used[idx] = self._last_used_key(range_)
+        self._max_size[idx] = max(self._max_size[idx], range_.size or 0)
+
+    def find_closest_size(self, range_):
+        '''
+        Returns the index of the first compatible assignment whose max size
+        is closest to the size of range_, or -1 if there is none.
+        '''
+        if self._count == 0 or range_.defined is None:
+            return -1
+        compatible = self._last_used[:self._count] < range_.defined
+        if not compatible.any():
+            return -1
+        dist = np.abs(self._max_size[:self._count] - (range_.size or 0))
+        dist[~compatible] = np.inf
+        return int(np.argmin(dist))
+
+
 def compute_assignments_greedy(ranges_sorted, init_assignments=None):
     assignments = init_assignments or []
     visited = {y[0] for x in assignments for y in x}
+    index = _AssignmentIndex(assignments)
 
     for (name, range_) in ranges_sorted:
         if name in visited:
             continue
-        assigned = False
-        best_assignment = 0
-        min_dist = float("inf")
-        candidate_size = range_.size or 0
-        for idx, assignment in enumerate(assignments):
-            if is_compatible(range_, assignment, []):
-                assigned = True
-                dist = abs(_get_max_size(assignment) - candidate_size)
-                if dist < min_dist:
-                    min_dist = dist
-                    best_assignment = idx
-        if assigned:
-            assignment = assignments[best_assignment]
-            assignment.append((name, range_))
+        best_assignment = index.find_closest_size(range_)
+        if best_assignment >= 0:
+            assignments[best_assignment].append((name, range_))
+            index.update(best_assignment, range_)
         else:
             assignments.append([(name, range_)])
+            index.append(range_)
     return assignments
 
 
+def _copy_assignments(assignments):
+    ''' Copies the assignment lists, ranges are immutable and shared '''
+    return [list(x) for x in assignments]
+
+
 def _get_count(assignments):
     ''' Return number of blobs in assignments '''
     if assignments:
@@ -612,23 +666,30 @@ def compute_assignments_dp(ranges_sorted, init_assignment, counter=None):
         where min{} gives the assignment with minimum memory usage.
     '''
 
-    def _get_compatible_prev(candidate_range, best_assignments, cur_idx):
+    def _get_last_used_bound(assignments):
+        ''' Returns the value a range's 'defined' has to exceed to be
+            compatible with all assignments in 'assignments'.
+        '''
+        bound = -np.inf
+        for x in assignments:
+            range_ = x[-1][1]
+            if range_.defined is None or range_.used is None:
+                return np.inf
+            bound = max(bound, range_.used)
+        return bound
+
+    def _get_compatible_prev(candidate_range, best_bounds, cur_idx):
         ''' Find closest position k of best_assignments that is independent of
             candidate_range that candiate_range is compatible with all assignments
-            in best_assignments[k].
+            in best_assignments[k], using the bounds of
+            _get_last_used_bound(best_assignments[k]) in 'best_bounds'.
             Return -1 if not found.
         '''
-        def is_compatible_all(candidate_range, assignments):
-            ''' return true if compatiable for all assignments in assignments '''
-            return all([is_compatible(candidate_range[1], x, []) for x in assignments])
-
-        ii = cur_idx - 1
-        while ii >= 0:
-            cba = best_assignments[ii]
-            if is_compatible_all(candidate_range, cba):
-                return ii
-            ii -= 1
-        return -1
+        if candidate_range[1].defined is None:
+            return -1
+        compatible = np.flatnonzero(
+            best_bounds[:cur_idx] < candidate_range[1].defined)
+        return int(compatible[-1]) if compatible.size else -1
 
     def _find_best(ranges, init_assignment, prev_best_assignment, counter):
         ''' Find the best assignment for blobs 'ranges' given an initialized
@@ -654,7 +715,7 @@ def compute_assignments_dp(ranges_sorted, init_assignment, counter=None):
         for ii in range(sz):
             if not is_compatible(find_range[1], init_assignment[ii], []):
                 continue
-            cur_best = copy.deepcopy(init_assignment)
+            cur_best = _copy_assignments(init_assignment)
             cur_best[ii].append(find_range)
             if len(ranges) > 1:
                 cur_best_tmp = [x for i, x in enumerate(cur_best) if i != ii]
@@ -681,12 +742,14 @@ def compute_assignments_dp(ranges_sorted, init_assignment, counter=None):
     init_assignment = init_assignment or []
     # best_assignments[k]: best assignments for first k blobs ranges_sorted[0:(k+1)]
     best_assignments = []
+    # best_bounds[k]: _get_last_used_bound(best_assignments[k])
+    best_bounds = np.empty(len(ranges_sorted))
     # Find best assignment for blobs ranges_sorted[0:ii]
     for ii, cur_range in enumerate(ranges_sorted):
         # closest best_assignment that is independent of ranges_sorted[ii]
-        prev_idx = _get_compatible_prev(cur_range, best_assignments, ii)
-        prev_best = copy.deepcopy(init_assignment) if prev_idx < 0 else \
-                    copy.deepcopy(best_assignments[prev_idx])
+        prev_idx = _get_compatible_prev(cur_range, best_bounds, ii)
+        prev_best = _copy_assignments(init_assignment) if prev_idx < 0 else \
+                    _copy_assignments(best_assignments[prev_idx])
         # Need to find best assignment for blobs in 'ranges_part'
         ranges_part = ranges_sorted[(prev_idx + 1):(ii + 1)]
         cur_best = _find_best(
@@ -694,7 +757,8 @@ def compute_assignments_dp(ranges_sorted, init_assignment, counter=None):
             best_assignments[-1] if best_assignments else init_assignment,
             counter)
         assert _get_count(cur_best) == _get_count(prev_best) + len(ranges_part)
-        best_assignments.append(copy.deepcopy(cur_best))
+        best_assignments.append(_copy_assignments(cur_best))
+        best_bounds[ii] = _get_last_used_bound(cur_best)
 
     assert len(best_assignments) == len(ranges_sorted)
 
@@ -710,7 +774,9 @@ def get_updated_ranges(ranges, max_live=None):
     '''
 
     def _get_max_live(ranges):
-        max_live = max(x[1].used for x in ranges if x[1].used) + 1
+        # LiveRange.used is 0 for the inputs of the first op
+        used = [x[1].used for x in ranges if x[1].used is not None]
+        max_live = max(used) + 1 if used else 0
         return max_live
 
     def _update_range(x, max_live, size):
@@ -782,14 +848,20 @@ def compute_interference_graph(ops):
     g = nx.DiGraph()
     for i, op in enumerate(ops):
         g.add_node(i, op=op)
-    for i, parent_op in enumerate(ops):
-        for j, child_op in enumerate(ops):
-            if i >= j:
-                continue
-            if any(output in child_op.input for output in parent_op.output):
-                deps = set(child_op.input).intersection(parent_op.output)
-                g.add_edge(i, j, deps=deps)
-                assert nx.is_directed_acyclic_graph(g), child_op
+    index = core.SSAIndex(caffe2_pb2.NetDef())
+    index.add_ops(ops)
+    for i, (_inputs, outputs) in enumerate(index.ssa):
+        # Every later op reading any version of an output of op i, starting
+        # from the version op i produces, depends on op i.
+        deps = collections.defaultdict(set)
+        for name, version in outputs:
+            for v in range(version, index.blob_versions[name] + 1):
+                for j in index.consumers.get((name, v), []):
+                    if j > i:
+                        deps[j].add(name)
+        for j in sorted(deps):
+            g.add_edge(i, j, deps=deps[j])
+    # Edges only go from earlier to later ops, so g is a DAG.
     return g
 
 
@@ -1003,3 +1075,125 @@ def collect_blob_sizes(net):
             blobs[blob] = blob_nbytes(blob)
 
     return blobs
+
+
+def infer_blob_sizes(nets, blob_dimensions=None):
+    '''
+    Returns {blob: nbytes} for the blobs of 'nets' (core.Net or NetDef),
+    using the shapes and types given by workspace.InferShapesAndTypes().
+    Shapes are inferred from the blobs in the current workspace unless
+    'blob_dimensions' is provided. Blobs whose shape or type could not be
+    inferred are left out.
+    '''
+    if not isinstance(nets, (list, tuple)):
+        nets = [nets]
+    nets = [n if isinstance(n, core.Net) else core.Net(n) for n in nets]
+    shapes, types = workspace.InferShapesAndTypes(nets, blob_dimensions)
+    blob_sizes = {}
+    for blob, dims in viewitems(shapes):
+        if types[blob] not in _DATA_TYPE_NBYTES:
+            continue
+        blob_sizes[blob] = _DATA_TYPE_NBYTES[types[blob]] * int(np.prod(dims))
+    return blob_sizes
+
+
+def _compute_live_nbytes(ranges):
+    ''' Peak of the total size of the blobs that are alive at the same time,
+        a lower bound of the memory any assignment of 'ranges' needs.
+    '''
+    if not ranges:
+        return 0
+    ranges = get_updated_ranges(list(viewitems(ranges)))
+    deltas = collections.defaultdict(int)
+    for _, range_ in ranges:
+        deltas[range_.defined] += range_.size
+        deltas[range_.used + 1] -= range_.size
+    live = 0
+    peak = 0
+    for step in sorted(deltas):
+        live += deltas[step]
+        peak = max(peak, live)
+    return peak
+
+
+MemoryPlan = collections.namedtuple(
+    'MemoryPlan', [
+        'optimization', 'blob_sizes', 'baseline_nbytes', 'predicted_nbytes',
+        'live_nbytes'])
+
+
+def plan_memory(net, static_blobs,
+                blob_sizes=None,
+                blob_dimensions=None,
+                ordering_function=topological_sort_traversal,
+                algo=AssignmentAlgorithm.GREEDY):
+    '''
+    Size aware version of optimize_interference(). If 'blob_sizes' is not
+    given, byte sizes are inferred with infer_blob_sizes(net,
+    blob_dimensions); blobs that shape inference can not handle fall back to
+    their current size in the workspace (0 if they do not exist yet).
+
+    Returns a MemoryPlan with the Optimization and the predicted bytes:
+    baseline_nbytes without sharing, predicted_nbytes of the assignments and
+    live_nbytes, the peak size of the blobs alive at the same time which no
+    assignment can go below.
+    '''
+    sizes = {}
+    if blob_sizes is None:
+        blob_sizes = infer_blob_sizes(net, blob_dimensions)
+    for op in net.op:
+        for blob in list(op.input) + list(op.output):
+            if blob in sizes:
+                continue
+            if blob in blob_sizes:
+                sizes[blob] = blob_sizes[blob]
+            elif workspace.HasBlob(blob):
+                sizes[blob] = blob_nbytes(blob)
+            else:
+                log.warning('Unknown size of blob {}'.format(blob))
+                sizes[blob] = 0
+
+    start_time = time.time()
+    optim = optimize_interference(
+        net, static_blobs,
+        ordering_function=ordering_function,
+        blob_sizes=sizes,
+        algo=algo)
+    ranges = {
+        blob: range_ for assignment in optim.assignments
+        for (blob, range_) in assignment}
+    plan = MemoryPlan(
+        optimization=optim,
+        blob_sizes=sizes,
+        baseline_nbytes=sum(viewvalues(sizes)),
+        predicted_nbytes=get_memory_usage(optim.assignments),
+        live_nbytes=_compute_live_nbytes(ranges))
+    log.info(
+        "Memory plan took {:.2f} secs, {} -> {} bytes "
+        "({} bytes alive at peak)".format(
+            time.time() - start_time, plan.baseline_nbytes,
+            plan.predicted_nbytes, plan.live_nbytes))
+    return plan
+
+
+PlanStatistics = collections.namedtuple(
+    'PlanStatistics', ['predicted_nbytes', 'achieved_nbytes'])
+
+
+def compute_plan_statistics(plan):
+    '''
+    Runs the optimized net of a plan_memory() plan in the current workspace
+    and compares the predicted bytes with the bytes of its distinct shared
+    blobs after the run. The inputs of the net must exist in the workspace.
+    '''
+    optim = plan.optimization
+    workspace.RunNetOnce(optim.net)
+    shared_blobs = set(
+        optim.blob_assignments.get(assignment[0][0], assignment[0][0])
+        for assignment in optim.assignments)
+    achieved_nbytes = sum(blob_nbytes(blob) for blob in shared_blobs)
+    log.info("Predicted {} bytes, achieved {} bytes".format(
+        plan.predicted_nbytes, achieved_nbytes))
+    return PlanStatistics(
+        predicted_nbytes=plan.predicted_nbytes,
+        achieved_nbytes=achieved_nbytes)
@@ -0,0 +1,137 @@
+# Copyright (c) 2016-present, Facebook, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+
+## @package memonger_benchmark
+# Module caffe2.python.memonger_benchmark
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from caffe2.proto import caffe2_pb2
+from caffe2.python import memonger
+
+import argparse
+import numpy as np
+import time
+
+import logging
+
+logging.basicConfig()
+log = logging.getLogger("memonger_benchmark")
+log.setLevel(logging.DEBUG)
+
+
+def generate_net(num_ops, max_skip, seed):
+    '''
+    Generates a synthetic NetDef where each op reads the previous activation
+    and one earlier activation (a skip connection), together with random
+    sizes for all the blobs.
+    '''
+    rng = np.random.RandomState(seed)
+    net = caffe2_pb2.NetDef()
+    net.name = "memonger_benchmark_{}".format(num_ops)
+    net.external_input.extend(["data"])
+    blob_sizes = {"data": int(rng.randint(1, 1 << 20))}
+    for i in range(num_ops):
+        op = net.op.add()
+        op.type = "Sum"
+        prev = "act_{}".format(i - 1) if i > 0 else "data"
+        skip = i - 1 - rng.randint(1, max_skip + 1)
+        op.input.extend([prev])
+        if skip >= 0:
+            op.input.extend(["act_{}".format(skip)])
+        output = "act_{}".format(i)
+        op.output.extend([output])
+        blob_sizes[output] = int(rng.randint(1, 1 << 20))
+    net.external_output.extend(["act_{}".format(num_ops - 1)])
+    return net, blob_sizes
+
+
+def Benchmark(args):
+    algos = {
+        "greedy": memonger.AssignmentAlgorithm.GREEDY,
+        "dp": memonger.AssignmentAlgorithm.DYNAMIC_PROGRAMMING,
+    }
+    for num_ops in args.num_ops:
+        net, blob_sizes = generate_net(num_ops, args.max_skip, args.seed)
+        unshared_bytes = sum(blob_sizes.values())
+        for algo_name in args.algo:
+            if algo_name == "dp" and num_ops > args.max_dp_ops:
+                continue
+            start_time = time.time()
+            optim = memonger.optimize_interference(
+                net,
+                ["data"],
+                blob_sizes=blob_sizes,
+                algo=algos[algo_name],
+            )
+            optim_time = time.time() - start_time
+            memonger.verify_assignments(optim.assignments)
+            peak_bytes = memonger.get_memory_usage(optim.assignments)
+            log.info(
+                "{} ops, {}: {:.2f} secs, {} blobs -> {} shared blobs, "
+                "{:.1f} MB -> {:.1f} MB".format(
+                    num_ops, algo_name, optim_time,
+                    len(blob_sizes), len(optim.assignments),
+                    unshared_bytes / 1e6, peak_bytes / 1e6,
+                )
+            )
+
+
+def GetArgumentParser():
+    parser = argparse.ArgumentParser(
+        description="Memonger blob assignment benchmark."
+    )
+
+    parser.add_argument(
+        "--num_ops",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Numbers of operators of the synthetic nets",
+    )
+    parser.add_argument(
+        "--algo",
+        type=str,
+        nargs="+",
+        default=["greedy", "dp"],
+        help="Assignment algorithms to run: 'greedy' and/or 'dp'",
+    )
+    parser.add_argument(
+        "--max_dp_ops",
+        type=int,
+        default=32,
+        help="Skip the dynamic programming algorithm for larger nets, its "
+        "running time is exponential in the number of overlapping blobs",
+    )
+    parser.add_argument(
+        "--max_skip",
+        type=int,
+        default=8,
+        help="Max distance of the skip connections",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed for the synthetic nets",
+    )
+    return parser
+
+
+if __name__ == '__main__':
+    args = GetArgumentParser().parse_args()
+    Benchmark(args)
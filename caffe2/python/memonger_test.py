@@ -639,6 +639,64 @@ class MemongerTest(hu.HypothesisTestCase):
         best = memonger.compute_assignments_dp(ranges_sorted, [])
         self.assertEqual(memonger.get_memory_usage(best), 11)
 
+    def test_plan_memory(self):
+        m = model_helper.ModelHelper()
+        fc1 = brew.fc(m, "data", "fc1", dim_in=8, dim_out=32)
+        fc2 = brew.fc(m, fc1, "fc2", dim_in=32, dim_out=4)
+        fc3 = brew.fc(m, fc2, "fc3", dim_in=4, dim_out=32)
+        brew.fc(m, fc3, "fc4", dim_in=32, dim_out=4)
+        m.net.Proto().external_output.extend(["fc4"])
+        static_blobs = \
+            [o for op in m.param_init_net.Proto().op for o in op.output] + \
+            ["data", "fc4"]
+
+        workspace.RunNetOnce(m.param_init_net)
+        workspace.FeedBlob("data", np.random.randn(16, 8).astype(np.float32))
+        plan = memonger.plan_memory(m.Proto(), static_blobs)
+        self.assertEqual(plan.blob_sizes["fc1"], 16 * 32 * 4)
+        self.assertEqual(plan.blob_sizes["fc2"], 16 * 4 * 4)
+        self.assertLess(plan.predicted_nbytes, plan.baseline_nbytes)
+        self.assertLessEqual(plan.live_nbytes, plan.predicted_nbytes)
+        # the large activations fc1 and fc3 share a blob
+        blob_assignments = plan.optimization.blob_assignments
+        self.assertEqual(
+            blob_assignments.get("fc1", "fc1"),
+            blob_assignments.get("fc3", "fc3"))
+
+        workspace.RunNetOnce(m.net)
+        fc4 = workspace.FetchBlob("fc4")
+        # runs the optimized net
+        stats = memonger.compute_plan_statistics(plan)
+        self.assertEqual(stats.predicted_nbytes, stats.achieved_nbytes)
+        np.testing.assert_almost_equal(fc4, workspace.FetchBlob("fc4"))
+
+    def test_plan_memory_all_static(self):
+        m = model_helper.ModelHelper()
+        brew.fc(m, "data", "fc1", dim_in=8, dim_out=4)
+        static_blobs = \
+            [o for op in m.param_init_net.Proto().op for o in op.output] + \
+            ["data", "fc1"]
+
+        workspace.RunNetOnce(m.param_init_net)
+        workspace.FeedBlob("data", np.random.randn(16, 8).astype(np.float32))
+        plan = memonger.plan_memory(m.Proto(), static_blobs)
+        self.assertEqual(plan.optimization.blob_assignments, {})
+        self.assertEqual(plan.predicted_nbytes, plan.baseline_nbytes)
+        self.assertEqual(plan.live_nbytes, plan.baseline_nbytes)
+        stats = memonger.compute_plan_statistics(plan)
+        self.assertEqual(stats.achieved_nbytes, plan.baseline_nbytes)
+
+    def test_compute_live_nbytes(self):
+        LiveRange = memonger.LiveRange
+        ranges = {
+            'b1': LiveRange(1, 3, 10),
+            'b2': LiveRange(3, 4, 1),
+            'b3': LiveRange(5, 6, 1),
+            'b4': LiveRange(5, 7, 10),
+        }
+        self.assertEqual(memonger._compute_live_nbytes(ranges), 11)
+        self.assertEqual(memonger._compute_live_nbytes({}), 0)
+
     @given(input_dim=st.integers(min_value=4, max_value=4),
            output_dim=st.integers(min_value=4, max_value=4),
            batch_size=st.integers(min_value=4, max_value=4))
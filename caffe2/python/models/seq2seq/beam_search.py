@@ -103,6 +103,28 @@ class BeamSearchForwardOnly(object):
     def get_timestep(self):
         return self.timestep
 
+    def _group_by_sentence(self, model, blob, output_name):
+        """
+        Reshapes [num_hypos, beam_size] blob of candidates per hypothesis to
+        [batch_size, beam_size * beam_size] candidates per sentence.
+        """
+        blob, _ = model.net.Reshape(
+            blob,
+            [output_name + '_3d', output_name + '_old_shape'],
+            shape=[self.beam_size, -1, self.beam_size],
+        )
+        blob = model.net.Transpose(
+            blob,
+            output_name + '_transposed',
+            axes=[1, 0, 2],
+        )
+        blob, _ = model.net.Reshape(
+            blob,
+            [output_name, output_name + '_transposed_old_shape'],
+            shape=[-1, self.beam_size * self.beam_size],
+        )
+        return blob
+
     # TODO: make attentions a generic state
     # data_dependencies is a list of blobs that the operator should wait for
     # before beginning execution. This ensures that ops are run in the correct
@@ -118,7 +140,76 @@ class BeamSearchForwardOnly(object):
         word_rewards=None,
         possible_translation_tokens=None,
         go_token_id=None,
+        batch_size=None,
     ):
+        """
+        Decodes batch_size sentences at once, batch_size being an int32 blob
+        of shape [1] (a single sentence if None). The hypotheses are laid out
+        hypothesis major: hypothesis k of sentence b is at k * batch_size + b,
+        as produced by tiling the encoder outputs beam_size times along the
+        batch axis. The outputs are of shape [num_steps + 1, num_hypos, ...],
+        and the previous indices refer to those positions.
+        """
+        if batch_size is None:
+            batch_size = self.model.param_init_net.ConstantFill(
+                [],
+                'beam_search_batch_size',
+                shape=[1],
+                value=1,
+                dtype=core.DataType.INT32,
+            )
+        BEAM_SIZE = self.model.param_init_net.ConstantFill(
+            [],
+            'beam_size',
+            shape=[1],
+            value=self.beam_size,
+            dtype=core.DataType.INT32,
+        )
+        num_hypos = self.model.net.Mul(
+            [batch_size, BEAM_SIZE],
+            'beam_search_num_hypos',
+        )
+        # [num_hypos]
+        hypo_ids = self.model.net.LengthsRangeFill(
+            num_hypos,
+            'beam_search_hypo_ids',
+        )
+        hypo_ids, _ = self.model.net.Reshape(
+            hypo_ids,
+            [hypo_ids, 'beam_search_hypo_ids_old_shape'],
+            shape=[-1, 1],
+        )
+        # [num_hypos, beam_size]
+        candidate_hypos = self.model.net.Tile(
+            hypo_ids,
+            'candidate_hypos_per_hypo',
+            tiles=self.beam_size,
+            axis=1,
+        )
+        # [batch_size * beam_size * beam_size], the hypothesis each candidate
+        # of the step extends
+        candidate_hypos = self._group_by_sentence(
+            self.model,
+            candidate_hypos,
+            'candidate_hypos_per_sentence',
+        )
+        self.candidate_hypos, _ = self.model.net.Reshape(
+            candidate_hypos,
+            ['candidate_hypos', 'candidate_hypos_old_shape'],
+            shape=[-1],
+        )
+        # [beam_size * beam_size], only keeps the candidates of the first
+        # hypothesis of each sentence
+        self.initial_step_mask = self.model.param_init_net.GivenTensorFill(
+            [],
+            'initial_step_mask',
+            shape=[self.beam_size * self.beam_size],
+            values=(
+                [0.0] * self.beam_size +
+                [-1e20] * (self.beam_size * (self.beam_size - 1))
+            ),
+        )
+
         ZERO = self.model.param_init_net.ConstantFill(
             [],
             'ZERO',
@@ -132,13 +223,6 @@ class BeamSearchForwardOnly(object):
         )
 
         if self.post_eos_penalty is not None:
-            eos_token = self.model.param_init_net.ConstantFill(
-                [],
-                'eos_token',
-                shape=[self.beam_size],
-                value=self.eos_token_id,
-                dtype=core.DataType.INT32,
-            )
             finished_penalty = self.model.param_init_net.ConstantFill(
                 [],
                 'finished_penalty',
@@ -167,6 +251,12 @@ class BeamSearchForwardOnly(object):
                 'tokens_t_flat_int',
                 to=core.DataType.INT32,
             )
+            eos_token = self.step_model.net.ConstantFill(
+                tokens_t_flat_int,
+                'eos_token',
+                value=self.eos_token_id,
+                dtype=core.DataType.INT32,
+            )
 
             predecessor_is_eos = self.step_model.net.EQ(
                 [tokens_t_flat_int, eos_token],
@@ -190,26 +280,26 @@ class BeamSearchForwardOnly(object):
                 axis=0,
             )
 
-        # [beam_size, beam_size]
+        # [num_hypos, beam_size]
         best_scores_per_hypo, best_tokens_per_hypo = self.step_model.net.TopK(
             log_probs,
             ['best_scores_per_hypo', 'best_tokens_per_hypo_indices'],
             k=self.beam_size,
         )
         if possible_translation_tokens:
-            # [beam_size, beam_size]
+            # [num_hypos, beam_size]
             best_tokens_per_hypo = self.step_model.net.Gather(
                 [possible_translation_tokens, best_tokens_per_hypo],
                 ['best_tokens_per_hypo']
             )
 
-        # [beam_size]
+        # [num_hypos]
         scores_t_prev_squeezed, _ = self.step_model.net.Reshape(
             self.scores_t_prev,
             ['scores_t_prev_squeezed', 'scores_t_prev_old_shape'],
-            shape=[self.beam_size],
+            shape=[-1],
         )
-        # [beam_size, beam_size]
+        # [num_hypos, beam_size]
         output_scores = self.step_model.net.Add(
             [best_scores_per_hypo, scores_t_prev_squeezed],
             'output_scores',
@@ -217,97 +307,119 @@ class BeamSearchForwardOnly(object):
             axis=0,
         )
         if word_rewards is not None:
-            # [beam_size, beam_size]
+            # [num_hypos, beam_size]
             word_rewards_for_best_tokens_per_hypo = self.step_model.net.Gather(
                 [word_rewards, best_tokens_per_hypo],
                 'word_rewards_for_best_tokens_per_hypo',
             )
-            # [beam_size, beam_size]
+            # [num_hypos, beam_size]
             output_scores = self.step_model.net.Add(
                 [output_scores, word_rewards_for_best_tokens_per_hypo],
                 'output_scores',
             )
-        # [beam_size * beam_size]
-        output_scores_flattened, _ = self.step_model.net.Reshape(
-            [output_scores],
-            [output_scores, 'output_scores_old_shape'],
-            shape=[-1],
+        # [batch_size, beam_size * beam_size]
+        output_scores_per_sentence = self._group_by_sentence(
+            self.step_model,
+            output_scores,
+            'output_scores_per_sentence',
         )
-        MINUS_ONE_INT32 = self.model.param_init_net.ConstantFill(
-            [],
-            'MINUS_ONE_INT32',
-            value=-1,
-            shape=[1],
-            dtype=core.DataType.INT32,
+        # current_beam_size (predecessor states from previous step)
+        # is 1 on first step (so only the candidates of the first hypothesis
+        # of each sentence are kept), and beam_size subsequently (so we need
+        # all beam_size * beam_size candidates)
+        on_initial_step_float = self.step_model.net.Cast(
+            on_initial_step,
+            'on_initial_step_float',
+            to=core.DataType.FLOAT,
         )
-        BEAM_SIZE = self.model.param_init_net.ConstantFill(
-            [],
-            'beam_size',
-            shape=[1],
-            value=self.beam_size,
-            dtype=core.DataType.INT32,
+        initial_step_mask = self.step_model.net.Mul(
+            [self.initial_step_mask, on_initial_step_float],
+            'initial_step_mask_t',
+            broadcast=1,
         )
-
-        # current_beam_size (predecessor states from previous step)
-        # is 1 on first step (so we just need beam_size scores),
-        # and beam_size subsequently (so we need all beam_size * beam_size
-        # scores)
-        slice_end = self.step_model.net.Conditional(
-            [on_initial_step, BEAM_SIZE, MINUS_ONE_INT32],
-            ['slice_end'],
+        output_scores_per_sentence = self.step_model.net.Add(
+            [output_scores_per_sentence, initial_step_mask],
+            'output_scores_per_sentence_masked',
+            broadcast=1,
+        )
+        # [batch_size * beam_size], indices into the flattened candidates
+        _, _, best_indices = self.step_model.net.TopK(
+            output_scores_per_sentence,
+            ['scores_t_per_sentence', 'best_indices', 'best_indices_flat'],
+            k=self.beam_size,
+        )
+        # [num_hypos], hypothesis k of sentence b at k * batch_size + b
+        best_indices, _ = self.step_model.net.Reshape(
+            best_indices,
+            [best_indices, 'best_indices_old_shape'],
+            shape=[-1, self.beam_size],
+        )
+        best_indices = self.step_model.net.Transpose(
+            best_indices,
+            'best_indices_transposed',
+        )
+        best_indices = self.step_model.net.FlattenToVec(
+            best_indices,
+            'best_indices_hypo_major',
         )
 
-        # [current_beam_size * beam_size]
-        output_scores_flattened_slice = self.step_model.net.Slice(
-            [output_scores_flattened, ZERO, slice_end],
-            'output_scores_flattened_slice',
-        )
-        # [1, current_beam_size * beam_size]
-        output_scores_flattened_slice, _ = self.step_model.net.Reshape(
-            output_scores_flattened_slice,
-            [
-                output_scores_flattened_slice,
-                'output_scores_flattened_slice_old_shape',
-            ],
-            shape=[1, -1],
+        output_scores_flattened, _ = self.step_model.net.Reshape(
+            output_scores_per_sentence,
+            ['output_scores_flattened', 'output_scores_flattened_old_shape'],
+            shape=[-1],
         )
-        # [1, beam_size]
-        scores_t, best_indices = self.step_model.net.TopK(
-            output_scores_flattened_slice,
-            ['scores_t', 'best_indices'],
-            k=self.beam_size,
+        scores_t = self.step_model.net.Gather(
+            [output_scores_flattened, best_indices],
+            'scores_t_flat',
         )
-        BEAM_SIZE_64 = self.model.param_init_net.Cast(
-            BEAM_SIZE,
-            'BEAM_SIZE_64',
-            to=core.DataType.INT64,
+        # [1, num_hypos]
+        scores_t, _ = self.step_model.net.Reshape(
+            scores_t,
+            ['scores_t', 'scores_t_old_shape'],
+            shape=[1, -1],
         )
-        # [1, beam_size]
-        hypo_t_int32 = self.step_model.net.Div(
-            [best_indices, BEAM_SIZE_64],
+        # [num_hypos]
+        hypo_t_int32 = self.step_model.net.Gather(
+            [self.candidate_hypos, best_indices],
             'hypo_t_int32',
-            broadcast=1,
         )
         hypo_t = self.step_model.net.Cast(
             hypo_t_int32,
-            'hypo_t',
+            'hypo_t_flat',
             to=core.DataType.FLOAT,
         )
+        # [1, num_hypos]
+        hypo_t, _ = self.step_model.net.Reshape(
+            hypo_t,
+            ['hypo_t', 'hypo_t_old_shape'],
+            shape=[1, -1],
+        )
 
-        # [beam_size, encoder_length, 1]
+        # [num_hypos, encoder_length, 1]
         attention_t = self.step_model.net.Gather(
             [attentions, hypo_t_int32],
             'attention_t',
         )
-        # [1, beam_size, encoder_length]
+        # [num_hypos, encoder_length]
         attention_t, _ = self.step_model.net.Reshape(
             attention_t,
             [attention_t, 'attention_t_old_shape'],
-            shape=[1, self.beam_size, -1],
+            shape=[0, -1],
         )
-        # [beam_size * beam_size]
-        best_tokens_per_hypo_flatten, _ = self.step_model.net.Reshape(
+        # [1, num_hypos, encoder_length]
+        attention_t = self.step_model.net.ExpandDims(
+            attention_t,
+            'attention_t_expanded',
+            dims=[0],
+        )
+        # [batch_size * beam_size * beam_size]
+        best_tokens_per_sentence = self._group_by_sentence(
+            self.step_model,
             best_tokens_per_hypo,
+            'best_tokens_per_sentence',
+        )
+        best_tokens_per_hypo_flatten, _ = self.step_model.net.Reshape(
+            best_tokens_per_sentence,
             [
                 'best_tokens_per_hypo_flatten',
                 'best_tokens_per_hypo_old_shape',
@@ -320,18 +432,21 @@ class BeamSearchForwardOnly(object):
         )
         tokens_t = self.step_model.net.Cast(
             tokens_t_int32,
-            'tokens_t',
+            'tokens_t_flat',
             to=core.DataType.FLOAT,
         )
+        # [1, num_hypos]
+        tokens_t, _ = self.step_model.net.Reshape(
+            tokens_t,
+            ['tokens_t', 'tokens_t_old_shape'],
+            shape=[1, -1],
+        )
 
         def choose_state_per_hypo(state_config):
-            state_flattened, _ = self.step_model.net.Reshape(
+            state_flattened = self.step_model.net.Squeeze(
                 state_config.state_link.blob,
-                [
-                    state_config.state_link.blob,
-                    state_config.state_link.blob + '_old_shape',
-                ],
-                shape=[self.beam_size, -1],
+                str(state_config.state_link.blob) + '_squeezed',
+                dims=[0],
             )
             state_chosen_per_hypo = self.step_model.net.Gather(
                 [state_flattened, hypo_t_int32],
@@ -375,17 +490,18 @@ class BeamSearchForwardOnly(object):
             value=0.0,
             dtype=core.DataType.FLOAT,
         )
-        encoder_inputs_flattened, _ = self.model.net.Reshape(
-            inputs,
-            ['encoder_inputs_flattened', 'encoder_inputs_old_shape'],
-            shape=[-1],
-        )
+        # [encoder_length, batch_size]
         init_attention = self.model.net.ConstantFill(
-            encoder_inputs_flattened,
-            'init_attention',
+            inputs,
+            'init_attention_per_sentence',
             value=0.0,
             dtype=core.DataType.FLOAT,
         )
+        # [encoder_length]
+        init_attention = self.model.net.ReduceBackSum(
+            init_attention,
+            'init_attention',
+        )
         state_configs = state_configs + [
             self.StateConfig(
                 initial_value=initial_scores,
@@ -410,16 +526,24 @@ class BeamSearchForwardOnly(object):
         ]
         fake_input = self.model.net.ConstantFill(
             length,
-            'beam_search_fake_input',
+            'beam_search_fake_input_per_sentence',
             input_as_shape=True,
             extra_shape=[self.beam_size, 1],
             value=0.0,
             dtype=core.DataType.FLOAT,
         )
+        # [length, num_hypos, 1]
+        fake_input = self.model.net.Tile(
+            [fake_input, batch_size],
+            'beam_search_fake_input',
+            axis=1,
+        )
         all_inputs = (
             [fake_input] +
             self.step_model.params +
             [state_config.initial_value for state_config in state_configs] +
+            # computed by model.net and read by every step
+            [self.candidate_hypos] +
             data_dependencies
         )
         forward_links = []
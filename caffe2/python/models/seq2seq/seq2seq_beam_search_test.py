@@ -151,6 +151,74 @@ class Seq2SeqBeamSearchTest(test_util.TestCase):
                 decimal=4,
             )
 
+    def test_decode_batch(self):
+        model_params = dict(
+            attention='regular',
+            decoder_layer_configs=[
+                dict(
+                    num_units=32,
+                ),
+            ],
+            encoder_type=dict(
+                encoder_layer_configs=[
+                    dict(
+                        num_units=16,
+                    ),
+                ],
+                use_bidirectional_encoder=True,
+            ),
+            encoder_embedding_size=8,
+            decoder_embedding_size=8,
+            decoder_softmax_size=None,
+        )
+        tmp_dir = tempfile.mkdtemp()
+        _, checkpoint_path = self._build_seq2seq_model(
+            model_params,
+            tmp_dir=tmp_dir,
+        )
+        translate_params = dict(
+            ensemble_models=[dict(
+                source_vocab={i: str(i) for i in range(20)},
+                target_vocab={i: str(i) for i in range(20)},
+                model_params=model_params,
+                model_file=checkpoint_path,
+            )],
+            decoding_params=dict(
+                beam_size=3,
+                word_reward=0,
+                unk_reward=0,
+            ),
+        )
+        beam_decoder_model = Seq2SeqModelCaffe2EnsembleDecoder(translate_params)
+        beam_decoder_model.load_models()
+
+        encoder_inputs = [
+            np.random.random_integers(low=3, high=19, size=length)
+            for length in [5, 2, 7, 4]
+        ]
+        max_output_seq_lens = [2 * len(x) + 1 for x in encoder_inputs]
+        translations = beam_decoder_model.decode_batch(
+            encoder_inputs,
+            max_output_seq_lens,
+        )
+        self.assertEqual(len(translations), len(encoder_inputs))
+        for x, max_output_seq_len, translation in zip(
+            encoder_inputs,
+            max_output_seq_lens,
+            translations,
+        ):
+            targets, attention_weights, score = beam_decoder_model.decode(
+                x,
+                max_output_seq_len,
+            )
+            self.assertEqual(targets, translation[0])
+            np.testing.assert_array_almost_equal(
+                np.array(attention_weights),
+                np.array(translation[1]),
+                decimal=4,
+            )
+            np.testing.assert_almost_equal(score, translation[2], decimal=4)
+
     def test_attention(self):
         model_params = dict(
             attention='regular',
@@ -0,0 +1,172 @@
+# Copyright (c) 2016-present, Facebook, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+import os
+import random
+import shutil
+import tempfile
+
+from caffe2.python import test_util
+import caffe2.python.models.seq2seq.seq2seq_util as seq2seq_util
+from caffe2.python.models.seq2seq.train import (
+    Seq2SeqModelCaffe2,
+    StreamingBatchFetcher,
+    gen_batches,
+    gen_streaming_batches,
+    prepare_batch,
+)
+
+
+class Seq2SeqTrainTest(test_util.TestCase):
+
+    def _write_corpora(self, tmp_dir, num_sentences, seed=0):
+        rng = random.Random(seed)
+        source_path = os.path.join(tmp_dir, 'source')
+        target_path = os.path.join(tmp_dir, 'target')
+        with open(source_path, 'w') as source, \
+                open(target_path, 'w') as target:
+            for _ in range(num_sentences):
+                for f in [source, target]:
+                    f.write(' '.join(
+                        'w{}'.format(rng.randint(0, 9))
+                        for _ in range(rng.randint(1, 8))
+                    ) + '\n')
+        return source_path, target_path
+
+    def test_prepare_batch(self):
+        batch = prepare_batch([([5, 6, 7], [8]), ([9], [10, 11])])
+        np.testing.assert_array_equal(
+            batch.encoder_inputs,
+            np.array([[7, 6, 5], [9, 0, 0]]).transpose(),
+        )
+        np.testing.assert_array_equal(batch.encoder_lengths, [3, 1])
+        np.testing.assert_array_equal(
+            batch.decoder_inputs,
+            np.array([[1, 8, 0], [1, 10, 11]]).transpose(),
+        )
+        np.testing.assert_array_equal(batch.decoder_lengths, [2, 3])
+        np.testing.assert_array_equal(
+            batch.targets,
+            np.array([[8, 2, 0], [10, 11, 2]]).transpose(),
+        )
+        np.testing.assert_array_equal(
+            batch.target_weights,
+            np.array([[1, 1, 0], [1, 1, 1]]).transpose(),
+        )
+        self.assertEqual(batch.encoder_inputs.dtype, np.int32)
+        self.assertEqual(batch.target_weights.dtype, np.float32)
+
+    def test_gen_streaming_batches(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            source_path, target_path = self._write_corpora(tmp_dir, 100)
+            vocab = seq2seq_util.gen_vocab(source_path, 0)
+
+            batches = gen_batches(
+                source_path, target_path, vocab, vocab,
+                batch_size=4, max_length=6)
+            streaming_batches = list(gen_streaming_batches(
+                source_path, target_path, vocab, vocab,
+                batch_size=4, max_length=6, window_batches=3))
+
+            # The last batch of the corpora (gen_batches) and of the last
+            # window (gen_streaming_batches) are padded with different pairs,
+            # so the padding duplicates are left out of the comparison.
+            def sentence_pairs(batches):
+                return set(
+                    (tuple(s), tuple(t))
+                    for batch in batches for s, t in batch)
+
+            self.assertEqual(
+                sentence_pairs(batches), sentence_pairs(streaming_batches))
+            self.assertTrue(all(len(b) == 4 for b in streaming_batches))
+            # Windows are bucketed by length
+            for i in range(0, len(streaming_batches), 3):
+                source_lengths = sorted(
+                    [len(s) for s, _ in batch]
+                    for batch in streaming_batches[i:i + 3]
+                )
+                lengths = sum(source_lengths, [])
+                self.assertEqual(lengths, sorted(lengths))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_streaming_training(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            source_path, target_path = self._write_corpora(tmp_dir, 30)
+            vocab = seq2seq_util.gen_vocab(source_path, 0)
+            batch_size = 2
+            model_params = dict(
+                attention='regular',
+                decoder_layer_configs=[
+                    dict(
+                        num_units=32,
+                    ),
+                ],
+                encoder_type=dict(
+                    encoder_layer_configs=[
+                        dict(
+                            num_units=16,
+                        ),
+                    ],
+                    use_bidirectional_encoder=True,
+                ),
+                encoder_embedding_size=8,
+                decoder_embedding_size=8,
+                decoder_softmax_size=None,
+                batch_size=batch_size,
+                optimizer_params=dict(
+                    learning_rate=0.1,
+                ),
+                max_gradient_norm=1.0,
+            )
+            batches = gen_batches(
+                source_path, target_path, vocab, vocab,
+                batch_size=batch_size, max_length=None)
+            fetcher = StreamingBatchFetcher(lambda: gen_streaming_batches(
+                source_path, target_path, vocab, vocab,
+                batch_size=batch_size, max_length=None, window_batches=2))
+
+            with Seq2SeqModelCaffe2(
+                model_params,
+                len(vocab),
+                len(vocab),
+                num_gpus=0,
+                train_batch_fetcher=fetcher,
+            ) as model_obj:
+                model_obj.initialize_from_scratch()
+                for i in range(2):
+                    num_steps = 0
+                    for batch in fetcher.epoch(i):
+                        loss = model_obj.step(
+                            batch=batch, forward_only=False)
+                        self.assertTrue(np.isfinite(loss))
+                        num_steps += 1
+                    self.assertEqual(num_steps, len(batches))
+                    # Eval batches are still fed directly
+                    loss = model_obj.step(
+                        batch=batches[0], forward_only=True)
+                    self.assertTrue(np.isfinite(loss))
+                self.assertEqual(
+                    model_obj.get_current_step(), 2 * len(batches))
+        finally:
+            shutil.rmtree(tmp_dir)
@@ -26,12 +26,13 @@ import logging
 import math
 import numpy as np
 import random
+import threading
 import time
 import sys
 import os
 
 import caffe2.proto.caffe2_pb2 as caffe2_pb2
-from caffe2.python import core, workspace, data_parallel_model
+from caffe2.python import core, workspace, data_parallel_model, data_workers
 import caffe2.python.models.seq2seq.seq2seq_util as seq2seq_util
 from caffe2.python.models.seq2seq.seq2seq_model_helper import Seq2SeqModelHelper
 
@@ -50,64 +51,63 @@ Batch = collections.namedtuple('Batch', [
 ])
 
 
-def prepare_batch(batch):
-    encoder_lengths = [len(entry[0]) for entry in batch]
-    max_encoder_length = max(encoder_lengths)
-    decoder_lengths = []
-    max_decoder_length = max([len(entry[1]) for entry in batch])
-
-    batch_encoder_inputs = []
-    batch_decoder_inputs = []
-    batch_targets = []
-    batch_target_weights = []
-
-    for source_seq, target_seq in batch:
-        encoder_pads = (
-            [seq2seq_util.PAD_ID] * (max_encoder_length - len(source_seq))
-        )
-        batch_encoder_inputs.append(
-            list(reversed(source_seq)) + encoder_pads
-        )
+def _pad_sequences(sequences, lengths, width, reverse=False):
+    """
+    Returns [len(sequences), width] int32 array with the sequences, reversed
+    if requested, followed by PAD_ID.
+    """
+    padded = np.full(
+        (len(sequences), width),
+        seq2seq_util.PAD_ID,
+        dtype=np.int32,
+    )
+    mask = np.arange(width) < lengths[:, np.newaxis]
+    values = np.concatenate(
+        [np.asarray(s, dtype=np.int32) for s in sequences])
+    if reverse:
+        # Reversing the rows as well as the values fills each row backwards
+        padded[::-1][mask[::-1]] = values[::-1]
+    else:
+        padded[mask] = values
+    return padded
 
-        decoder_pads = (
-            [seq2seq_util.PAD_ID] * (max_decoder_length - len(target_seq))
-        )
-        target_seq_with_go_token = [seq2seq_util.GO_ID] + target_seq
-        decoder_lengths.append(len(target_seq_with_go_token))
-        batch_decoder_inputs.append(target_seq_with_go_token + decoder_pads)
 
-        target_seq_with_eos = target_seq + [seq2seq_util.EOS_ID]
-        targets = target_seq_with_eos + decoder_pads
-        batch_targets.append(targets)
+def prepare_batch(batch):
+    source_seqs = [entry[0] for entry in batch]
+    target_seqs = [entry[1] for entry in batch]
+    encoder_lengths = np.array([len(s) for s in source_seqs], dtype=np.int32)
+    target_lengths = np.array([len(t) for t in target_seqs], dtype=np.int32)
+    max_encoder_length = encoder_lengths.max()
+    max_decoder_length = target_lengths.max()
+
+    batch_encoder_inputs = _pad_sequences(
+        source_seqs,
+        encoder_lengths,
+        max_encoder_length,
+        reverse=True,
+    )
+    batch_targets = _pad_sequences(
+        target_seqs,
+        target_lengths,
+        max_decoder_length + 1,
+    )
+    batch_decoder_inputs = np.empty_like(batch_targets)
+    batch_decoder_inputs[:, 0] = seq2seq_util.GO_ID
+    batch_decoder_inputs[:, 1:] = batch_targets[:, :-1]
+    batch_targets[np.arange(len(batch)), target_lengths] = seq2seq_util.EOS_ID
 
-        if len(source_seq) + len(target_seq) == 0:
-            target_weights = [0] * len(targets)
-        else:
-            target_weights = [
-                1 if target != seq2seq_util.PAD_ID else 0
-                for target in targets
-            ]
-        batch_target_weights.append(target_weights)
+    batch_target_weights = (
+        batch_targets != seq2seq_util.PAD_ID
+    ).astype(np.float32)
+    batch_target_weights[encoder_lengths + target_lengths == 0] = 0
 
     return Batch(
-        encoder_inputs=np.array(
-            batch_encoder_inputs,
-            dtype=np.int32,
-        ).transpose(),
-        encoder_lengths=np.array(encoder_lengths, dtype=np.int32),
-        decoder_inputs=np.array(
-            batch_decoder_inputs,
-            dtype=np.int32,
-        ).transpose(),
-        decoder_lengths=np.array(decoder_lengths, dtype=np.int32),
-        targets=np.array(
-            batch_targets,
-            dtype=np.int32,
-        ).transpose(),
-        target_weights=np.array(
-            batch_target_weights,
-            dtype=np.float32,
-        ).transpose(),
+        encoder_inputs=batch_encoder_inputs.transpose(),
+        encoder_lengths=encoder_lengths,
+        decoder_inputs=batch_decoder_inputs.transpose(),
+        decoder_lengths=target_lengths + 1,
+        targets=batch_targets.transpose(),
+        target_weights=batch_target_weights.transpose(),
     )
 
 
@@ -126,6 +126,12 @@ class Seq2SeqModelCaffe2(object):
         self._build_embeddings(forward_model)
 
         if self.num_gpus == 0:
+            self._build_data_input(model, 'train', self.train_batch_fetcher)
+            self._build_data_input(
+                forward_model,
+                'eval',
+                self.eval_batch_fetcher,
+            )
             loss_blobs = self.model_build_fun(model)
             model.AddGradientOperators(loss_blobs)
             self.norm_clipped_grad_update(
@@ -136,6 +142,10 @@ class Seq2SeqModelCaffe2(object):
 
         else:
             assert (self.batch_size % self.num_gpus) == 0
+            assert (
+                self.train_batch_fetcher is None and
+                self.eval_batch_fetcher is None
+            ), 'Batch fetchers are only supported on CPU'
 
             data_parallel_model.Parallelize_GPU(
                 forward_model,
@@ -165,6 +175,21 @@ class Seq2SeqModelCaffe2(object):
         self.model = model
         self.forward_net = forward_model.net
 
+    def _build_data_input(self, model, input_source_name, batch_fetcher):
+        if batch_fetcher is None:
+            return
+        self.data_coordinator = data_workers.init_data_input_workers(
+            model.net,
+            list(Batch._fields),
+            batch_fetcher,
+            batch_size=self.batch_size,
+            # A single fetcher keeps the batches in order
+            num_worker_threads=1,
+            input_source_name=input_source_name,
+            max_buffered_batches=self.max_buffered_batches,
+            dont_rebatch=True,
+        )
+
     def _build_shared(self, model):
         optimizer_params = self.model_params['optimizer_params']
         with core.DeviceScope(core.DeviceOption(caffe2_pb2.CPU)):
@@ -486,7 +511,16 @@ class Seq2SeqModelCaffe2(object):
         target_vocab_size,
         num_gpus=1,
         num_cpus=1,
+        train_batch_fetcher=None,
+        eval_batch_fetcher=None,
+        max_buffered_batches=100,
     ):
+        """
+        If train_batch_fetcher (eval_batch_fetcher) is set, the training
+        (eval) batches are prepared and fed by data workers calling it,
+        typically a StreamingBatchFetcher, and step() is called with
+        batch=None.
+        """
         self.model_params = model_params
         self.encoder_type = 'rnn'
         self.encoder_params = model_params['encoder_type']
@@ -495,6 +529,10 @@ class Seq2SeqModelCaffe2(object):
         self.num_gpus = num_gpus
         self.num_cpus = num_cpus
         self.batch_size = model_params['batch_size']
+        self.train_batch_fetcher = train_batch_fetcher
+        self.eval_batch_fetcher = eval_batch_fetcher
+        self.max_buffered_batches = max_buffered_batches
+        self.data_coordinator = None
 
         workspace.GlobalInit([
             'caffe2',
@@ -511,12 +549,16 @@ class Seq2SeqModelCaffe2(object):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        if self.data_coordinator is not None:
+            self.data_coordinator.stop()
         workspace.ResetWorkspace()
 
     def initialize_from_scratch(self):
         logger.info('Initializing Seq2SeqModelCaffe2 from scratch: Start')
         self._build_model(init_params=True)
         self._init_model()
+        if self.data_coordinator is not None:
+            self.data_coordinator.start()
         logger.info('Initializing Seq2SeqModelCaffe2 from scratch: Finish')
 
     def get_current_step(self):
@@ -533,7 +575,10 @@ class Seq2SeqModelCaffe2(object):
         batch,
         forward_only
     ):
-        if self.num_gpus < 1:
+        if batch is None:
+            # Fed by the data workers
+            pass
+        elif self.num_gpus < 1:
             batch_obj = prepare_batch(batch)
             for batch_obj_name, batch_obj_value in zip(
                 Batch._fields,
@@ -591,10 +636,10 @@ class Seq2SeqModelCaffe2(object):
 
         return checkpoint_path
 
-def gen_batches(source_corpus, target_corpus, source_vocab, target_vocab,
-                batch_size, max_length):
+
+def _gen_parallel_sentences(source_corpus, target_corpus, source_vocab,
+                            target_vocab, max_length):
     with open(source_corpus) as source, open(target_corpus) as target:
-        parallel_sentences = []
         for source_sentence, target_sentence in zip(source, target):
             numerized_source_sentence = seq2seq_util.get_numberized_sentence(
                 source_sentence,
@@ -614,10 +659,13 @@ def gen_batches(source_corpus, target_corpus, source_vocab, target_vocab,
                     )
                 )
             ):
-                parallel_sentences.append((
+                yield (
                     numerized_source_sentence,
                     numerized_target_sentence,
-                ))
+                )
+
+
+def _bucket_by_length(parallel_sentences, batch_size):
     parallel_sentences.sort(key=lambda s_t: (len(s_t[0]), len(s_t[1])))
 
     batches, batch = [], []
@@ -635,6 +683,118 @@ def gen_batches(source_corpus, target_corpus, source_vocab, target_vocab,
     return batches
 
 
+def gen_batches(source_corpus, target_corpus, source_vocab, target_vocab,
+                batch_size, max_length):
+    parallel_sentences = list(_gen_parallel_sentences(
+        source_corpus,
+        target_corpus,
+        source_vocab,
+        target_vocab,
+        max_length,
+    ))
+    return _bucket_by_length(parallel_sentences, batch_size)
+
+
+def gen_streaming_batches(source_corpus, target_corpus, source_vocab,
+                          target_vocab, batch_size, max_length,
+                          window_batches=100):
+    """
+    Yields the batches of one pass over the corpora, reading them by windows
+    of window_batches * batch_size sentence pairs. Each window is bucketed by
+    length and shuffled like gen_batches does for the whole corpora, so that
+    only one window is held in memory.
+    """
+    window = []
+    for sentence_pair in _gen_parallel_sentences(
+        source_corpus,
+        target_corpus,
+        source_vocab,
+        target_vocab,
+        max_length,
+    ):
+        window.append(sentence_pair)
+        if len(window) >= window_batches * batch_size:
+            for batch in _bucket_by_length(window, batch_size):
+                yield batch
+            window = []
+    if len(window) > 0:
+        for batch in _bucket_by_length(window, batch_size):
+            yield batch
+
+
+class StreamingBatchFetcher(object):
+    """
+    Fetch function for data_workers, which prepares the batches of
+    gen_batches_fun(), called once per epoch, one epoch after the other:
+
+        fetcher = StreamingBatchFetcher(lambda: gen_streaming_batches(...))
+        model_obj = Seq2SeqModelCaffe2(..., train_batch_fetcher=fetcher)
+        for batch in fetcher.epoch(i):
+            model_obj.step(batch, forward_only=False)
+
+    The number of batches of an epoch is only known once the fetcher has
+    reached its end, epoch() waits for the fetcher when needed.
+    """
+
+    def __init__(self, gen_batches_fun):
+        self._gen_batches_fun = gen_batches_fun
+        self._batches = None
+        self._num_batches = 0
+        self._epoch_sizes = []
+        self._error = None
+        self._cv = threading.Condition()
+
+    def __call__(self, worker_id, batch_size):
+        try:
+            while True:
+                if self._batches is None:
+                    self._batches = iter(self._gen_batches_fun())
+                try:
+                    batch = next(self._batches)
+                except StopIteration:
+                    assert self._num_batches > 0, 'Epoch without batches'
+                    self._batches = None
+                    with self._cv:
+                        self._epoch_sizes.append(self._num_batches)
+                        self._num_batches = 0
+                        self._cv.notify_all()
+                    continue
+                batch_obj = prepare_batch(batch)
+                with self._cv:
+                    self._num_batches += 1
+                    self._cv.notify_all()
+                return list(batch_obj)
+        except Exception as e:
+            with self._cv:
+                self._error = e
+                self._cv.notify_all()
+            raise
+
+    def _has_batch(self, epoch, index):
+        with self._cv:
+            while True:
+                if self._error is not None:
+                    raise self._error
+                if epoch < len(self._epoch_sizes):
+                    return index < self._epoch_sizes[epoch]
+                if (
+                    epoch == len(self._epoch_sizes) and
+                    index < self._num_batches
+                ):
+                    return True
+                self._cv.wait()
+
+    def epoch(self, epoch):
+        """
+        Yields None for each batch of the epoch, batches are fed by the data
+        workers.
+        """
+        index = 0
+        while self._has_batch(epoch, index):
+            yield None
+            index += 1
+
+
 def run_seq2seq_model(args, model_params=None):
     source_vocab = seq2seq_util.gen_vocab(
         args.source_corpus,
@@ -647,15 +807,39 @@ def run_seq2seq_model(args, model_params=None):
     logger.info('Source vocab size {}'.format(len(source_vocab)))
     logger.info('Target vocab size {}'.format(len(target_vocab)))
 
-    batches = gen_batches(args.source_corpus, args.target_corpus, source_vocab,
-                          target_vocab, model_params['batch_size'],
-                          args.max_length)
-    logger.info('Number of training batches {}'.format(len(batches)))
-
-    batches_eval = gen_batches(args.source_corpus_eval, args.target_corpus_eval,
-                               source_vocab, target_vocab,
-                               model_params['batch_size'], args.max_length)
-    logger.info('Number of eval batches {}'.format(len(batches_eval)))
+    if args.streaming:
+        def gen_batches_fun(source_corpus, target_corpus):
+            return lambda: gen_streaming_batches(
+                source_corpus, target_corpus, source_vocab, target_vocab,
+                model_params['batch_size'], args.max_length,
+                window_batches=args.window_batches)
+
+        train_batch_fetcher = StreamingBatchFetcher(
+            gen_batches_fun(args.source_corpus, args.target_corpus))
+        eval_batch_fetcher = StreamingBatchFetcher(
+            gen_batches_fun(args.source_corpus_eval, args.target_corpus_eval))
+        get_batches = train_batch_fetcher.epoch
+        get_batches_eval = eval_batch_fetcher.epoch
+    else:
+        train_batch_fetcher = None
+        eval_batch_fetcher = None
+
+        batches = gen_batches(args.source_corpus, args.target_corpus,
+                              source_vocab, target_vocab,
+                              model_params['batch_size'], args.max_length)
+        logger.info('Number of training batches {}'.format(len(batches)))
+
+        batches_eval = gen_batches(args.source_corpus_eval,
+                                   args.target_corpus_eval,
+                                   source_vocab, target_vocab,
+                                   model_params['batch_size'], args.max_length)
+        logger.info('Number of eval batches {}'.format(len(batches_eval)))
+
+        def get_batches(epoch):
+            return batches
+
+        def get_batches_eval(epoch):
+            return batches_eval
 
     with Seq2SeqModelCaffe2(
         model_params=model_params,
@@ -663,19 +847,21 @@ def run_seq2seq_model(args, model_params=None):
         target_vocab_size=len(target_vocab),
         num_gpus=args.num_gpus,
         num_cpus=20,
+        train_batch_fetcher=train_batch_fetcher,
+        eval_batch_fetcher=eval_batch_fetcher,
     ) as model_obj:
         model_obj.initialize_from_scratch()
         for i in range(args.epochs):
             logger.info('Epoch {}'.format(i))
             total_loss = 0
-            for batch in batches:
+            for batch in get_batches(i):
                 total_loss += model_obj.step(
                     batch=batch,
                     forward_only=False,
                 )
             logger.info('\ttraining loss {}'.format(total_loss))
             total_loss = 0
-            for batch in batches_eval:
+            for batch in get_batches_eval(i):
                 total_loss += model_obj.step(
                     batch=batch,
                     forward_only=True,
@@ -705,6 +891,13 @@ def main():
 
     parser.add_argument('--batch-size', type=int, default=32,
                         help='Training batch size')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Set flag to read the corpora by windows of '
+                        'sentences and feed the batches with data workers '
+                        'instead of loading them in memory. CPU only')
+    parser.add_argument('--window-batches', type=int, default=100,
+                        help='Number of batches per window of sentences '
+                        'bucketed by length in streaming mode')
     parser.add_argument('--epochs', type=int, default=10,
                         help='Number of iterations over training data')
     parser.add_argument('--learning-rate', type=float, default=0.5,
@@ -100,7 +100,8 @@ class Seq2SeqModelCaffe2EnsembleDecoder(object):
         )
         with core.NameScope(scope):
             if use_attention:
-                # [max_source_length, beam_size, encoder_output_dim]
+                # [max_source_length, beam_size * batch_size,
+                #  encoder_output_dim]
                 encoder_outputs = model.net.Tile(
                     encoder_outputs,
                     'encoder_outputs_tiled',
@@ -181,7 +182,7 @@ class Seq2SeqModelCaffe2EnsembleDecoder(object):
         attention_decoder = seq2seq_util.LSTMWithAttentionDecoder(
             encoder_outputs=encoder_outputs,
             encoder_output_dim=encoder_units_per_layer[-1],
-            encoder_lengths=None,
+            encoder_lengths=self.encoder_lengths_tiled,
             vocab_size=self.target_vocab_size,
             attention_type=attention_type,
             embedding_size=model_params['decoder_embedding_size'],
@@ -313,13 +314,30 @@ class Seq2SeqModelCaffe2EnsembleDecoder(object):
             'max_output_seq_len'
         )
 
-        fake_seq_lengths = self.model.param_init_net.ConstantFill(
-            [],
+        # Hypothesis k of sentence b is at k * batch_size + b, the layout of
+        # the encoder outputs tiled beam_size times along the batch axis.
+        # [beam_size * batch_size]
+        self.encoder_lengths_tiled = self.model.net.Tile(
+            self.encoder_lengths,
+            'encoder_lengths_tiled',
+            tiles=self.beam_size,
+            axis=0,
+        )
+        fake_seq_lengths = self.model.net.ConstantFill(
+            self.encoder_lengths_tiled,
             'fake_seq_lengths',
-            shape=[self.beam_size],
             value=100000,
             dtype=core.DataType.INT32,
         )
+        batch_size = self.model.net.Shape(
+            self.encoder_lengths,
+            'batch_size_int64',
+        )
+        batch_size = self.model.net.Cast(
+            batch_size,
+            'batch_size',
+            to=core.DataType.INT32,
+        )
 
         beam_decoder = BeamSearchForwardOnly(
             beam_size=self.beam_size,
@@ -404,6 +422,7 @@ class Seq2SeqModelCaffe2EnsembleDecoder(object):
             state_configs=state_configs,
             data_dependencies=[],
             word_rewards=word_rewards,
+            batch_size=batch_size,
         )
 
         workspace.RunNetOnce(self.model.param_init_net)
@@ -460,71 +479,123 @@ class Seq2SeqModelCaffe2EnsembleDecoder(object):
             ))
 
     def decode(self, numberized_input, max_output_seq_len):
-        workspace.FeedBlob(
-            self.encoder_inputs,
-            np.array([
-                [token_id] for token_id in reversed(numberized_input)
-            ]).astype(dtype=np.int32),
+        return self.decode_batch([numberized_input], max_output_seq_len)[0]
+
+    def decode_batch(self, numberized_inputs, max_output_seq_len):
+        """
+        Translates the sentences of numberized_inputs in a single run of the
+        net. max_output_seq_len is either the same for all the sentences or
+        a list with one value per sentence.
+
+        Returns a list with the (output, attention_weights_per_token,
+        best_score) of each sentence, as decode() does.
+        """
+        batch_size = len(numberized_inputs)
+        assert batch_size > 0
+        if np.isscalar(max_output_seq_len):
+            max_output_seq_len = [max_output_seq_len] * batch_size
+        max_output_seq_len = np.array(max_output_seq_len, dtype=np.int64)
+        assert len(max_output_seq_len) == batch_size
+
+        # encoder_inputs are reversed and padded, see prepare_batch func in
+        # train.py
+        encoder_lengths = np.array(
+            [len(x) for x in numberized_inputs],
+            dtype=np.int32,
         )
+        encoder_inputs = np.full(
+            [batch_size, max(encoder_lengths)],
+            seq2seq_util.PAD_ID,
+            dtype=np.int32,
+        )
+        for b, numberized_input in enumerate(numberized_inputs):
+            encoder_inputs[b, :encoder_lengths[b]] = numberized_input[::-1]
+
         workspace.FeedBlob(
-            self.encoder_lengths,
-            np.array([len(numberized_input)]).astype(dtype=np.int32),
+            self.encoder_inputs,
+            np.ascontiguousarray(encoder_inputs.transpose()),
         )
+        workspace.FeedBlob(self.encoder_lengths, encoder_lengths)
+        num_steps = int(max_output_seq_len.max())
         workspace.FeedBlob(
             self.max_output_seq_len,
-            np.array([max_output_seq_len]).astype(dtype=np.int64),
+            np.array([num_steps]).astype(dtype=np.int64),
         )
 
         workspace.RunNet(self.model.net)
 
-        num_steps = max_output_seq_len
-        score_beam_list = workspace.FetchBlob(self.output_score_beam_list)
-        token_beam_list = (
-            workspace.FetchBlob(self.output_token_beam_list)
+        # [num_steps + 1, beam_size, batch_size]
+        shape = [num_steps + 1, self.beam_size, batch_size]
+        score_beam_list = workspace.FetchBlob(
+            self.output_score_beam_list).reshape(shape)
+        token_beam_list = workspace.FetchBlob(
+            self.output_token_beam_list).reshape(shape)
+        # Previous indices and attention weights keep the flat hypothesis
+        # indices, k * batch_size + b
+        prev_index_beam_list = workspace.FetchBlob(
+            self.output_prev_index_beam_list).reshape(num_steps + 1, -1)
+        attention_weights_beam_list = workspace.FetchBlob(
+            self.output_attention_weights_beam_list)
+        attention_weights_beam_list = attention_weights_beam_list.reshape(
+            num_steps + 1, self.beam_size * batch_size, -1)
+
+        # A hypothesis is complete once it emits EOS or reaches the maximum
+        # length of its sentence. The best one is the first complete
+        # hypothesis with the highest score, in (step, beam) order, unless
+        # none beats the first one of the last step.
+        steps = np.arange(num_steps + 1).reshape(-1, 1, 1)
+        last_steps = max_output_seq_len.reshape(1, 1, -1)
+        is_complete = (
+            ((token_beam_list == seq2seq_util.EOS_ID) &
+             (steps <= last_steps)) |
+            (steps == last_steps)
         )
-        prev_index_beam_list = (
-            workspace.FetchBlob(self.output_prev_index_beam_list)
+        complete_scores = np.where(is_complete, score_beam_list, -np.inf)
+        # [batch_size, (num_steps + 1) * beam_size]
+        complete_scores = complete_scores.transpose(2, 0, 1).reshape(
+            batch_size, -1)
+        best = np.argmax(complete_scores, axis=1)
+        best_steps, best_hypos = np.divmod(best, self.beam_size)
+        sentences = np.arange(batch_size)
+        default_scores = score_beam_list[max_output_seq_len, 0, sentences]
+        keep_default = (
+            complete_scores[sentences, best] <= default_scores
         )
-
-        attention_weights_beam_list = (
-            workspace.FetchBlob(self.output_attention_weights_beam_list)
+        best_steps = np.where(keep_default, max_output_seq_len, best_steps)
+        best_hypos = np.where(keep_default, 0, best_hypos)
+        best_scores = -score_beam_list[best_steps, best_hypos, sentences]
+
+        # Backtrack all the sentences at once, each starting from the step of
+        # its best hypothesis
+        tokens = token_beam_list.reshape(num_steps + 1, -1)
+        hypos = best_hypos * batch_size + sentences
+        output = np.zeros([num_steps, batch_size], dtype=tokens.dtype)
+        attention_weights_per_token = np.zeros(
+            [num_steps, batch_size, attention_weights_beam_list.shape[2]],
+            dtype=attention_weights_beam_list.dtype,
         )
-        best_indices = (num_steps, 0)
-        for i in range(num_steps + 1):
-            for hyp_index in range(self.beam_size):
-                if (
-                    (
-                        token_beam_list[i][hyp_index][0] ==
-                        seq2seq_util.EOS_ID or
-                        i == num_steps
-                    ) and
-                    (
-                        score_beam_list[i][hyp_index][0] >
-                        score_beam_list[best_indices[0]][best_indices[1]][0]
-                    )
-                ):
-                    best_indices = (i, hyp_index)
-
-        i, hyp_index = best_indices
-        output = []
-        attention_weights_per_token = []
-        best_score = -score_beam_list[i][hyp_index][0]
-        while i > 0:
-            output.append(token_beam_list[i][hyp_index][0])
-            attention_weights_per_token.append(
-                attention_weights_beam_list[i][hyp_index]
+        for i in range(num_steps, 0, -1):
+            active = best_steps >= i
+            output[i - 1] = tokens[i, hypos]
+            attention_weights_per_token[i - 1] = (
+                attention_weights_beam_list[i, hypos]
             )
-            hyp_index = prev_index_beam_list[i][hyp_index][0]
-            i -= 1
-
-        attention_weights_per_token = reversed(attention_weights_per_token)
-        # encoder_inputs are reversed, see get_batch func
-        attention_weights_per_token = [
-            list(reversed(attention_weights))[:len(numberized_input)]
-            for attention_weights in attention_weights_per_token
-        ]
-        output = list(reversed(output))
-        return output, attention_weights_per_token, best_score
+            hypos = np.where(active, prev_index_beam_list[i, hypos], hypos)
+
+        results = []
+        for b in range(batch_size):
+            length = best_steps[b]
+            # encoder_inputs are reversed, see prepare_batch func in train.py
+            results.append((
+                output[:length, b].tolist(),
+                [
+                    list(attention_weights[:encoder_lengths[b]][::-1])
+                    for attention_weights in
+                    attention_weights_per_token[:length, b]
+                ],
+                best_scores[b],
+            ))
+        return results
 
 
 def run_seq2seq_beam_decoder(args, model_params, decoding_params):
@@ -553,16 +624,25 @@ def run_seq2seq_beam_decoder(args, model_params, decoding_params):
     )
     decoder.load_models()
 
-    for line in sys.stdin:
-        numerized_source_sentence = seq2seq_util.get_numberized_sentence(
-            line,
-            source_vocab,
+    def translate(numerized_source_sentences):
+        translations = decoder.decode_batch(
+            numerized_source_sentences,
+            [2 * len(x) + 5 for x in numerized_source_sentences],
         )
-        translation, alignment, _ = decoder.decode(
-            numerized_source_sentence,
-            2 * len(numerized_source_sentence) + 5,
+        for translation, alignment, _ in translations:
+            print(' '.join(
+                [inversed_target_vocab[tid] for tid in translation]))
+
+    numerized_source_sentences = []
+    for line in sys.stdin:
+        numerized_source_sentences.append(
+            seq2seq_util.get_numberized_sentence(line, source_vocab),
         )
-        print(' '.join([inversed_target_vocab[tid] for tid in translation]))
+        if len(numerized_source_sentences) == args.batch_size:
+            translate(numerized_source_sentences)
+            numerized_source_sentences = []
+    if numerized_source_sentences:
+        translate(numerized_source_sentences)
 
 
 def main():
@@ -602,6 +682,8 @@ def main():
 
     parser.add_argument('--beam-size', type=int, default=6,
                         help='Size of beam for the decoder')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='Number of sentences translated per net run')
     parser.add_argument('--word-reward', type=float, default=0.0,
                         help='Reward per each word generated.')
     parser.add_argument('--unk-reward', type=float, default=0.0,
@@ -696,7 +696,17 @@ class Caffe2Backend(Backend):
         for example, if "img" is the input blob for the predict_net, we require that in init_graph and in
         initializer of the predict_graph, "img" is not initalized. We don't have a check for this, since
         there is no way we can know which blob is the input of the predict_graph.
+
+        With concurrent=True, the returned Caffe2Rep can be run from several
+        threads at once: each run feeds its inputs and fetches its outputs in
+        a child workspace of the one holding the initialized parameters.
+
+        With conversion_cache, a ConversionCache, the converted nets are
+        stored on disk and preparing the same model again skips the
+        conversion.
         '''
+        concurrent = kwargs.pop('concurrent', False)
+        conversion_cache = kwargs.pop('conversion_cache', None)
         super(Caffe2Backend, cls).prepare(model, device, **kwargs)
         opset_version = None
         for imp in model.opset_import:
@@ -712,9 +722,18 @@ class Caffe2Backend(Backend):
             else:
                 opset_version = 1
 
+        model_str = model.SerializeToString()
+        cache_key = None
+        if conversion_cache is not None:
+            cache_key = conversion_cache.key(
+                model_str, opset_version, device, concurrent)
+            entry = conversion_cache.get(cache_key)
+            if entry is not None:
+                return cls._rep_from_cache_entry(model, device, entry)
+
         # Check whether we have RNN related ops
         pred_model = ModelProto()
-        pred_model.ParseFromString(cls.optimize_onnx(model.SerializeToString(), predict=True))
+        pred_model.ParseFromString(cls.optimize_onnx(model_str, predict=True))
         rnn_nodes = []
         for node in pred_model.graph.node:
             if node.op_type in {'LSTM', 'GRU', 'RNN'}:
@@ -723,11 +742,11 @@ class Caffe2Backend(Backend):
         # Build the C++ backend
         # TODO: build a predictor that supports GPU
         #       And for RNN nets, we need to avoid adding init_net
-        if device == 'CPU' and not rnn_nodes:
+        if device == 'CPU' and not rnn_nodes and not concurrent:
             c2_rnn_ops = []
             if rnn_nodes:
                 init_model = ModelProto()
-                init_model.ParseFromString(cls.optimize_onnx(model.SerializeToString(), init=True))
+                init_model.ParseFromString(cls.optimize_onnx(model_str, init=True))
                 for node in rnn_nodes:
                     c2ops = cls._onnx_node_to_caffe2_op(
                         init_model, pred_model, node, opset_version)
@@ -738,7 +757,7 @@ class Caffe2Backend(Backend):
                 del init_model
 
             cbackend = C.Caffe2Backend()
-            rep = cbackend.prepare(model.SerializeToString(), device, c2_rnn_ops)
+            rep = cbackend.prepare(model_str, device, c2_rnn_ops)
             # For testing
             # Dump the net descriptions to file for comparison with the Python ones
             if "ONNX_CAFFE2_DEBUG" in os.environ:
@@ -751,21 +770,47 @@ class Caffe2Backend(Backend):
                 with open("cpp.txt", "w") as f:
                     f.write("pred_net: \n{}".format(pn))
 
+            if conversion_cache is not None:
+                conversion_cache.put(cache_key, {
+                    'rep': 'cpp',
+                    'init_net': rep.init_net(),
+                    'predict_net': rep.pred_net(),
+                    'uninitialized': rep.uninitialized_inputs(),
+                })
             rep_wrapper = Caffe2CppRep(rep)
             return rep_wrapper
         else:
-            ws = Workspace()
-            device_option = get_device_option(Device(device))
+            init_net, predict_net = cls._onnx_model_to_caffe2_net(model, device, opset_version, False)
+            if "ONNX_CAFFE2_DEBUG" in os.environ:
+                with open("python.txt", "w") as f:
+                    f.write("pred_net: \n{}".format(predict_net))
+            if conversion_cache is not None:
+                conversion_cache.put(cache_key, {
+                    'rep': 'python',
+                    'init_net': init_net.SerializeToString(),
+                    'predict_net': predict_net.SerializeToString(),
+                    'concurrent': concurrent,
+                })
+            return cls._python_rep(
+                model, device, init_net, predict_net, concurrent)
 
-            # Directly load initializer data into blobs in workspace
-            cls._direct_initialize_parameters(
-                model.graph.initializer,
-                ws,
-                device_option,
-            )
+    @classmethod
+    def _python_rep(cls, model, device, init_net, predict_net, concurrent):
+        ws = Workspace()
+        device_option = get_device_option(Device(device))
+
+        # Directly load initializer data into blobs in workspace
+        cls._direct_initialize_parameters(
+            model.graph.initializer,
+            ws,
+            device_option,
+        )
 
-            initialized = {init.name for init in model.graph.initializer}
+        initialized = {init.name for init in model.graph.initializer}
 
+        # In concurrent mode the inputs live in the child workspaces of
+        # the runs, they must not be shared through the parameters one.
+        if not concurrent:
             cls._direct_initialize_inputs(
                 model.graph.input,
                 initialized,
@@ -773,14 +818,23 @@ class Caffe2Backend(Backend):
                 device_option,
             )
 
-            uninitialized = [value_info.name for value_info in model.graph.input if value_info.name not in initialized]
+        uninitialized = [value_info.name for value_info in model.graph.input if value_info.name not in initialized]
 
-            init_net, predict_net = cls._onnx_model_to_caffe2_net(model, device, opset_version, False)
-            if "ONNX_CAFFE2_DEBUG" in os.environ:
-                with open("python.txt", "w") as f:
-                    f.write("pred_net: \n{}".format(predict_net))
-            retval = Caffe2Rep(init_net, predict_net, ws, uninitialized)
-            return retval
+        return Caffe2Rep(
+            init_net, predict_net, ws, uninitialized, concurrent)
+
+    @classmethod
+    def _rep_from_cache_entry(cls, model, device, entry):
+        if entry['rep'] == 'cpp':
+            return Caffe2CppRep(C.Caffe2BackenRep(
+                entry['init_net'], entry['predict_net'],
+                entry['uninitialized']))
+        init_net = caffe2_pb2.NetDef()
+        init_net.ParseFromString(entry['init_net'])
+        predict_net = caffe2_pb2.NetDef()
+        predict_net.ParseFromString(entry['predict_net'])
+        return cls._python_rep(
+            model, device, init_net, predict_net, entry['concurrent'])
 
 
     @classmethod
@@ -24,8 +24,11 @@ from caffe2.python import core, workspace
 from caffe2.proto import caffe2_pb2
 from onnx.backend.base import BackendRep, namedtupledict
 
+import threading
+
 class Caffe2Rep(BackendRep):
-    def __init__(self, init_net, predict_net, workspace, uninitialized):
+    def __init__(self, init_net, predict_net, workspace, uninitialized,
+                 concurrent=False):
         super(Caffe2Rep, self).__init__()
         self.init_net = init_net
         self.predict_net = predict_net
@@ -35,6 +38,13 @@ class Caffe2Rep(BackendRep):
         self.uninitialized = uninitialized
         self.nets_created = False
         self.ran_init_net = False
+        # In concurrent mode, each run uses a child workspace of the workspace
+        # holding the parameters, taken from a pool, instead of switching the
+        # global workspace. Runs from different threads execute in parallel.
+        self.concurrent = concurrent
+        self._lock = threading.Lock()
+        self._params_ws = None
+        self._free_workers = []
 
     @property
     def _name_scope(self):
@@ -42,27 +52,31 @@ class Caffe2Rep(BackendRep):
             return 'gpu_{}'.format(self.predict_net.device_option.cuda_gpu_id)
         return ''
 
+    def _named_inputs(self, inputs):
+        if isinstance(inputs, dict):
+            # The nets are not name scoped, the blobs keep the given names
+            return list(inputs.items())
+        elif isinstance(inputs, list) or isinstance(inputs, tuple):
+            if len(self.uninitialized) != len(inputs):
+                raise RuntimeError('Expected {} values for uninitialized '
+                                   'graph inputs ({}), but got {}.'.format(
+                                       len(self.uninitialized),
+                                       ', '.join(self.uninitialized),
+                                       len(inputs)))
+            # namescope already baked into protobuf
+            return list(zip(self.uninitialized, inputs))
+        else:
+            # single input
+            return [(self.uninitialized[0], inputs)]
+
     def run(self, inputs, **kwargs):
         super(Caffe2Rep, self).run(inputs, **kwargs)
+        if self.concurrent:
+            return self._run_concurrent(inputs)
         with self.workspace:
             with core.DeviceScope(self.predict_net.device_option):
-                if isinstance(inputs, dict):
-                    with core.NameScope(self._name_scope):
-                        for key, value in inputs.items():
-                            workspace.FeedBlob(key, value)
-                elif isinstance(inputs, list) or isinstance(inputs, tuple):
-                    if len(self.uninitialized) != len(inputs):
-                        raise RuntimeError('Expected {} values for uninitialized '
-                                           'graph inputs ({}), but got {}.'.format(
-                                               len(self.uninitialized),
-                                               ', '.join(self.uninitialized),
-                                               len(inputs)))
-                    for i, value in enumerate(inputs):
-                        # namescope already baked into protobuf
-                        workspace.FeedBlob(self.uninitialized[i], value)
-                else:
-                    # single input
-                    workspace.FeedBlob(self.uninitialized[0], inputs)
+                for name, value in self._named_inputs(inputs):
+                    workspace.FeedBlob(name, value)
                 if not self.nets_created:
                     workspace.CreateNet(self.init_net)
                     workspace.CreateNet(self.predict_net)
@@ -75,3 +89,35 @@ class Caffe2Rep(BackendRep):
                              for name in self.predict_net.external_output]
             return namedtupledict('Outputs',
                                   self.predict_net.external_output)(*output_values)
+
+    def _get_worker(self):
+        with self._lock:
+            if self._params_ws is None:
+                with self.workspace:
+                    workspace.RunNetOnce(self.init_net)
+                    self._params_ws = workspace.C.Workspace.current
+            if self._free_workers:
+                return self._free_workers.pop()
+        # The net is created on the first run, once its inputs exist
+        return workspace.C.Workspace(self._params_ws), None
+
+    def _put_worker(self, worker):
+        with self._lock:
+            self._free_workers.append(worker)
+
+    def _run_concurrent(self, inputs):
+        names, values = zip(*self._named_inputs(inputs))
+        ws, net = self._get_worker()
+        try:
+            ws.feed_blobs(
+                list(names), list(values),
+                workspace.StringifyProto(self.predict_net.device_option))
+            if net is None:
+                net = ws.create_net(self.predict_net)
+            net.run()
+            output_values = ws.fetch_blobs(
+                list(self.predict_net.external_output))
+        finally:
+            self._put_worker((ws, net))
+        return namedtupledict('Outputs',
+                              self.predict_net.external_output)(*output_values)
@@ -0,0 +1,175 @@
+# Copyright (c) 2016-present, Facebook, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+
+## @package onnx
+# Module caffe2.python.onnx.conversion_cache
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import onnx
+
+logger = logging.getLogger(__name__)
+
+# Bump when the conversion changes, to invalidate the existing entries.
+CACHE_VERSION = 2
+
+_ENTRY_SUFFIX = '.c2onnx'
+
+
+# Entries are stored as JSON, with the bytes (serialized nets) in base64, so
+# that loading an entry never runs code from the cache directory.
+def _encode(value):
+    if isinstance(value, bytes):
+        return {'base64': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        return base64.b64decode(value['base64'])
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+class ConversionCache(object):
+    """
+    An on-disk cache of the Caffe2 nets converted from ONNX models by
+    Caffe2Backend.prepare, so that preparing a model that was already
+    converted skips the conversion:
+
+        cache = ConversionCache(cache_dir, max_size_bytes=1 << 30)
+        rep = Caffe2Backend.prepare(model, conversion_cache=cache)
+
+    Entries are keyed by the content of the model, the operator set version,
+    the device, the kind of rep, the versions of onnx and of the cache. They
+    can be invalidated with `invalidate()` or `clear()`. Once the entries
+    take more than `max_size_bytes`, the least recently used ones are
+    removed.
+
+    Anyone who can write to the cache directory controls the nets that are
+    run, so it should only be writable by the user running the models.
+    """
+
+    def __init__(self, path, max_size_bytes=None):
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        if not os.path.isdir(path):
+            os.makedirs(path, 0o700)
+
+    def key(self, model_str, opset_version, device, concurrent=False):
+        h = hashlib.sha256()
+        h.update(model_str)
+        h.update('|{}|{}|{}|{}|{}'.format(
+            opset_version, device, concurrent, onnx.__version__,
+            CACHE_VERSION).encode('utf-8'))
+        return h.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key + _ENTRY_SUFFIX)
+
+    def get(self, key):
+        """
+        Returns the entry stored under `key`, or None.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            return None
+        try:
+            entry = {
+                k: _decode(v)
+                for k, v in json.loads(data.decode('utf-8')).items()}
+        except Exception as e:
+            logger.warning('Removing corrupted cache entry {}: {}'.format(
+                path, e))
+            self.invalidate(key)
+            return None
+        # Mark as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, entry):
+        """
+        Stores `entry`, a dict of strings, bytes, numbers and lists of
+        those, under `key`.
+        """
+        # Write to a temporary file first so that concurrent readers never
+        # see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            data = json.dumps({k: _encode(v) for k, v in entry.items()})
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data.encode('utf-8'))
+            os.rename(tmp_path, self._entry_path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def invalidate(self, key):
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            if name.endswith(_ENTRY_SUFFIX):
+                self.invalidate(name[:-len(_ENTRY_SUFFIX)])
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(_ENTRY_SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        return entries
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        if self.max_size_bytes is None:
+            return
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_size_bytes:
+                break
+            self.invalidate(name[:-len(_ENTRY_SUFFIX)])
+            total -= size
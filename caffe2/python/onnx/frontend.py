@@ -343,7 +343,8 @@ class Caffe2Frontend(object):
             value_info.update(ssa_value_info)
         net.external_input[:] = [ssa_name(name, 0)
                                  for name in net.external_input]
-        ssa, blob_versions = caffe2_core.get_ssa(net)
+        index = caffe2_core.SSAIndex(net)
+        ssa, blob_versions = index.ssa, index.blob_versions
         assert len(net.op) == len(ssa)
         for op, (versioned_inputs, versioned_outputs) in zip(net.op, ssa):
             op.input[:] = [ssa_name(name, version)
@@ -23,9 +23,12 @@ from __future__ import unicode_literals
 
 import json
 import os
+import shutil
+import tempfile
+import threading
 import unittest
 
-from caffe2.python import core
+from caffe2.python import core, workspace
 from caffe2.proto import caffe2_pb2
 
 import onnx
@@ -35,6 +38,7 @@ from caffe2.python.onnx.helper import c2_native_run_net, c2_native_run_op
 from onnx import defs, mapping
 import caffe2.python.onnx.frontend as c2_onnx
 import caffe2.python.onnx.backend as c2
+from caffe2.python.onnx.conversion_cache import ConversionCache
 
 import numpy as np
 from caffe2.python.models.download import downloadFromURLToFile, getURLFromName, deleteDirectory
@@ -102,6 +106,91 @@ class TestCaffe2Basic(TestCase):
         output = c2_rep.run({"X": X, "Y": Y})
         np.testing.assert_almost_equal(output["W3"], W_ref)
 
+    def test_concurrent_run(self):
+        weight = np.random.randn(4, 3).astype(np.float32)
+        graph_def = make_graph(
+            [make_node("Gemm", ["X", "weight", "bias"], ["Y0"], transB=1),
+             make_node("Relu", ["Y0"], ["Y"])],
+            name="test_concurrent_run",
+            inputs=[
+                make_tensor_value_info("X", onnx.TensorProto.FLOAT, (2, 3)),
+                make_tensor_value_info("weight", onnx.TensorProto.FLOAT, (4, 3)),
+                make_tensor_value_info("bias", onnx.TensorProto.FLOAT, (4,)),
+            ],
+            outputs=[make_tensor_value_info("Y", onnx.TensorProto.FLOAT, (2, 4))],
+            initializer=[
+                make_tensor("weight", onnx.TensorProto.FLOAT, [4, 3],
+                            weight.flatten().astype(float)),
+                make_tensor("bias", onnx.TensorProto.FLOAT, [4],
+                            np.zeros(4).astype(float)),
+            ]
+        )
+        c2_rep = c2.prepare(
+            make_model(graph_def, producer_name='caffe2-ref-test'),
+            concurrent=True)
+
+        errors = []
+
+        def serve(seed):
+            rng = np.random.RandomState(seed)
+            try:
+                for _ in range(20):
+                    X = rng.randn(2, 3).astype(np.float32)
+                    output = c2_rep.run({"X": X})
+                    np.testing.assert_almost_equal(
+                        output.Y, np.maximum(X.dot(weight.T), 0), decimal=5)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=serve, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        # Runs don't go through the global workspace
+        self.assertFalse(workspace.HasBlob("Y"))
+
+    def test_conversion_cache(self):
+        X = np.random.randn(3, 2).astype(np.float32)
+        graph_def = make_graph(
+            [make_node("Relu", ["X"], ["Y"])],
+            name="test_conversion_cache",
+            inputs=[make_tensor_value_info("X", onnx.TensorProto.FLOAT, [3, 2])],
+            outputs=[make_tensor_value_info("Y", onnx.TensorProto.FLOAT, [3, 2])])
+        model = make_model(graph_def, producer_name='caffe2-ref-test')
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache = ConversionCache(cache_dir)
+            for device, concurrent in [('CPU', False), ('CPU', True)]:
+                for _ in range(2):
+                    c2_rep = c2.prepare(
+                        model, device, concurrent=concurrent,
+                        conversion_cache=cache)
+                    np.testing.assert_almost_equal(
+                        c2_rep.run(X).Y, np.clip(X, 0, np.inf))
+            # One entry per kind of rep
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+            # Entries are evicted once the cache is too large
+            cache.max_size_bytes = cache.size_bytes() - 1
+            cache.put('dummy', {'rep': 'python'})
+            self.assertLessEqual(cache.size_bytes(), cache.max_size_bytes)
+            self.assertIsNotNone(cache.get('dummy'))
+
+            # Entries are JSON, the bytes survive the round trip
+            entry = {'rep': 'cpp', 'init_net': b'\x00\xff',
+                     'uninitialized': ['X']}
+            cache.put('raw', entry)
+            self.assertEqual(cache.get('raw'), entry)
+            with open(os.path.join(cache_dir, 'raw.c2onnx'), 'rb') as f:
+                json.loads(f.read().decode('utf-8'))
+
+            cache.clear()
+            self.assertEqual(os.listdir(cache_dir), [])
+        finally:
+            shutil.rmtree(cache_dir)
+
     def test_gemm(self):
         # simple
         A = np.random.randn(3, 2).astype(np.float32)
@@ -552,6 +552,50 @@ class TestDatasetOps(TestCase):
         actual_sizes = [d.shape[0] for d in trimmed.field_blobs()]
         self.assertEquals(EXPECTED_SIZES, actual_sizes)
 
+    def test_sort_and_shuffle_ahead(self):
+        schema = Struct(
+            ('label', Scalar(np.int64)),
+            ('seq', List(Scalar(np.float32))),
+        )
+        lengths = np.array([5, 1, 4, 1, 3, 2, 2, 6, 0, 3], dtype=np.int32)
+        contents = from_blob_list(schema, [
+            np.arange(len(lengths), dtype=np.int64),
+            lengths,
+            np.arange(lengths.sum(), dtype=np.float32),
+        ])
+        ds = dataset.Dataset(schema)
+        net = core.Net('init')
+        with core.NameScope('init'):
+            ds.init_empty(net)
+            content_blobs = NewRecord(net, contents)
+            FeedRecord(content_blobs, contents)
+            writer = ds.writer(init_net=net)
+            writer.write_record(net, content_blobs)
+        workspace.RunNetOnce(net)
+
+        read_init_net = core.Net('read_init')
+        read_next_net = core.Net('read_next')
+        reader = ds.random_reader(read_init_net, batch_size=2, loop_over=True)
+        reader.sort_and_shuffle_ahead(['seq:lengths'], seed=0)
+        reader.computeoffset(read_init_net)
+        should_stop, batch = reader.read_record(read_next_net)
+        workspace.RunNetOnce(read_init_net)
+        workspace.CreateNet(read_next_net, True)
+
+        # Batches are pairs of consecutive entries sorted by length
+        buckets = np.sort(lengths).reshape(-1, 2).tolist()
+        for _ in range(3):
+            epoch_labels = []
+            for _ in range(len(lengths) // 2):
+                workspace.RunNet(str(read_next_net))
+                self.assertFalse(workspace.FetchBlob(should_stop))
+                actual = FetchRecord(batch)
+                labels = actual.label()
+                epoch_labels.extend(labels)
+                self.assertIn(sorted(lengths[labels].tolist()), buckets)
+                npt.assert_array_equal(actual.seq.lengths(), lengths[labels])
+            self.assertEqual(sorted(epoch_labels), list(range(len(lengths))))
+
     def test_last_n_window_ops(self):
         collect_net = core.Net('collect_net')
         collect_net.GivenTensorFill(
@@ -18,9 +18,18 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 from caffe2.python import core, workspace
-from caffe2.python.text_file_reader import TextFileReader
+from caffe2.python.build import build_options
+from caffe2.python.dataset import Dataset
+from caffe2.python.pipeline import pipe
+from caffe2.python.session import LocalSession
+from caffe2.python.task import TaskGroup, WorkspaceType
+from caffe2.python.text_file_reader import (
+    ShardedTextFileReader, TextFileReader)
 from caffe2.python.test_util import TestCase
 from caffe2.python.schema import Struct, Scalar, FetchRecord
+import gzip
+import os
+import shutil
 import tempfile
 import numpy as np
 
@@ -77,6 +86,63 @@ class TestTextFileReader(TestCase):
                         else:
                             np.testing.assert_array_equal(col_batch, results[i])
 
+    def test_sharded_text_file_reader(self):
+        schema = Struct(
+            ('id', Scalar(dtype=np.int64)),
+            ('name', Scalar(dtype=str)),
+            ('count', Scalar(dtype=np.int32)),
+            ('score', Scalar(dtype=np.float64)))
+        use_gzip = build_options.get('USE_ZLIB', '') not in ('', 'OFF')
+        num_files = 5
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            for i in range(num_files):
+                rows = '\n'.join(
+                    '{}\tf{}\t{}\t{}'.format(10 * i + j, i, j - 1, j * 0.25)
+                    for j in range(i + 1))
+                # The last row of odd files has no trailing newline
+                if i % 2 == 0:
+                    rows += '\n'
+                path = os.path.join(tmp_dir, 'part{}.tsv'.format(i))
+                if use_gzip and i == 1:
+                    with gzip.open(path + '.gz', 'wb') as f:
+                        f.write(rows.encode('utf-8'))
+                else:
+                    with open(path, 'w') as f:
+                        f.write(rows)
+
+            ws = workspace.C.Workspace()
+            session = LocalSession(ws)
+            reader = ShardedTextFileReader(
+                os.path.join(tmp_dir, 'part*'), schema, num_shards=3,
+                batch_size=2)
+
+            dst_init = core.Net('dst_init')
+            with core.NameScope('dst'):
+                dst_ds = Dataset(reader.schema().clone_schema())
+                dst_ds.init_empty(dst_init)
+            session.run(dst_init)
+            with TaskGroup(workspace_type=WorkspaceType.GLOBAL) as tg:
+                pipe(reader, dst_ds.writer(), num_runtime_threads=3)
+            session.run(tg)
+
+            content = dst_ds.content()
+            ids = ws.blobs[str(content.id())].fetch()
+            order = np.argsort(ids)
+            expected_ids = [
+                10 * i + j for i in range(num_files) for j in range(i + 1)]
+            np.testing.assert_array_equal(ids[order], expected_ids)
+            counts = ws.blobs[str(content.count())].fetch()
+            self.assertEqual(counts.dtype, np.int32)
+            np.testing.assert_array_equal(
+                counts[order], [x % 10 - 1 for x in expected_ids])
+            scores = ws.blobs[str(content.score())].fetch()
+            self.assertEqual(scores.dtype, np.float64)
+            np.testing.assert_array_almost_equal(
+                scores[order], [x % 10 * 0.25 for x in expected_ids])
+        finally:
+            shutil.rmtree(tmp_dir)
+
 if __name__ == "__main__":
     import unittest
     unittest.main()
@@ -43,17 +43,29 @@ Optionally, one can define an "init function" that is called once before
 threads start, and has call signature:
    my_init_fun(worker_coordinator, global_coordinator)
 
+If use_processes is set to True, worker_fun is run in a separate process per
+worker instead of a thread, so CPU-heavy work is not serialized by the GIL.
+Each process is driven by a thread in the parent process, so process workers
+are started, stopped and shut down together with the other coordinators.
+The processes are forked when the coordinators start, before any of their
+threads runs, so that no worker thread holds a lock the child would inherit.
+
 Note that for data_parallel_models, init_workers will be called
 for each GPU. Note that the 'coordinator' returned by the function is same
 each time.
 '''
 
 import logging
+import multiprocessing
+import os
+import signal
 import threading
 import atexit
 import time
 import collections
+import numpy as np
 import six
+from six.moves import queue as Queue
 import traceback
 
 from abc import ABCMeta, abstractmethod
@@ -70,6 +82,7 @@ def init_workers(
     init_fun=None,
     external_loggers=None,
     shutdown_fun=None,
+    use_processes=False,
 ):
     global global_coordinator
 
@@ -84,14 +97,30 @@ def init_workers(
         global_coordinator.get_new_worker_id()
         for i in range(num_worker_threads)
     ]
-    workers = [
-        threading.Thread(
-            target=run_worker,
-            name="parallel_workers worker id {}".format(worker_id),
-            args=[coordinator,
-                  Worker(coordinator, worker_id, worker_fun, metrics)],
-        ) for worker_id in worker_ids
-    ]
+    if use_processes:
+        process_workers = [
+            ProcessWorker(coordinator, worker_id, worker_fun, metrics,
+                          worker_args=(worker_id,))
+            for worker_id in worker_ids
+        ]
+        workers = [
+            threading.Thread(
+                target=run_worker,
+                name="parallel_workers process worker id {}".format(
+                    worker._worker_id),
+                args=[coordinator, worker],
+            ) for worker in process_workers
+        ]
+        coordinator._process_workers = process_workers
+    else:
+        workers = [
+            threading.Thread(
+                target=run_worker,
+                name="parallel_workers worker id {}".format(worker_id),
+                args=[coordinator,
+                      Worker(coordinator, worker_id, worker_fun, metrics)],
+            ) for worker_id in worker_ids
+        ]
 
     coordinator._workers = workers
     global_coordinator.add(coordinator)
@@ -144,6 +173,7 @@ class WorkerCoordinator(object):
         self._active = True
         self._started = False
         self._workers = []
+        self._process_workers = []
         self._worker_name = worker_name
         self._init_fun = init_fun
         self._state = state
@@ -157,9 +187,17 @@ class WorkerCoordinator(object):
             data_coordinator = self
             self._init_fun(data_coordinator, global_coordinator)
 
+    def _start_processes(self):
+        if self._started:
+            return
+        for w in self._process_workers:
+            w.start_process()
+
     def _start(self):
         if self._started:
             return
+        # Fork before the threads of this coordinator run
+        self._start_processes()
         self._active = True
         self._started = True
         if self._state:
@@ -223,6 +261,10 @@ class GlobalWorkerCoordinator(object):
         # ensure init happens serially before threads are spawn.
         for c in self._coordinators:
             c.init(self)
+        # Fork all the worker processes before any worker thread runs, a
+        # child forked while a thread holds a lock could deadlock on it.
+        for c in self._coordinators:
+            c._start_processes()
         for c in self._coordinators:
             c._start()
 
@@ -287,6 +329,194 @@ class Worker(object):
             'worker_time', time.time() - self._start_time)
         self._metrics.log_metrics()
 
+    def shutdown(self):
+        pass
+
+
+class SharedMemoryChannel(object):
+    '''
+    Passes lists of numpy arrays from a worker process to its parent through
+    a shared memory buffer split into fixed-size slots. Only the array layout
+    goes through the (pickling) message queue; the data itself is written
+    into a free slot by the producer and copied out by the consumer, which
+    then hands the slot back.
+
+    Results that are not lists of numeric arrays, or that do not fit into a
+    slot, are sent through the message queue instead.
+    '''
+    _ALIGNMENT = 64
+
+    def __init__(self, slot_bytes, num_slots=2):
+        self._slot_bytes = slot_bytes
+        self._num_slots = num_slots
+        self._raw = multiprocessing.RawArray('b', slot_bytes * num_slots)
+        self._free_slots = multiprocessing.Queue()
+        self._ready = multiprocessing.Queue()
+        for slot in range(num_slots):
+            self._free_slots.put(slot)
+        self._warned_fallback = False
+
+    def _layout(self, arrays):
+        if not isinstance(arrays, (list, tuple)):
+            return None
+        layout = []
+        offset = 0
+        for arr in arrays:
+            if not isinstance(arr, np.ndarray) or arr.dtype.hasobject:
+                return None
+            layout.append((arr.dtype.str, arr.shape, offset))
+            offset += -(-arr.nbytes // self._ALIGNMENT) * self._ALIGNMENT
+        if offset > self._slot_bytes:
+            if not self._warned_fallback:
+                log.warning(
+                    "Worker result of {} bytes does not fit into a shared "
+                    "memory slot of {} bytes, sending it pickled".format(
+                        offset, self._slot_bytes))
+                self._warned_fallback = True
+            return None
+        return layout
+
+    def _slot_array(self, slot, dtype, shape, offset):
+        return np.ndarray(
+            shape,
+            dtype=np.dtype(dtype),
+            buffer=self._raw,
+            offset=slot * self._slot_bytes + offset,
+        )
+
+    def send(self, arrays, elapsed, is_active):
+        '''
+        Producer side. Blocks until a slot is free or is_active() is False.
+        '''
+        layout = self._layout(arrays)
+        if layout is None:
+            self._ready.put(('obj', arrays, elapsed))
+            return
+        while is_active():
+            try:
+                slot = self._free_slots.get(block=True, timeout=0.5)
+            except Queue.Empty:
+                continue
+            for arr, (dtype, shape, offset) in zip(arrays, layout):
+                self._slot_array(slot, dtype, shape, offset)[...] = arr
+            self._ready.put(('shm', (slot, layout), elapsed))
+            return
+
+    def init_producer(self):
+        # Don't block producer process exit on results nobody reads anymore
+        self._ready.cancel_join_thread()
+
+    def send_error(self, message):
+        self._ready.put(('error', message, None))
+
+    def receive(self, timeout):
+        '''
+        Consumer side. Returns a (result, elapsed) tuple, or None if nothing
+        arrived within the timeout.
+        '''
+        try:
+            kind, payload, elapsed = self._ready.get(
+                block=True, timeout=timeout)
+        except Queue.Empty:
+            return None
+        if kind == 'error':
+            raise Exception("Exception in worker process:\n" + payload)
+        if kind == 'obj':
+            return payload, elapsed
+        slot, layout = payload
+        try:
+            result = [
+                self._slot_array(slot, dtype, shape, offset).copy()
+                for dtype, shape, offset in layout
+            ]
+        finally:
+            self._free_slots.put(slot)
+        return result, elapsed
+
+
+def _run_worker_process(worker_fun, worker_args, channel, stop_event):
+    is_active = lambda: not stop_event.is_set()  # noqa
+    channel.init_producer()
+    while is_active():
+        start_time = time.time()
+        try:
+            result = worker_fun(*worker_args)
+        except Exception:
+            channel.send_error(traceback.format_exc())
+            return
+        channel.send(result, time.time() - start_time, is_active)
+
+
+class ProcessWorker(Worker):
+    '''
+    Runs worker_fun(*worker_args) in a loop in a child process. The parent
+    side is driven by run_worker() like a thread worker: every run() picks
+    up one result from the child and passes it to handle_result().
+    '''
+    def __init__(
+        self,
+        coordinator,
+        worker_id,
+        worker_fun,
+        metrics,
+        worker_args=(),
+        shm_slot_bytes=64 * 1024 * 1024,
+        shm_num_slots=2,
+    ):
+        Worker.__init__(self, coordinator, worker_id, worker_fun=worker_fun,
+                        metrics=metrics)
+        self._worker_args = worker_args
+        self._channel = SharedMemoryChannel(shm_slot_bytes, shm_num_slots)
+        self._stop_event = multiprocessing.Event()
+        self._process = None
+
+    def start_process(self):
+        if self._process is not None:
+            return
+        self._stop_event.clear()
+        self._process = multiprocessing.Process(
+            target=_run_worker_process,
+            name="worker process id {}".format(self._worker_id),
+            args=(self._worker_fun, self._worker_args, self._channel,
+                  self._stop_event),
+        )
+        self._process.daemon = True
+        self._process.start()
+
+    def run(self):
+        assert self._process is not None, \
+            "Worker process {} is not started".format(self._worker_id)
+        received = self._channel.receive(timeout=0.5)
+        if received is None:
+            if not self._process.is_alive():
+                raise Exception("Worker process {} died with exit code {}"
+                                .format(self._worker_id,
+                                        self._process.exitcode))
+            return
+        result, elapsed = received
+        self.handle_result(result, elapsed)
+
+    def handle_result(self, result, elapsed):
+        self._metrics.put_metric('process_worker_time', elapsed)
+
+    def shutdown(self):
+        if self._process is None:
+            return
+        # Give up on the process before the coordinator gives up on the
+        # thread driving it, which it waits 5 secs for.
+        self._stop_event.set()
+        self._process.join(2.0)
+        if self._process.is_alive():
+            log.warning("Terminating worker process {}".format(
+                self._worker_id))
+            self._process.terminate()
+            self._process.join(1.0)
+        if self._process.is_alive():
+            log.warning("Killing worker process {}".format(self._worker_id))
+            os.kill(self._process.pid, signal.SIGKILL)
+            self._process.join(1.0)
+        self._process = None
+
 
 global_coordinator = GlobalWorkerCoordinator()
 
@@ -300,3 +530,4 @@ def run_worker(coordinator, worker):
             worker.handle_exception(e)
         finally:
             worker.finish()
+    worker.shutdown()
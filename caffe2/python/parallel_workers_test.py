@@ -18,6 +18,8 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import signal
+import time
 import unittest
 
 from caffe2.python import workspace, core
@@ -123,3 +125,21 @@ class ParallelWorkersTest(unittest.TestCase):
 
         data = workspace.FetchBlob('data')
         self.assertEqual(data, b'shutdown', 'Got unexpected value ' + str(data))
+
+    def testProcessWorkersKilledOnStop(self):
+        def stuck_worker(worker_id):
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            time.sleep(600)
+
+        worker_coordinator = parallel_workers.init_workers(
+            stuck_worker, num_worker_threads=1, use_processes=True
+        )
+        worker_coordinator.start()
+        # Forked on start, before the worker threads run
+        process = worker_coordinator._coordinators[-1] \
+            ._process_workers[0]._process
+        self.assertIsNotNone(process)
+        time.sleep(0.5)
+
+        self.assertTrue(worker_coordinator.stop())
+        self.assertFalse(process.is_alive())
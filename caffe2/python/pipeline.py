@@ -26,6 +26,10 @@ from caffe2.python.net_builder import NetBuilder, ops
 from caffe2.python.schema import as_record, Field
 from caffe2.python.task import Node, Task, TaskGroup
 
+import logging
+
+logger = logging.getLogger(__name__)
+
 
 class Output(object):
     """
@@ -108,7 +112,7 @@ def normalize_processor_output(output):
 
 def pipe(
         input, output=None, num_threads=1, processor=None, name=None,
-        capacity=None, group=None, num_runtime_threads=1):
+        capacity=None, group=None, num_runtime_threads=1, stats=None):
     """
     Given a Reader, Queue or DataStream in `input`, and optionally, a Writer,
     Queue or DataStream in `output`, creates a Task that, when run, will
@@ -148,6 +152,8 @@ def pipe(
                      runtime. This is preferable to `num_threads`, but some
                      processors/readers still require to be called multiple
                      times in python.
+        stats:       (optional) a PipeStats that will collect the throughput
+                     of the stages of the pipe and of its queues.
 
     Returns:
         Output Queue, DataStream, Reader, or None, depending on the parameters
@@ -155,13 +161,14 @@ def pipe(
     """
     result, _ = _pipe_step(
         input, output, num_threads, processor, name, capacity, group,
-        num_runtime_threads)
+        num_runtime_threads, stats=stats)
     return result
 
 
 def pipe_and_output(
         input, output=None, num_threads=1, processor=None, name=None,
-        capacity=None, group=None, num_runtime_threads=1, final_outputs=None):
+        capacity=None, group=None, num_runtime_threads=1, final_outputs=None,
+        stats=None):
     """
     Similar to `pipe`, with the additional ability for the pipe Task to
     return output values to the `Session` once done.
@@ -175,10 +182,13 @@ def pipe_and_output(
     assert num_threads > 0
     result, task = _pipe_step(
         input, output, num_threads, processor, name, capacity, group,
-        num_runtime_threads, final_outputs)
+        num_runtime_threads, final_outputs, stats)
     output = None
     if final_outputs is not None:
         output = task.outputs()
+        if stats is not None:
+            # the stats are the last output of the task
+            output = output[:-1]
         if type(final_outputs) not in (list, tuple):
             output = output[0]
     return result, output
@@ -196,8 +206,226 @@ def processor_name(processor):
     return processor.__class__.__name__
 
 
+class PipeStats(object):
+    """
+    Collects the throughput of the stages of a pipe, to find which stage of a
+    pipeline is its bottleneck. Pass it to `pipe` or `pipe_and_output`:
+
+        stats = PipeStats(report_interval_ms=10000)
+        pipe(reader, output=queue, processor=proc, num_runtime_threads=4,
+             stats=stats)
+        session.run(task_group)
+        print(stats.summary())
+
+    Each iteration of the pipe is split in stages: `read` (including the
+    dequeue from an input queue), `process` if the pipe has a processor, and
+    `write` (including the enqueue into an output queue). For every stage the
+    pipe counts the records it outputs and the time spent in it, summed over
+    the threads of the pipe. The queues the pipe reads from or writes to
+    report the time spent in enqueue and dequeue, blocked time included, and
+    their occupancy.
+
+    The counters live in the global StatRegistry. They are exported by the
+    pipe when it finishes, as a TaskOutput, and if `report_interval_ms` is
+    given, logged periodically while the pipe runs.
+    """
+
+    def __init__(self, report_interval_ms=None):
+        self.report_interval_ms = report_interval_ms
+        self.prefix = None
+        self.stages = []
+        self.queues = []
+        self.output = None
+        self.last_report = None
+        self._last_values = {}
+        self._last_timestamp = None
+
+    def _setup(self, prefix, has_processor):
+        assert self.prefix is None, 'A PipeStats can only be used by one pipe.'
+        self.prefix = prefix
+        self.stages = (
+            ['read', 'process', 'write'] if has_processor
+            else ['read', 'write'])
+
+    def _finish(self, global_init_net, global_exit_net, queues):
+        self.queues = [str(q) for q in queues]
+        wall_timer = global_init_net.TimerBegin(
+            [], counter_name=self.prefix + '/wall')
+        global_exit_net.TimerEnd([wall_timer], [])
+        keys, values, _ = global_exit_net.StatRegistryExport(
+            [], 3, reset=False)
+        if self.report_interval_ms is not None:
+            with ops.task_reporter(interval_ms=self.report_interval_ms):
+                report_net = core.Net('pipe_stats:report')
+                report_net.Python(self._report)(
+                    report_net.StatRegistryExport([], 3, reset=False), [])
+                ops.net(report_net)
+        self.output = Task.current().add_output([keys, values])
+
+    def _report(self, inputs, outputs):
+        keys, values, timestamps = [i.data for i in inputs]
+        values = dict(zip(keys, values))
+        timestamp = timestamps.max() if len(timestamps) else 0
+        if self._last_timestamp is None:
+            elapsed_ns = self.report_interval_ms * 1e6
+        else:
+            elapsed_ns = timestamp - self._last_timestamp
+        delta = {
+            key: value - self._last_values.get(key, 0)
+            for key, value in values.items()}
+        self._last_values = values
+        self._last_timestamp = timestamp
+        self.last_report = self._summarize(delta, elapsed_ns)
+        logger.info('{}: {}'.format(self.prefix, self.last_report))
+
+    def summary(self):
+        """
+        Returns the stats of the whole run of the pipe, once it finished:
+
+            {
+                'batches': number of iterations of the pipe,
+                'elapsed_sec': duration of the pipe,
+                'stages': {stage: {
+                    'records': number of records output by the stage,
+                    'records_per_sec': records / elapsed_sec,
+                    'time_sec': time spent in the stage, over all threads,
+                    'time_fraction': share of the time of an iteration
+                                     spent in the stage,
+                }},
+                'queues': {queue: {
+                    'enqueue_wait_ns': average time of an enqueue,
+                    'dequeue_wait_ns': average time of a dequeue,
+                    'occupancy': average number of records in the queue,
+                }},
+            }
+        """
+        assert self.output is not None, 'PipeStats was not passed to a pipe.'
+        keys, values = self.output.fetch()
+        values = dict(zip(keys, values))
+        return self._summarize(
+            values, values.get(self._key('wall/time_ns/sum'), 0))
+
+    def _key(self, name, prefix=None):
+        name = '{}/{}'.format(prefix or self.prefix, name)
+        # keys are exported as bytes
+        return name.encode('utf-8')
+
+    def _summarize(self, values, elapsed_ns):
+        def get(name, prefix=None):
+            return int(values.get(self._key(name, prefix), 0))
+
+        def average(name, prefix):
+            count = get(name + '/count', prefix)
+            return get(name + '/sum', prefix) / count if count else 0.
+
+        elapsed_sec = elapsed_ns / 1e9
+        total_ns = sum(get(stage + '/time_ns') for stage in self.stages)
+        stages = {}
+        records = 0
+        for stage in self.stages:
+            if stage != 'write':
+                records = get(stage + '/records')
+            time_ns = get(stage + '/time_ns')
+            stages[stage] = {
+                'records': records,
+                'records_per_sec': (
+                    records / elapsed_sec if elapsed_sec else 0.),
+                'time_sec': time_ns / 1e9,
+                'time_fraction': time_ns / total_ns if total_ns else 0.,
+            }
+        queues = {}
+        for queue in self.queues:
+            queues[queue] = {
+                'enqueue_wait_ns': average('write_time_ns', queue),
+                'dequeue_wait_ns': average('read_time_ns', queue),
+                'occupancy': average('queue_size', queue),
+            }
+        return {
+            'batches': get('batches'),
+            'elapsed_sec': elapsed_sec,
+            'stages': stages,
+            'queues': queues,
+        }
+
+
+class _PipeStatsBuilder(object):
+    """
+    Adds to the nets of one thread of a pipe the ops measuring its stages.
+    The time of a stage is read from the timer of the iteration when the
+    stage ends, and the counters are only updated once the iteration
+    completed.
+    """
+
+    def __init__(self, prefix, init_net, timer):
+        self._prefix = prefix
+        self._init_net = init_net
+        self._timer = timer
+        self._marks = []
+
+    def _key(self, name):
+        return self._init_net.GivenTensorStringFill(
+            [], values=['{}/{}'.format(self._prefix, name)], shape=[1])
+
+    def mark(self, stage, fields=None):
+        net = core.Net('pipe_stats:' + stage)
+        time = net.TimerGet([self._timer])
+        num_records = None
+        if fields:
+            shape = net.Shape([fields[0]])
+            num_records = net.Cast(
+                net.Slice([shape], starts=[0], ends=[1]),
+                to=core.DataType.INT64)
+        self._marks.append((stage, time, num_records))
+        return net
+
+    def update_net(self):
+        net = core.Net('pipe_stats:update')
+        previous = None
+        for stage, time, num_records in self._marks:
+            elapsed = time if previous is None else net.Sub([time, previous])
+            net.StatRegistryUpdate(
+                [self._key(stage + '/time_ns'), elapsed], [])
+            if num_records is not None:
+                net.StatRegistryUpdate(
+                    [self._key(stage + '/records'), num_records], [])
+            previous = time
+        one = self._init_net.ConstantFill(
+            [], shape=[1], value=1, dtype=core.DataType.INT64)
+        net.StatRegistryUpdate([self._key('batches'), one], [])
+        return net
+
+
+def _instrument_read(reader, stats, init_net, timer):
+    """
+    Returns the builder measuring the stages of a thread of the pipe, and
+    makes the processing reader mark the end of the upstream read.
+    """
+    if stats is None:
+        return None
+    builder = _PipeStatsBuilder(stats.prefix, init_net, timer)
+    if isinstance(reader, ProcessingReader):
+        reader.stage_marker = builder.mark
+    return builder
+
+
+def _instrumented_nets(builder, read_nets, rec, write_nets):
+    if builder is None:
+        return list(read_nets) + list(write_nets)
+    last_read_stage = 'read' if len(builder._marks) == 0 else 'process'
+    fields = rec.field_blobs() if rec is not None else None
+    return (
+        list(read_nets) + [builder.mark(last_read_stage, fields)] +
+        list(write_nets) + [builder.mark('write'), builder.update_net()])
+
+
+def _pipe_queues(input, out_queue):
+    return [
+        q.queue() for q in (input, out_queue)
+        if q is not None and hasattr(q, 'queue')]
+
+
 def _runtime_threads_task(name, group, final_outputs, reader, num_threads,
-                          output, capacity):
+                          output, capacity, stats=None, input_queue=None):
     node_name = str(Node.current())
     profiler_name = "{0}/{1}/{2}/{3}/{4}".format(
         node_name,
@@ -214,6 +442,17 @@ def _runtime_threads_task(name, group, final_outputs, reader, num_threads,
 
         init_net = core.Net('pipe:instance:init')
         exit_net = core.Net('pipe:instance:exit')
+
+        timer_start_net = core.Net('timer_start')
+        timer = timer_start_net.TimerBegin([], counter_name=profiler_name)
+        timer_end_net = core.Net('timer_end')
+        timer_end_net.TimerEnd(timer, [])
+        if stats is not None:
+            stats._setup(
+                '{}/pipe/{}'.format(node_name, task.name),
+                isinstance(reader, ProcessingReader))
+        stats_builder = _instrument_read(reader, stats, init_net, timer)
+
         read_nets, status, rec = reader.read_record_ex(init_net, exit_net)
         init_net.ConstantFill(
             [], [status],
@@ -231,19 +470,20 @@ def _runtime_threads_task(name, group, final_outputs, reader, num_threads,
             out_queue = None
             write_nets = []
 
+        if stats is not None:
+            stats._finish(
+                global_init_net, global_exit_net,
+                _pipe_queues(input_queue, out_queue or output))
+
         with ops.task_init():
             ops.net(global_init_net)
         with ops.task_instance_init():
             ops.net(init_net)
 
-        timer_start_net = core.Net('timer_start')
-        timer = timer_start_net.TimerBegin([], counter_name=profiler_name)
-        timer_end_net = core.Net('timer_end')
-        timer_end_net.TimerEnd(timer, [])
-
         ops.net(core.execution_step(
             'body',
-            [timer_start_net] + list(read_nets) + list(write_nets) +
+            [timer_start_net] +
+            _instrumented_nets(stats_builder, read_nets, rec, write_nets) +
             [timer_end_net],
             should_stop_blob=status))
         ops.net(timer_end_net)
@@ -257,7 +497,7 @@ def _runtime_threads_task(name, group, final_outputs, reader, num_threads,
 
 
 def _static_threads_task(name, group, final_outputs, reader, num_threads,
-                         output, capacity):
+                         output, capacity, stats=None, input_queue=None):
     node_name = str(Node.current())
     profiler_name = "{0}/{1}/{2}/{3}/{4}".format(
         node_name,
@@ -270,6 +510,10 @@ def _static_threads_task(name, group, final_outputs, reader, num_threads,
         global_exit_net = core.Net('exit')
         global_init_net = core.Net('init')
         reader.setup_ex(global_init_net, global_exit_net)
+        if stats is not None:
+            stats._setup(
+                '{}/pipe/{}'.format(node_name, task.name),
+                isinstance(reader, ProcessingReader))
 
         out_queue = None
         writer = None
@@ -279,6 +523,13 @@ def _static_threads_task(name, group, final_outputs, reader, num_threads,
             with NetBuilder(name='t:%d' % thread_id) as nb:
                 init_net = core.Net('init')
                 exit_net = core.Net('exit')
+
+                timer_start_net = core.Net('timer_start')
+                timer = timer_start_net.TimerBegin([], counter_name=profiler_name)
+                timer_end_net = core.Net('timer_end')
+                timer_end_net.TimerEnd(timer, [])
+                stats_builder = _instrument_read(reader, stats, init_net, timer)
+
                 read_nets, status, rec = reader.read_record_ex(
                     init_net, exit_net)
                 init_net.ConstantFill(
@@ -301,20 +552,21 @@ def _static_threads_task(name, group, final_outputs, reader, num_threads,
                 else:
                     write_nets = []
 
-                timer_start_net = core.Net('timer_start')
-                timer = timer_start_net.TimerBegin([], counter_name=profiler_name)
-                timer_end_net = core.Net('timer_end')
-                timer_end_net.TimerEnd(timer, [])
-
                 ops.net(init_net)
                 ops.net(core.execution_step(
                     'body',
-                    [timer_start_net] + list(read_nets) + list(write_nets) +
+                    [timer_start_net] +
+                    _instrumented_nets(
+                        stats_builder, read_nets, rec, write_nets) +
                     [timer_end_net],
                     should_stop_blob=status))
                 ops.net(timer_end_net)
                 ops.net(exit_net)
             steps.append(core.to_execution_step(nb))
+        if stats is not None:
+            stats._finish(
+                global_init_net, global_exit_net,
+                _pipe_queues(input_queue, out_queue or output))
         ops.net(global_init_net)
         ops.net(core.execution_step('body', steps, concurrent_substeps=True))
         ops.net(global_exit_net)
@@ -323,7 +575,8 @@ def _static_threads_task(name, group, final_outputs, reader, num_threads,
 
 def _pipe_step(
         input, output=None, num_threads=1, processor=None, name=None,
-        capacity=None, group=None, num_runtime_threads=None, final_outputs=None):
+        capacity=None, group=None, num_runtime_threads=None, final_outputs=None,
+        stats=None):
     """
     """
     assert num_threads <= 1 or num_runtime_threads <= 1, (
@@ -352,11 +605,12 @@ def _pipe_step(
 
     if num_threads > 1:
         return _static_threads_task(
-            name, group, final_outputs, reader, num_threads, output, capacity)
+            name, group, final_outputs, reader, num_threads, output, capacity,
+            stats, input)
     else:
         return _runtime_threads_task(
             name, group, final_outputs, reader, num_runtime_threads, output,
-            capacity)
+            capacity, stats, input)
 
 
 class ProcessingReader(Reader):
@@ -368,12 +622,17 @@ class ProcessingReader(Reader):
         Reader.__init__(self)
         self.reader = reader
         self.processor = make_processor(processor)
+        # set by instrumented pipes to mark the end of the upstream read
+        self.stage_marker = None
 
     def setup_ex(self, init_net, finish_net):
         self.reader.setup_ex(init_net, finish_net)
 
     def read_ex(self, init_net, exit_net):
         read_nets, status, rec = self.reader.read_record_ex(init_net, exit_net)
+        if self.stage_marker is not None:
+            read_nets = list(read_nets) + [self.stage_marker(
+                'read', rec.field_blobs() if rec is not None else None)]
         # We don't use status as stop_blob of NetBuilder it's not guarantee that
         # it would end up being the true stob_blob. For example,
         # ReaderWithLimitBase doesn't pass the status through but rather copy
@@ -23,7 +23,7 @@ from caffe2.python.schema import (
 from caffe2.python import core, workspace
 from caffe2.python.session import LocalSession
 from caffe2.python.dataset import Dataset
-from caffe2.python.pipeline import pipe
+from caffe2.python.pipeline import pipe, PipeStats
 from caffe2.python.queue_util import Queue
 from caffe2.python.task import TaskGroup
 from caffe2.python.test_util import TestCase
@@ -90,3 +90,44 @@ class TestPipeline(TestCase):
 
         for a, b in zip(output.field_blobs(), expected_dst.field_blobs()):
             np.testing.assert_array_equal(a, b)
+
+    def test_pipe_stats(self):
+        N = 20
+        src_values = Struct(('uid', np.array(range(N))))
+        init_net = core.Net('init')
+        with core.NameScope('init'):
+            src_blobs = NewRecord(init_net, src_values)
+            dst_blobs = InitEmptyRecord(init_net, src_values.clone_schema())
+
+        def proc(rec):
+            with core.NameScope('proc'):
+                out = NewRecord(ops, rec)
+            ops.Add([rec.uid(), rec.uid()], [out.uid()])
+            return out
+
+        src_ds = Dataset(src_blobs)
+        dst_ds = Dataset(dst_blobs)
+        stats = PipeStats()
+        with TaskGroup() as tg:
+            out = pipe(
+                src_ds.reader(batch_size=4), processor=proc,
+                num_runtime_threads=2, stats=stats)
+            pipe(out, dst_ds.writer())
+
+        ws = workspace.C.Workspace()
+        FeedRecord(src_blobs, src_values, ws)
+        session = LocalSession(ws)
+        session.run(init_net)
+        session.run(tg)
+
+        summary = stats.summary()
+        self.assertEquals(summary['batches'], N // 4)
+        self.assertEquals(
+            sorted(summary['stages'].keys()), ['process', 'read', 'write'])
+        for stage in summary['stages'].values():
+            self.assertEquals(stage['records'], N)
+            self.assertGreaterEqual(stage['time_sec'], 0)
+        self.assertAlmostEqual(
+            sum(s['time_fraction'] for s in summary['stages'].values()), 1.)
+        self.assertEquals(list(summary['queues'].keys()), [str(out.queue())])
+        self.assertGreater(summary['queues'][str(out.queue())]['occupancy'], 0)
@@ -0,0 +1,159 @@
+# Copyright (c) 2016-present, Facebook, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+
+## @package mapped_params
+# Module caffe2.python.predictor.mapped_params
+"""
+Parameter files that are memory mapped instead of loaded.
+
+A mapped parameter file stores the raw data of a set of tensors, each aligned
+in the file, after an index. The LoadMapped operator makes blobs point into a
+read-only shared mapping of the file, so that all the predictors of a host
+share one page cache copy of the parameters and only fault in the pages they
+touch.
+
+Layout, all integers are little endian uint64:
+    [magic "C2MAPPED"][index size][data offset][TensorProtos index]...[data]
+Every TensorProto of the index has name, dims and data_type set, and its
+segment gives the byte range of its data relative to the data offset.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from caffe2.proto import caffe2_pb2
+from caffe2.python import core, workspace
+from caffe2.python.schema import data_type_for_dtype
+import collections
+import numpy as np
+import os
+import struct
+import tempfile
+
+MAGIC = b'C2MAPPED'
+_HEADER = struct.Struct(str('<8sQQ'))
+
+_DTYPE_FOR_DATA_TYPE = {
+    caffe2_pb2.TensorProto.FLOAT: np.float32,
+    caffe2_pb2.TensorProto.DOUBLE: np.float64,
+    caffe2_pb2.TensorProto.FLOAT16: np.float16,
+    caffe2_pb2.TensorProto.INT32: np.int32,
+    caffe2_pb2.TensorProto.INT64: np.int64,
+    caffe2_pb2.TensorProto.INT16: np.int16,
+    caffe2_pb2.TensorProto.UINT16: np.uint16,
+    caffe2_pb2.TensorProto.INT8: np.int8,
+    caffe2_pb2.TensorProto.UINT8: np.uint8,
+    caffe2_pb2.TensorProto.BOOL: np.bool_,
+}
+
+
+def _align(offset, alignment):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def save_mapped_params(filename, blob_names, alignment=64):
+    '''
+    Writes the blobs 'blob_names' of the current workspace to the mapped
+    parameter file 'filename'. Each tensor is aligned to 'alignment' bytes.
+    Only tensors of fundamental types are supported.
+    '''
+    arrays = []
+    index = caffe2_pb2.TensorProtos()
+    data_size = 0
+    for name in blob_names:
+        name = str(name)
+        arr = np.asarray(workspace.FetchBlob(name), order='C')
+        if arr.dtype.newbyteorder('=') not in [
+                np.dtype(t) for t in _DTYPE_FOR_DATA_TYPE.values()]:
+            raise TypeError(
+                'Cannot map blob {} of type {}'.format(name, arr.dtype))
+        arr = arr.astype(arr.dtype.newbyteorder('<'), copy=False)
+        proto = index.protos.add()
+        proto.name = name
+        proto.dims.extend(arr.shape)
+        proto.data_type = data_type_for_dtype(arr.dtype)
+        begin = _align(data_size, alignment)
+        proto.segment.begin = begin
+        proto.segment.end = begin + arr.nbytes
+        data_size = proto.segment.end
+        arrays.append((begin, arr))
+
+    serialized_index = index.SerializeToString()
+    data_offset = _align(_HEADER.size + len(serialized_index), alignment)
+    # LoadMapped keeps the file mapped while serving, so the file is never
+    # rewritten in place: a new file replaces it, and the existing mappings
+    # keep the previous one.
+    fd, tmp_filename = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(filename)),
+        prefix=os.path.basename(filename) + '.',
+        suffix='.tmp',
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(serialized_index), data_offset))
+            f.write(serialized_index)
+            for begin, arr in arrays:
+                f.seek(data_offset + begin)
+                f.write(arr.tobytes())
+            f.truncate(data_offset + data_size)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file readable by its owner only
+        mode = 0o644
+        if os.path.exists(filename):
+            mode = os.stat(filename).st_mode & 0o777
+        os.chmod(tmp_filename, mode)
+        os.rename(tmp_filename, filename)
+    except Exception:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+
+def load_mapped_params(filename):
+    '''
+    Returns an OrderedDict from blob name to a read-only numpy array backed
+    by a memory mapping of the mapped parameter file 'filename'.
+    '''
+    mapped = np.memmap(filename, dtype=np.uint8, mode='r')
+    magic, index_size, data_offset = _HEADER.unpack(
+        mapped[:_HEADER.size].tobytes())
+    if magic != MAGIC:
+        raise ValueError('{} is not a mapped parameter file'.format(filename))
+    index = caffe2_pb2.TensorProtos()
+    index.ParseFromString(
+        mapped[_HEADER.size:_HEADER.size + index_size].tobytes())
+    params = collections.OrderedDict()
+    for proto in index.protos:
+        dtype = np.dtype(_DTYPE_FOR_DATA_TYPE[proto.data_type]) \
+            .newbyteorder('<')
+        data = mapped[data_offset + proto.segment.begin:
+                      data_offset + proto.segment.end]
+        params[proto.name] = data.view(dtype).reshape(tuple(proto.dims))
+    return params
+
+
+def load_mapped_params_net(filename, blob_names, name='load-mapped-params'):
+    '''
+    Returns a NetDef that makes the blobs 'blob_names' point into the mapped
+    parameter file 'filename' with the LoadMapped operator.
+    '''
+    net = core.Net(name)
+    net.LoadMapped([], [str(b) for b in blob_names],
+                   db=filename, absolute_path=True)
+    net.Proto().external_output.extend([str(b) for b in blob_names])
+    return net.Proto()
@@ -21,6 +21,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 from caffe2.python import core, utils
+from caffe2.python.schema import data_type_for_dtype
 from caffe2.proto import caffe2_pb2
 import numpy as np
 
@@ -56,22 +57,48 @@ def add_tensor(net, name, blob):
     net.op.extend([op])
 
 
-def Export(workspace, net, params):
+def add_packed_tensor(net, name, blob):
+    ''' Create an operator to store the tensor 'blob' as the raw bytes of
+        its elements in a single string argument (GivenTensorByteStringFill).
+        This is several times smaller than the repeated 'values' argument of
+        add_tensor() and is parsed without per element work.
+    '''
+    blob = np.ascontiguousarray(blob)
+    op = core.CreateOperator(
+        "GivenTensorByteStringFill",
+        [], [name],
+        arg=[
+            utils.MakeArgument("shape", blob.shape),
+            utils.MakeArgument("dtype", data_type_for_dtype(blob.dtype)),
+            utils.MakeArgument(
+                "values",
+                blob.astype(blob.dtype.newbyteorder('<')).tobytes()),
+        ]
+    )
+    net.op.extend([op])
+
+
+def Export(workspace, net, params, packed=False):
     """Returns init_net and predict_net suitable for writing to disk
-       and loading into a Predictor"""
+       and loading into a Predictor.
+
+       If packed is True, the params are stored with add_packed_tensor(),
+       which needs a runtime that has the GivenTensorByteStringFill op.
+    """
     proto = net if isinstance(net, caffe2_pb2.NetDef) else net.Proto()
     predict_net = caffe2_pb2.NetDef()
     predict_net.CopyFrom(proto)
     init_net = caffe2_pb2.NetDef()
     # Populate the init_net.
     ssa, blob_versions = core.get_ssa(net)
-    inputs = []
+    inputs = set()
     for versioned_inputs, _ in ssa:
-        inputs += [name for name, _ in versioned_inputs]
+        inputs.update(name for name, _ in versioned_inputs)
 
+    param_names = set(str(p) for p in params)
     input_blobs = [blob_name for blob_name, version in
                    blob_versions.items()
-                   if version == 0 and blob_name not in params]
+                   if version == 0 and blob_name not in param_names]
     # Blobs that are never used as an input to another layer,
     # i.e. strictly output blobs.
     output_blobs = [blob_name for blob_name, version in
@@ -81,7 +108,10 @@ def Export(workspace, net, params):
     for blob_ref in params:
         blob_name = str(blob_ref)
         blob = workspace.FetchBlob(blob_name)
-        add_tensor(init_net, blob_name, blob)
+        if packed:
+            add_packed_tensor(init_net, blob_name, blob)
+        else:
+            add_tensor(init_net, blob_name, blob)
     # We have to make sure the blob exists in the namespace
     # and we can do so with fake data. (Which is immediately overwritten
     # by any typical usage)
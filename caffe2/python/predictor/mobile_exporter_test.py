@@ -17,10 +17,12 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
+from caffe2.proto import caffe2_pb2
 from caffe2.python.test_util import TestCase
 from caffe2.python import workspace, brew
 from caffe2.python.model_helper import ModelHelper
 from caffe2.python.predictor import mobile_exporter
+from caffe2.python.schema import data_type_for_dtype
 import numpy as np
 
 
@@ -84,6 +86,54 @@ class TestMobileExporter(TestCase):
             ref_out, predictor_out, atol=1e-10, rtol=1e-10
         )
 
+    def test_mobile_exporter_packed(self):
+        model = ModelHelper(name="mobile_exporter_test_model")
+        brew.conv(model, 'data', 'conv1', dim_in=1, dim_out=20, kernel=5)
+        brew.max_pool(model, 'conv1', 'pool1', kernel=2, stride=2)
+        brew.fc(model, 'pool1', 'fc2', dim_in=20 * 12 * 12, dim_out=10)
+        brew.softmax(model, 'fc2', 'out')
+
+        workspace.RunNetOnce(model.param_init_net)
+        init_net, predict_net = mobile_exporter.Export(
+            workspace, model.net, model.params
+        )
+        packed_init_net, packed_predict_net = mobile_exporter.Export(
+            workspace, model.net, model.params, packed=True
+        )
+        self.assertEqual(predict_net, packed_predict_net)
+        self.assertLess(packed_init_net.ByteSize(), init_net.ByteSize())
+
+        np_data = np.random.rand(1, 1, 28, 28).astype(np.float32)
+        workspace.FeedBlob("data", np_data)
+        workspace.CreateNet(model.net)
+        workspace.RunNet(model.net)
+        ref_out = workspace.FetchBlob("out")
+
+        # Clear the workspace
+        workspace.ResetWorkspace()
+
+        predictor = workspace.Predictor(
+            packed_init_net.SerializeToString(),
+            packed_predict_net.SerializeToString()
+        )
+        predictor_out = predictor.run([np_data])
+        np.testing.assert_allclose(
+            ref_out, predictor_out[0], atol=1e-10, rtol=1e-10
+        )
+
+        for dtype in [np.int32, np.int64, np.uint8, np.float64]:
+            np_data = np.random.randint(100, size=(3, 4)).astype(dtype)
+            net = caffe2_pb2.NetDef()
+            mobile_exporter.add_packed_tensor(net, "packed", np_data)
+            shapes, types = workspace.InferShapesAndTypes([net])
+            self.assertEqual(shapes["packed"], [3, 4])
+            self.assertEqual(
+                types["packed"], data_type_for_dtype(np_data.dtype))
+            workspace.RunNetOnce(net)
+            packed = workspace.FetchBlob("packed")
+            self.assertEqual(packed.dtype, np_data.dtype)
+            np.testing.assert_array_equal(packed, np_data)
+
     def test_mobile_exporter_datatypes(self):
         model = ModelHelper(name="mobile_exporter_test_model")
         model.Copy("data_int", "out")
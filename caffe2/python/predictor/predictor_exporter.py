@@ -24,6 +24,7 @@ from caffe2.proto import caffe2_pb2
 from caffe2.proto import metanet_pb2
 from caffe2.python import workspace, core, scope
 from caffe2.python.predictor_constants import predictor_constants
+import caffe2.python.predictor.mapped_params as mapped_params
 import caffe2.python.predictor.serde as serde
 import caffe2.python.predictor.predictor_py_utils as utils
 from builtins import bytes
@@ -132,15 +133,21 @@ class PredictorExportMeta(collections.namedtuple(
                                    self.name)
 
 
-def prepare_prediction_net(filename, db_type, device_option=None):
+def prepare_prediction_net(filename, db_type, device_option=None,
+                           mapped_params_path=None):
     '''
     Helper function which loads all required blobs from the db
     and returns prediction net ready to be used
+
+    If the parameters were saved to a mapped parameter file which has been
+    moved since, mapped_params_path gives its new location.
     '''
     metanet_def = load_from_db(filename, db_type, device_option)
 
     global_init_net = utils.GetNet(
         metanet_def, predictor_constants.GLOBAL_INIT_NET_TYPE)
+    if mapped_params_path is not None:
+        set_mapped_params_path(global_init_net, mapped_params_path)
     workspace.RunNetOnce(global_init_net)
 
     predict_init_net = utils.GetNet(
@@ -154,12 +161,32 @@ def prepare_prediction_net(filename, db_type, device_option=None):
     return predict_net
 
 
-def _global_init_net(predictor_export_meta):
+def set_mapped_params_path(global_init_net, mapped_params_path):
+    '''
+    Points the LoadMapped ops of the global init net to mapped_params_path,
+    for mapped parameter files which have been moved since the export.
+    '''
+    for op in global_init_net.op:
+        if op.type == 'LoadMapped':
+            for arg in op.arg:
+                if arg.name == 'db':
+                    arg.s = str(mapped_params_path).encode('utf-8')
+
+
+def _global_init_net(predictor_export_meta, mapped_params_path=None):
     net = core.Net("global-init")
-    net.Load(
-        [predictor_constants.PREDICTOR_DBREADER],
-        predictor_export_meta.parameters)
-    net.Proto().external_input.extend([predictor_constants.PREDICTOR_DBREADER])
+    if mapped_params_path is not None:
+        # Parameters point into a shared read-only mapping of the file
+        # instead of being deserialized from the db
+        net.LoadMapped(
+            [], predictor_export_meta.parameters,
+            db=str(mapped_params_path), absolute_path=True)
+    else:
+        net.Load(
+            [predictor_constants.PREDICTOR_DBREADER],
+            predictor_export_meta.parameters)
+        net.Proto().external_input.extend(
+            [predictor_constants.PREDICTOR_DBREADER])
     net.Proto().external_output.extend(predictor_export_meta.parameters)
 
     # Add the model_id in the predict_net to the global_init_net
@@ -167,8 +194,10 @@ def _global_init_net(predictor_export_meta):
     return net.Proto()
 
 
-def get_meta_net_def(predictor_export_meta, ws=None):
+def get_meta_net_def(predictor_export_meta, ws=None, mapped_params_path=None):
     """
+    If mapped_params_path is set, the global init net maps the parameters
+    from this mapped parameter file instead of loading them from the db.
     """
 
     ws = ws or workspace.C.Workspace.current
@@ -178,7 +207,7 @@ def get_meta_net_def(predictor_export_meta, ws=None):
     utils.AddNet(meta_net_def, predictor_export_meta.predict_init_name(),
                  utils.create_predict_init_net(ws, predictor_export_meta))
     utils.AddNet(meta_net_def, predictor_export_meta.global_init_name(),
-                 _global_init_net(predictor_export_meta))
+                 _global_init_net(predictor_export_meta, mapped_params_path))
     utils.AddNet(meta_net_def, predictor_export_meta.predict_net_name(),
                  utils.create_predict_net(predictor_export_meta))
     utils.AddBlobs(meta_net_def, predictor_export_meta.parameters_name(),
@@ -197,16 +226,28 @@ def set_model_info(meta_net_def, project_str, model_class_str, version):
     meta_net_def.modelInfo.version = version
 
 
-def save_to_db(db_type, db_destination, predictor_export_meta):
-    meta_net_def = get_meta_net_def(predictor_export_meta)
+def save_to_db(db_type, db_destination, predictor_export_meta,
+               mapped_params_path=None):
+    '''
+    Saves the MetaNetDef and the parameters to the db. If mapped_params_path
+    is set, the parameters are written to this mapped parameter file instead
+    and the db only holds the MetaNetDef. Mapped parameters are shared
+    between all the predictors of a host and are read-only.
+    '''
+    meta_net_def = get_meta_net_def(
+        predictor_export_meta, mapped_params_path=mapped_params_path)
     with core.DeviceScope(core.DeviceOption(caffe2_pb2.CPU)):
         workspace.FeedBlob(
             predictor_constants.META_NET_DEF,
             serde.serialize_protobuf_struct(meta_net_def)
         )
 
-    blobs_to_save = [predictor_constants.META_NET_DEF] + \
-        predictor_export_meta.parameters
+    blobs_to_save = [predictor_constants.META_NET_DEF]
+    if mapped_params_path is not None:
+        mapped_params.save_mapped_params(
+            mapped_params_path, predictor_export_meta.parameters)
+    else:
+        blobs_to_save += predictor_export_meta.parameters
     op = core.CreateOperator(
         "Save",
         blobs_to_save, [],
@@ -216,24 +257,28 @@ def save_to_db(db_type, db_destination, predictor_export_meta):
     workspace.RunOperatorOnce(op)
 
 
-def load_from_db(filename, db_type, device_option=None):
+def load_from_db(filename, db_type, device_option=None, ws=None):
+    '''
+    Opens the db and returns its MetaNetDef. The db reader used by the global
+    init net is created in the workspace ws, the current workspace by default.
+    '''
+    ws = ws or workspace.C.Workspace.current
     # global_init_net in meta_net_def will load parameters from
     # predictor_constants.PREDICTOR_DBREADER
     create_db = core.CreateOperator(
         'CreateDB', [],
         [core.BlobReference(predictor_constants.PREDICTOR_DBREADER)],
         db=filename, db_type=db_type)
-    assert workspace.RunOperatorOnce(create_db), (
-        'Failed to create db {}'.format(filename))
+    ws.run(create_db)
 
     # predictor_constants.META_NET_DEF is always stored before the parameters
     load_meta_net_def = core.CreateOperator(
         'Load',
         [core.BlobReference(predictor_constants.PREDICTOR_DBREADER)],
         [core.BlobReference(predictor_constants.META_NET_DEF)])
-    assert workspace.RunOperatorOnce(load_meta_net_def)
+    ws.run(load_meta_net_def)
 
-    blob = workspace.FetchBlob(predictor_constants.META_NET_DEF)
+    blob = ws.fetch_blob(predictor_constants.META_NET_DEF)
     meta_net_def = serde.deserialize_protobuf_struct(
         blob if isinstance(blob, bytes)
         else str(blob).encode('utf-8'),
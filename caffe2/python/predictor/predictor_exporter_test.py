@@ -18,6 +18,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import os
 import tempfile
 import unittest
 import numpy as np
@@ -25,6 +26,7 @@ from caffe2.python import cnn, workspace, core
 from future.utils import viewitems
 
 from caffe2.python.predictor_constants import predictor_constants as pc
+import caffe2.python.predictor.mapped_params as mapped_params
 import caffe2.python.predictor.predictor_exporter as pe
 import caffe2.python.predictor.predictor_py_utils as pred_utils
 from caffe2.proto import caffe2_pb2, metanet_pb2
@@ -211,6 +213,66 @@ class PredictorExporterTest(unittest.TestCase):
             self.assertEqual(1, op.device_option.cuda_gpu_id)
             self.assertEqual(caffe2_pb2.CPU, op.device_option.device_type)
 
+    def test_mapped_params(self):
+        for param, value in viewitems(self.params):
+            workspace.FeedBlob(param, value)
+
+        db_type = 'minidb'
+        db_file = tempfile.NamedTemporaryFile(
+            delete=False, suffix=".{}".format(db_type))
+        mapped_file = tempfile.NamedTemporaryFile(
+            delete=False, suffix=".mapped")
+        pe.save_to_db(
+            db_type=db_type,
+            db_destination=db_file.name,
+            predictor_export_meta=self.predictor_export_meta,
+            mapped_params_path=mapped_file.name)
+
+        loaded = mapped_params.load_mapped_params(mapped_file.name)
+        self.assertEqual(
+            list(loaded.keys()), self.predictor_export_meta.parameters)
+        for param, value in viewitems(loaded):
+            self.assertEqual(value.ctypes.data % 64, 0)
+            self.assertFalse(value.flags.writeable)
+            np.testing.assert_array_equal(value, self.params[param])
+
+        workspace.ResetWorkspace()
+        predict_net = pe.prepare_prediction_net(
+            db_file.name, db_type, mapped_params_path=mapped_file.name)
+        for param, value in viewitems(self.params):
+            np.testing.assert_array_equal(workspace.FetchBlob(param), value)
+
+        workspace.FeedBlob("data", np.random.randn(2, 5).astype(np.float32))
+        workspace.RunNet(predict_net.Proto().name)
+        np.testing.assert_array_almost_equal(
+            workspace.FetchBlob("y"),
+            workspace.FetchBlob("data").dot(self.params["y_w"].T) +
+            self.params["y_b"])
+
+        # Saving again replaces the file, existing mappings keep the old one
+        for param, value in viewitems(self.params):
+            workspace.FeedBlob(param, value + 1)
+        mapped_params.save_mapped_params(
+            mapped_file.name, self.predictor_export_meta.parameters)
+        reloaded = mapped_params.load_mapped_params(mapped_file.name)
+        for param, value in viewitems(self.params):
+            np.testing.assert_array_equal(loaded[param], value)
+            np.testing.assert_array_equal(reloaded[param], value + 1)
+
+    def test_mapped_params_corrupted(self):
+        mapped_file = tempfile.NamedTemporaryFile(
+            delete=False, suffix=".mapped")
+        mapped_file.write(b"C2MAPPED" + b"\xff" * 64)
+        mapped_file.close()
+        op = core.CreateOperator(
+            "LoadMapped", [], ["y_w"], db=mapped_file.name, absolute_path=1)
+        # The mapping is released when the checks fail, loading again fails
+        # the same way.
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                workspace.RunOperatorOnce(op)
+        os.remove(mapped_file.name)
+
     def test_db_fails_without_params(self):
         with self.assertRaises(Exception):
             for db_type in ["minidb"]:
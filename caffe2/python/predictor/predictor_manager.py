@@ -0,0 +1,209 @@
+# Copyright (c) 2016-present, Facebook, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+
+## @package predictor_manager
+# Module caffe2.python.predictor.predictor_manager
+"""
+Serves prediction nets exported with predictor_exporter and swaps them for
+new exports without blocking the requests.
+
+A model is loaded into its own workspace, which only holds the parameters.
+Requests run in child workspaces of it, which see the parameters and hold
+the inputs, outputs and activations of one request at a time. A new model
+is loaded and warmed up while the previous one keeps serving, then the
+serving model is switched. The previous model is released once the requests
+running on it are done.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from caffe2.python import workspace
+from caffe2.python.predictor_constants import predictor_constants
+import caffe2.python.predictor.predictor_exporter as pe
+import caffe2.python.predictor.predictor_py_utils as utils
+import contextlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ServingModel(object):
+    """
+    A loaded prediction net. Runs requests in a pool of child workspaces of
+    the workspace holding the parameters, so that concurrent requests do not
+    share their inputs and activations.
+    """
+
+    def __init__(self, meta_net_def, ws, version, device_option=None):
+        self.meta_net_def = meta_net_def
+        self.version = version
+        self.device_option = device_option
+        self.inputs = [
+            str(b) for b in utils.GetBlobs(
+                meta_net_def, predictor_constants.INPUTS_BLOB_TYPE)]
+        self.outputs = [
+            str(b) for b in utils.GetBlobs(
+                meta_net_def, predictor_constants.OUTPUTS_BLOB_TYPE)]
+        self._ws = ws
+        self._predict_init_net = utils.GetNet(
+            meta_net_def, predictor_constants.PREDICT_INIT_NET_TYPE)
+        self._predict_net = utils.GetNet(
+            meta_net_def, predictor_constants.PREDICT_NET_TYPE)
+        self._lock = threading.Lock()
+        self._free_workers = []
+        self._in_flight = 0
+        self._retired = False
+
+    def _get_worker(self):
+        with self._lock:
+            if self._free_workers:
+                return self._free_workers.pop()
+        child_ws = workspace.C.Workspace(self._ws)
+        child_ws.run(self._predict_init_net)
+        net = child_ws.create_net(self._predict_net)
+        return child_ws, net
+
+    def _put_worker(self, worker):
+        with self._lock:
+            if not self._retired:
+                self._free_workers.append(worker)
+
+    def run(self, inputs):
+        """
+        Runs the prediction net on the inputs, a list of numpy arrays in the
+        order of the exported inputs or a dict from input name to array.
+        Returns the list of outputs.
+        """
+        if not isinstance(inputs, dict):
+            assert len(inputs) == len(self.inputs), (
+                "Expected {} inputs, got {}".format(
+                    len(self.inputs), len(inputs)))
+            inputs = dict(zip(self.inputs, inputs))
+        child_ws, net = self._get_worker()
+        try:
+            for name, value in inputs.items():
+                child_ws.create_blob(str(name)).feed(
+                    value, self.device_option)
+            net.run()
+            return [child_ws.fetch_blob(name) for name in self.outputs]
+        finally:
+            self._put_worker((child_ws, net))
+
+    def _acquire(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+            if self._retired and self._in_flight == 0:
+                self._free()
+
+    def _retire(self):
+        with self._lock:
+            self._retired = True
+            if self._in_flight == 0:
+                self._free()
+
+    def _free(self):
+        # Child workspaces reference the parameters workspace, drop them first.
+        self._free_workers = []
+        self._ws = None
+        logger.info('Released model version {}'.format(self.version))
+
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+
+class PredictorManager(object):
+    """
+    Double buffered predictor. load() prepares the next model while the
+    current one serves, then switches them atomically:
+
+        manager = PredictorManager('minidb')
+        manager.load(db_path, warmup_inputs=[sample])
+        outputs = manager.run([data])
+        manager.load(new_db_path, warmup_inputs=[sample])  # hot swap
+    """
+
+    def __init__(self, db_type, device_option=None):
+        self.db_type = db_type
+        self.device_option = device_option
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._model = None
+        self._version = 0
+
+    def load(self, filename, warmup_inputs=None, mapped_params_path=None,
+             db_type=None):
+        """
+        Loads the exported model in 'filename' into a new workspace, runs the
+        prediction net once on each entry of warmup_inputs, then makes it the
+        serving model. The previous model is released once the requests
+        running on it are done. Returns the version of the new model.
+        """
+        with self._load_lock:
+            ws = workspace.C.Workspace()
+            meta_net_def = pe.load_from_db(
+                filename, db_type or self.db_type,
+                device_option=self.device_option, ws=ws)
+            global_init_net = utils.GetNet(
+                meta_net_def, predictor_constants.GLOBAL_INIT_NET_TYPE)
+            if mapped_params_path is not None:
+                pe.set_mapped_params_path(global_init_net, mapped_params_path)
+            ws.run(global_init_net)
+
+            model = ServingModel(
+                meta_net_def, ws, self._version + 1, self.device_option)
+            for inputs in (warmup_inputs or []):
+                model.run(inputs)
+
+            with self._lock:
+                previous = self._model
+                self._model = model
+                self._version = model.version
+            if previous is not None:
+                previous._retire()
+            logger.info('Serving model version {} from {}'.format(
+                model.version, filename))
+            return model.version
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """
+        Yields the serving model. A model is not released while it is
+        acquired, even if a newer one has been loaded since.
+        """
+        with self._lock:
+            model = self._model
+            assert model is not None, 'No model loaded'
+            model._acquire()
+        try:
+            yield model
+        finally:
+            model._release()
+
+    def run(self, inputs):
+        with self.acquire() as model:
+            return model.run(inputs)
+
+    def version(self):
+        with self._lock:
+            return self._version
@@ -0,0 +1,122 @@
+# Copyright (c) 2016-present, Facebook, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import numpy as np
+from caffe2.python import cnn, workspace
+
+import caffe2.python.predictor.predictor_exporter as pe
+import caffe2.python.predictor.predictor_manager as pm
+
+
+class PredictorManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _export_model(self, name):
+        m = cnn.CNNModelHelper()
+        m.FC("data", "y",
+             dim_in=5, dim_out=10,
+             weight_init=m.XavierInit,
+             bias_init=m.XavierInit)
+        workspace.RunNetOnce(m.param_init_net)
+        pem = pe.PredictorExportMeta(
+            predict_net=m.net.Proto(),
+            parameters=[str(b) for b in m.params],
+            inputs=["data"],
+            outputs=["y"],
+            shapes={"y": (1, 10), "data": (1, 5)},
+        )
+        params = {p: workspace.FetchBlob(p) for p in pem.parameters}
+
+        db_file = os.path.join(self.tmp_dir, name + ".minidb")
+        pe.save_to_db(
+            db_type="minidb",
+            db_destination=db_file,
+            predictor_export_meta=pem)
+        workspace.ResetWorkspace()
+        return db_file, params
+
+    def _expected(self, data, params):
+        return data.dot(params["y_w"].T) + params["y_b"]
+
+    def test_hot_swap(self):
+        np.random.seed(1)
+        first_db, first_params = self._export_model("first")
+        second_db, second_params = self._export_model("second")
+        data = np.random.randn(2, 5).astype(np.float32)
+
+        manager = pm.PredictorManager("minidb")
+        self.assertEqual(
+            manager.load(first_db, warmup_inputs=[[data]]), 1)
+        np.testing.assert_array_almost_equal(
+            manager.run([data])[0], self._expected(data, first_params))
+        # Models live in their own workspaces
+        self.assertEqual(workspace.Blobs(), [])
+
+        with manager.acquire() as first_model:
+            self.assertEqual(manager.load(second_db), 2)
+            # A request in flight keeps running on the previous model
+            np.testing.assert_array_almost_equal(
+                first_model.run({"data": data})[0],
+                self._expected(data, first_params))
+            self.assertEqual(first_model.in_flight(), 1)
+        self.assertEqual(first_model.in_flight(), 0)
+
+        np.testing.assert_array_almost_equal(
+            manager.run([data])[0], self._expected(data, second_params))
+
+    def test_concurrent_requests(self):
+        np.random.seed(1)
+        db, params = self._export_model("model")
+        manager = pm.PredictorManager("minidb")
+        manager.load(db)
+
+        errors = []
+
+        def serve(seed):
+            rng = np.random.RandomState(seed)
+            try:
+                for _ in range(20):
+                    data = rng.randn(
+                        rng.randint(1, 8), 5).astype(np.float32)
+                    np.testing.assert_array_almost_equal(
+                        manager.run([data])[0], self._expected(data, params))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=serve, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -186,6 +186,48 @@ py::object fetchBlob(Workspace* ws, const std::string& name) {
     return py::bytes(ss.str());
   }
 }
+
+py::list fetchBlobs(Workspace* ws, const std::vector<std::string>& names) {
+  py::list result;
+  for (const auto& name : names) {
+    result.append(fetchBlob(ws, name));
+  }
+  return result;
+}
+
+bool feedBlobs(
+    Workspace* ws,
+    const std::vector<std::string>& names,
+    py::list args,
+    py::object device_option) {
+  CAFFE_ENFORCE_EQ(
+      names.size(),
+      args.size(),
+      "Number of blob names and values to feed should be equal");
+  DeviceOption option;
+  if (!device_option.is(py::none())) {
+    // Parse the device option once for all the blobs.
+    CAFFE_ENFORCE(ParseProtoFromLargeString(
+        py::bytes(device_option).cast<std::string>(), &option));
+  }
+  auto feeder = CreateFeeder(option.device_type());
+  for (size_t i = 0; i < names.size(); ++i) {
+    py::object arg = args[i];
+    auto* blob = ws->CreateBlob(names[i]);
+    if (PyArray_Check(arg.ptr())) { // numpy array
+      CAFFE_ENFORCE(feeder, "Unknown device type encountered in FeedBlobs.");
+      feeder->Feed(option, reinterpret_cast<PyArrayObject*>(arg.ptr()), blob);
+    } else if (PyBytes_Check(arg.ptr()) || PyUnicode_Check(arg.ptr())) {
+      *blob->GetMutable<std::string>() = arg.cast<std::string>();
+    } else {
+      CAFFE_THROW(
+          "Unexpected type of argument for blob ",
+          names[i],
+          " - only numpy array or string are supported for feeding");
+    }
+  }
+  return true;
+}
 } // namespace python_detail
 
 class GetPythonGradient : public GradientMakerBase {
@@ -465,6 +507,14 @@ void addObjectMethods(py::module& m) {
           },
           py::return_value_policy::reference_internal)
       .def("fetch_blob", &python_detail::fetchBlob)
+      .def("fetch_blobs", &python_detail::fetchBlobs)
+      .def(
+          "feed_blobs",
+          &python_detail::feedBlobs,
+          "",
+          py::arg("names"),
+          py::arg("args"),
+          py::arg("device_option") = py::none())
       .def(
           "has_blob",
           [](Workspace* self, const std::string& name) {
@@ -490,13 +540,15 @@ void addObjectMethods(py::module& m) {
           })
       .def(
           "_run_plan",
-          [](Workspace* self, py::bytes def) {
+          [](Workspace* self, py::bytes def, bool reuse_nets) {
             caffe2::PlanDef proto;
             CAFFE_ENFORCE(
                 ParseProtoFromLargeString(def.cast<std::string>(), &proto));
             py::gil_scoped_release g;
-            CAFFE_ENFORCE(self->RunPlan(proto));
-          })
+            CAFFE_ENFORCE(self->RunPlan(proto, StopOnSignal{}, reuse_nets));
+          },
+          py::arg("def"),
+          py::arg("reuse_nets") = kPyBindFalse)
       .def(
           "_last_failed_op_net_position",
           [](Workspace* self) {
@@ -625,6 +677,18 @@ void addObjectMethods(py::module& m) {
 
   py::class_<caffe2::onnx::Caffe2BackendRep>(m, "Caffe2BackenRep")
       .def(py::init<>())
+      .def(py::init([](py::bytes init_net,
+                       py::bytes pred_net,
+                       const std::vector<std::string>& uninitialized_inputs) {
+        // Rebuilds a rep from the nets of a prepared one, e.g. from a cache
+        auto* rep = new caffe2::onnx::Caffe2BackendRep();
+        CAFFE_ENFORCE(ParseProtoFromLargeString(
+            init_net.cast<std::string>(), &rep->init_net()));
+        CAFFE_ENFORCE(ParseProtoFromLargeString(
+            pred_net.cast<std::string>(), &rep->pred_net()));
+        rep->uninitialized_inputs() = uninitialized_inputs;
+        return rep;
+      }))
       .def(
           "init_net",
           [](caffe2::onnx::Caffe2BackendRep& instance) {
@@ -1302,6 +1366,89 @@ void addGlobalMethods(py::module& m) {
       py::arg("name"),
       py::arg("arg"),
       py::arg("device_option") = py::none());
+  m.def(
+      "feed_blobs",
+      [](const std::vector<std::string>& names,
+         py::list args,
+         py::object device_option) {
+        return python_detail::feedBlobs(
+            gWorkspace, names, args, device_option);
+      },
+      "",
+      py::arg("names"),
+      py::arg("args"),
+      py::arg("device_option") = py::none());
+  m.def("fetch_blobs", [](const std::vector<std::string>& names) {
+    return python_detail::fetchBlobs(gWorkspace, names);
+  });
+  m.def(
+      "fetch_blobs_into",
+      [](const std::vector<std::string>& names, py::list outputs) {
+        CAFFE_ENFORCE_EQ(
+            names.size(),
+            outputs.size(),
+            "Number of blob names and output arrays should be equal");
+        auto sameShape = [](PyArrayObject* a, int ndim, const npy_intp* dims) {
+          if (PyArray_NDIM(a) != ndim) {
+            return false;
+          }
+          for (int d = 0; d < ndim; ++d) {
+            if (PyArray_DIMS(a)[d] != dims[d]) {
+              return false;
+            }
+          }
+          return true;
+        };
+        for (size_t i = 0; i < names.size(); ++i) {
+          const auto& name = names[i];
+          py::object output = outputs[i];
+          CAFFE_ENFORCE(
+              PyArray_Check(output.ptr()),
+              "Output for blob ",
+              name,
+              " should be a numpy array");
+          auto* out = reinterpret_cast<PyArrayObject*>(output.ptr());
+          CAFFE_ENFORCE(gWorkspace->HasBlob(name), "Can't find blob: ", name);
+          const Blob& blob = *gWorkspace->GetBlob(name);
+          if (blob.IsType<TensorCPU>()) {
+            // Fast path: copy CPU tensor data straight into the output.
+            const auto& tensor = blob.Get<TensorCPU>();
+            const int numpy_type = CaffeToNumpyType(tensor.meta());
+            std::vector<npy_intp> dims(
+                tensor.dims().begin(), tensor.dims().end());
+            if (numpy_type != -1 && numpy_type != NPY_OBJECT &&
+                PyArray_TYPE(out) == numpy_type && PyArray_ISCARRAY(out)) {
+              CAFFE_ENFORCE(
+                  sameShape(out, tensor.ndim(), dims.data()),
+                  "Output array for blob ",
+                  name,
+                  " does not match the blob shape");
+              if (tensor.nbytes() > 0) {
+                memcpy(PyArray_DATA(out), tensor.raw_data(), tensor.nbytes());
+              }
+              continue;
+            }
+          }
+          py::object fetched = python_detail::fetchBlob(gWorkspace, name);
+          CAFFE_ENFORCE(
+              PyArray_Check(fetched.ptr()),
+              "Blob ",
+              name,
+              " can't be fetched into a numpy array");
+          auto* fetched_array =
+              reinterpret_cast<PyArrayObject*>(fetched.ptr());
+          CAFFE_ENFORCE(
+              sameShape(
+                  out, PyArray_NDIM(fetched_array), PyArray_DIMS(fetched_array)),
+              "Output array for blob ",
+              name,
+              " does not match the blob shape");
+          if (PyArray_CopyInto(out, fetched_array) < 0) {
+            throw py::error_already_set();
+          }
+        }
+        return true;
+      });
   m.def("serialize_blob", [](const std::string& name) {
     CAFFE_ENFORCE(gWorkspace);
     auto* blob = gWorkspace->GetBlob(name);
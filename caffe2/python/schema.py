@@ -1021,23 +1021,90 @@ def as_record(value):
         return _normalize_field(value)
 
 
-def FetchRecord(blob_record, ws=None, throw_on_type_mismatch=False):
+class RecordLayout(object):
     """
-    Given a record containing BlobReferences, return a new record with same
-    schema, containing numpy arrays, fetched from the current active workspace.
+    Precompiled layout of a record containing BlobReferences: the names of
+    its blobs and a skeleton record to put fetched values into. Feeds or
+    fetches all the fields of the record with a single call to the
+    workspace.
+
+        layout = RecordLayout(blob_record)
+        layout.feed(arrays)
+        values = layout.fetch()
     """
 
-    def fetch(v):
+    def __init__(self, blob_record):
+        assert isinstance(blob_record, Field)
+        self._scalars = blob_record.all_scalars()
+        self._blobs = [scalar.get() for scalar in self._scalars]
+        assert all(isinstance(v, BlobReference) for v in self._blobs)
+        self.blob_names = [str(blob) for blob in self._blobs]
+        self._skeleton = blob_record.clone_schema()
+        self._skeleton_scalars = self._skeleton.all_scalars()
+
+    def matches(self, blob_record):
+        """True if the blobs of blob_record did not change since the layout
+        was built from it."""
+        return all(
+            scalar._blob is blob
+            for scalar, blob in zip(self._scalars, self._blobs))
+
+    def fetch(self, ws=None, throw_on_type_mismatch=False, reuse_record=True):
+        """
+        Fetches the blobs of the record, from the current workspace or `ws`,
+        into a record with the same schema. With reuse_record, the record is
+        the skeleton of the layout and is overwritten by the next fetch.
+        """
         if ws is None:
-            return workspace.FetchBlob(str(v))
+            arrays = workspace.FetchBlobs(self.blob_names)
         else:
-            return ws.blobs[str(v)].fetch()
+            arrays = ws.fetch_blobs(self.blob_names)
+        if not reuse_record:
+            return from_blob_list(
+                self._skeleton, arrays, throw_on_type_mismatch)
+        for scalar, array in zip(self._skeleton_scalars, arrays):
+            scalar.set_value(array, throw_on_type_mismatch, unsafe=True)
+        return self._skeleton
+
+    def feed(self, arrays, ws=None, device_option=None):
+        """
+        Feeds the arrays, a list of numpy arrays or a record containing numpy
+        arrays, to the blobs of the record in the current workspace or `ws`.
+        """
+        if isinstance(arrays, Field):
+            # TODO: check schema
+            arrays = arrays.field_blobs()
+        assert len(arrays) == len(self.blob_names), (
+            'Values must contain exactly %d ndarrays.' % len(self.blob_names)
+        )
+        if ws is None:
+            workspace.FeedBlobs(self.blob_names, arrays, device_option)
+        elif device_option is None:
+            ws.feed_blobs(self.blob_names, list(arrays))
+        else:
+            ws.feed_blobs(
+                self.blob_names, list(arrays),
+                workspace.StringifyProto(device_option))
+
 
-    assert isinstance(blob_record, Field)
-    field_blobs = blob_record.field_blobs()
-    assert all(isinstance(v, BlobReference) for v in field_blobs)
-    field_arrays = [fetch(value) for value in field_blobs]
-    return from_blob_list(blob_record, field_arrays, throw_on_type_mismatch)
+def _record_layout(blob_record):
+    # The layout is cached on the record, and rebuilt if a blob of the record
+    # has been replaced since. Not using getattr since List forwards unknown
+    # attributes to its items.
+    layout = blob_record.__dict__.get('_record_layout')
+    if layout is None or not layout.matches(blob_record):
+        layout = RecordLayout(blob_record)
+        blob_record._record_layout = layout
+    return layout
+
+
+def FetchRecord(blob_record, ws=None, throw_on_type_mismatch=False):
+    """
+    Given a record containing BlobReferences, return a new record with same
+    schema, containing numpy arrays, fetched from the current active workspace.
+    """
+    return _record_layout(blob_record).fetch(
+        ws, throw_on_type_mismatch, reuse_record=False)
 
 
 def FeedRecord(blob_record, arrays, ws=None):
@@ -1046,25 +1113,7 @@ def FeedRecord(blob_record, arrays, ws=None):
     a list of numpy arrays or a Record containing numpy arrays, feeds the
     record to the current workspace.
     """
-
-    def feed(b, v):
-        if ws is None:
-            workspace.FeedBlob(str(b), v)
-        else:
-            ws.create_blob(str(b))
-            ws.blobs[str(b)].feed(v)
-
-    assert isinstance(blob_record, Field)
-    field_blobs = blob_record.field_blobs()
-    assert all(isinstance(v, BlobReference) for v in field_blobs)
-    if isinstance(arrays, Field):
-        # TODO: check schema
-        arrays = arrays.field_blobs()
-    assert len(arrays) == len(field_blobs), (
-        'Values must contain exactly %d ndarrays.' % len(field_blobs)
-    )
-    for blob, array in zip(field_blobs, arrays):
-        feed(blob, array)
+    _record_layout(blob_record).feed(arrays, ws)
 
 
 def NewRecord(net, schema):
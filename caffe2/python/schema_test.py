@@ -18,7 +18,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-from caffe2.python import core, schema
+from caffe2.python import core, schema, workspace
 import numpy as np
 
 import unittest
@@ -381,3 +381,34 @@ class TestDB(unittest.TestCase):
         assert t.get('field_0', None) == s1
         assert t.get('field_1', None) == s2
         assert t.get('field_2', None) is None
+
+    def testRecordLayout(self):
+        net = core.Net('test_net')
+        record = schema.NewRecord(net, schema.Struct(
+            ('a', schema.Scalar(np.int32)),
+            ('b', schema.List(schema.Struct(
+                ('c', schema.Scalar(np.float32)),
+                ('d', schema.Scalar(np.int64)),
+            ))),
+        ))
+        arrays = [
+            np.array([1, 2], dtype=np.int32),
+            np.array([2, 1], dtype=np.int32),
+            np.array([0.5, 1.5, 2.5], dtype=np.float32),
+            np.array([3, 4, 5], dtype=np.int64),
+        ]
+        schema.FeedRecord(record, arrays)
+        fetched = schema.FetchRecord(record)
+        self.assertEqual(fetched, record)
+        for expected, array in zip(arrays, fetched.field_blobs()):
+            np.testing.assert_array_equal(expected, array)
+
+        layout = schema.RecordLayout(record.b)
+        self.assertEqual(
+            layout.blob_names, [str(b) for b in record.b.field_blobs()])
+        first = layout.fetch()
+        np.testing.assert_array_equal(first.c(), arrays[2])
+        layout.feed([arrays[1], arrays[2] * 2, arrays[3]])
+        self.assertIs(layout.fetch(), first)
+        np.testing.assert_array_equal(first.c(), arrays[2] * 2)
+        workspace.ResetWorkspace()
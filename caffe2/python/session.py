@@ -24,6 +24,10 @@ from __future__ import unicode_literals
 from caffe2.python import core, workspace
 from caffe2.python.task import Cluster, Task, TaskGroup, WorkspaceType
 
+import collections
+import threading
+import weakref
+
 
 class CompiledRunnable(object):
     """ Wrapper for compiled runnable returned from session.compile() """
@@ -32,6 +36,83 @@ class CompiledRunnable(object):
         self.session_class = session_class
 
 
+CompileCacheStats = collections.namedtuple(
+    'CompileCacheStats', ['hits', 'misses', 'evictions', 'size'])
+
+
+class CompileCache(object):
+    """
+    Least recently used cache of the runnables compiled by the sessions,
+    keyed by session class and runnable identity.
+
+    Runnables are referenced weakly when possible, and their entry is dropped
+    when they are garbage collected. Since compiled runnables may reference
+    the runnable they were compiled from, the cache is also bounded to
+    `max_size` entries (unbounded if None), evicting the least recently used
+    ones first.
+    """
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        # Reentrant, weakref callbacks may run while the lock is held.
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _ref(self, key, runnable):
+        def remove(ref):
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] is ref:
+                    del self._entries[key]
+        try:
+            return weakref.ref(runnable, remove)
+        except TypeError:
+            # Not weakly referenceable, keep it alive while it is cached.
+            return lambda: runnable
+
+    def get(self, session_class, runnable):
+        key = (session_class, id(runnable))
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0]() is not runnable:
+                self._misses += 1
+                return None
+            self._entries[key] = entry
+            self._hits += 1
+            return entry[1]
+
+    def put(self, session_class, runnable, compiled):
+        key = (session_class, id(runnable))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (self._ref(key, runnable), compiled)
+            self._evict()
+
+    def resize(self, max_size):
+        with self._lock:
+            self.max_size = max_size
+            self._evict()
+
+    def _evict(self):
+        while self.max_size is not None and len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return CompileCacheStats(
+                self._hits, self._misses, self._evictions, len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+
 class Session(object):
     """
     Allows to run Nets, ExecutionSteps, Plans, Tasks and TaskGroups.
@@ -88,7 +169,7 @@ class Session(object):
         will only be able to share blobs defined on a common parent Workspace.
     """
 
-    _compiled_cache = {}
+    _compiled_cache = CompileCache(max_size=1024)
 
     def __init__(self):
         self._open = True
@@ -105,8 +186,9 @@ class Session(object):
                     cls.__name__, runnable.session_class.__name__))
             return runnable
 
-        if runnable in cls._compiled_cache:
-            return cls._compiled_cache[runnable]
+        compiled = cls._compiled_cache.get(cls, runnable)
+        if compiled is not None:
+            return compiled
 
         if isinstance(runnable, TaskGroup):
             if workspace_type:
@@ -142,9 +224,19 @@ class Session(object):
                 tg.add(Task(step=step))
         compiled = CompiledRunnable(
             cls._compile_task_group(tg, setup_net_list), session_class=cls)
-        cls._compiled_cache[runnable] = compiled
+        cls._compiled_cache.put(cls, runnable, compiled)
         return compiled
 
+    @classmethod
+    def compile_cache_stats(cls):
+        """Returns the CompileCacheStats of the compile cache."""
+        return cls._compiled_cache.stats()
+
+    @classmethod
+    def set_compile_cache_size(cls, max_size):
+        """Bounds the compile cache to max_size runnables, or None."""
+        cls._compiled_cache.resize(max_size)
+
     def run(self, runnable, workspace_type=None, setup_net_list=None):
         """Run the given runnable.
 
@@ -196,10 +288,19 @@ class LocalSession(Session):
     Currently, LocalSession runs all parallel tasks in the same workspace,
     but this behavior may change in the future. Only tasks pointing to the
     same logical node are guaranteed to always run in the same workspace.
+
+    With `persistent=True`, the nets of a compiled runnable are instantiated
+    in the global workspace on its first run only, and reused as is by the
+    following runs, as long as no other runnable of this session has
+    instantiated nets of the same name in between. Nets keep their state
+    across runs, and nets of private workspaces are always re-created.
     """
-    def __init__(self, ws=None):
+    def __init__(self, ws=None, persistent=False):
         Session.__init__(self)
         self._ws = ws or workspace.C.Workspace.current
+        self._persistent = persistent
+        # Net name -> weak reference to the plan that instantiated it.
+        self._net_owners = {}
 
     @classmethod
     def _compile_task_group(cls, task_group, setup_net_list=None):
@@ -221,8 +322,26 @@ class LocalSession(Session):
         task_ws = (
             workspace.C.Workspace(self._ws)
             if workspace_type == WorkspaceType.PRIVATE else self._ws)
+        reuse_nets = False
+        if self._persistent and workspace_type != WorkspaceType.PRIVATE:
+            reuse_nets = self._instantiate(plan)
         with workspace.WorkspaceGuard(task_ws):
-            task_ws.run(plan)
+            task_ws.run(plan, reuse_nets=reuse_nets)
+
+    def _instantiate(self, plan):
+        """
+        Records that the nets of the plan are instantiated by it, returns
+        whether they already were.
+        """
+        net_names = [net.name for net in plan.Proto().network]
+        instantiated = all(
+            name in self._net_owners and self._net_owners[name]() is plan
+            for name in net_names)
+        if not instantiated:
+            ref = weakref.ref(plan)
+            for name in net_names:
+                self._net_owners[name] = ref
+        return instantiated
 
     def _fetch_output(self, output):
         return self._ws.blobs[str(output)].fetch()
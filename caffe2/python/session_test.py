@@ -21,14 +21,26 @@ from __future__ import unicode_literals
 from caffe2.python.schema import (
     Struct, FetchRecord, NewRecord, FeedRecord, InitEmptyRecord)
 from caffe2.python import core, workspace
-from caffe2.python.session import LocalSession
+from caffe2.python.session import CompileCache, LocalSession
 from caffe2.python.dataset import Dataset
 from caffe2.python.pipeline import pipe
 from caffe2.python.task import TaskGroup
 from caffe2.python.test_util import TestCase
+import gc
 import numpy as np
 
 
+_num_instantiations = [0]
+
+
+def _make_counting_op():
+    _num_instantiations[0] += 1
+
+    def f(inputs, outputs):
+        pass
+    return f
+
+
 class TestLocalSession(TestCase):
     def test_local_session(self):
         init_net = core.Net('init')
@@ -76,3 +88,31 @@ class TestLocalSession(TestCase):
 
         for a, b in zip(output.field_blobs(), expected_dst.field_blobs()):
             np.testing.assert_array_equal(a, b)
+
+    def test_compile_cache(self):
+        cache = CompileCache(max_size=2)
+        nets = [core.Net('cached_{}'.format(i)) for i in range(3)]
+        for net in nets:
+            self.assertIsNone(cache.get(LocalSession, net))
+            cache.put(LocalSession, net, str(net))
+        # The least recently used runnable was evicted
+        self.assertIsNone(cache.get(LocalSession, nets[0]))
+        self.assertEqual(cache.get(LocalSession, nets[1]), str(nets[1]))
+        self.assertEqual(cache.get(LocalSession, nets[2]), str(nets[2]))
+        self.assertEqual(cache.stats(), (2, 4, 1, 2))
+
+        # Runnables are not kept alive by the cache
+        del nets[1:], net
+        gc.collect()
+        self.assertEqual(len(cache), 0)
+
+    def test_persistent_session(self):
+        for persistent, num_instantiations in [(False, 3), (True, 1)]:
+            _num_instantiations[0] = 0
+            net = core.Net('counting')
+            net.Python((_make_counting_op, [], {}))([], [])
+            session = LocalSession(
+                workspace.C.Workspace(), persistent=persistent)
+            for _ in range(3):
+                session.run(net)
+            self.assertEqual(_num_instantiations[0], num_instantiations)
@@ -19,9 +19,33 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
+from past.builtins import basestring
 from caffe2.python import core
 from caffe2.python.dataio import Reader
 from caffe2.python.schema import Scalar, Struct, data_type_for_dtype
+import glob
+
+
+def _field_types(schema):
+    assert isinstance(schema, Struct), 'Schema must be a schema.Struct'
+    for name, child in schema.get_children():
+        assert isinstance(child, Scalar), (
+            'Only scalar fields are supported in TextFileReader.')
+    return [data_type_for_dtype(dtype) for dtype in schema.field_types()]
+
+
+def _read_batch(net, reader, num_fields, batch_size):
+    blobs = net.TextFileReaderRead(
+        [reader], num_fields, batch_size=batch_size)
+    if type(blobs) is core.BlobReference:
+        blobs = [blobs]
+
+    is_empty = net.IsEmpty(
+        [blobs[0]],
+        core.ScopedBlobReference(net.NextName('should_stop'))
+    )
+
+    return (is_empty, blobs)
 
 
 class TextFileReader(Reader):
@@ -36,16 +60,12 @@ class TextFileReader(Reader):
             init_net   : Net that will be run only once at startup.
             filename   : Path to file to read from.
             schema     : schema.Struct representing the schema of the data.
-                         Currently, only support Struct of strings.
+                         Currently, only support Struct of scalars of
+                         strings, float, double, int32 or int64.
             num_passes : Number of passes over the data.
             batch_size : Number of rows to read at a time.
         """
-        assert isinstance(schema, Struct), 'Schema must be a schema.Struct'
-        for name, child in schema.get_children():
-            assert isinstance(child, Scalar), (
-                'Only scalar fields are supported in TextFileReader.')
-        field_types = [
-            data_type_for_dtype(dtype) for dtype in schema.field_types()]
+        field_types = _field_types(schema)
         Reader.__init__(self, schema)
         self._reader = init_net.CreateTextFileReader(
             [],
@@ -58,16 +78,71 @@ class TextFileReader(Reader):
         """
         Create op for reading a batch of rows.
         """
-        blobs = net.TextFileReaderRead(
-            [self._reader],
-            len(self.schema().field_names()),
-            batch_size=self._batch_size)
-        if type(blobs) is core.BlobReference:
-            blobs = [blobs]
+        return _read_batch(
+            net, self._reader, len(self.schema().field_names()),
+            self._batch_size)
+
+
+class ShardedTextFileReader(Reader):
+    """
+    Reads a set of text files split into shards, the i-th file belonging to
+    shard i % num_shards. Each instance of the reading task reads its own
+    shard, so that pipe(num_runtime_threads=num_shards) or
+    pipe(num_threads=num_shards) reads the files in parallel.
+    """
+    def __init__(self, filenames, schema, num_shards=1, num_passes=1,
+                 batch_size=1):
+        """
+        Args:
+            filenames  : List of paths of the files to read, or a glob
+                         pattern. Files with a .gz extension are decompressed.
+            schema     : schema.Struct of scalar fields, see TextFileReader.
+                         Numeric fields are parsed into tensors of their type.
+            num_shards : Number of shards, which must be the number of
+                         instances of the task reading from this reader.
+            num_passes : Number of passes over the data.
+            batch_size : Number of rows to read at a time.
+        """
+        if isinstance(filenames, basestring):
+            pattern = filenames
+            filenames = sorted(glob.glob(pattern))
+            assert filenames, 'No file matches {}'.format(pattern)
+        self._field_types = _field_types(schema)
+        Reader.__init__(self, schema)
+        self._filenames = [str(f) for f in filenames]
+        self._num_shards = num_shards
+        self._num_passes = num_passes
+        self._batch_size = batch_size
+        self._shard_counter = None
 
-        is_empty = net.IsEmpty(
-            [blobs[0]],
-            core.ScopedBlobReference(net.NextName('should_stop'))
-        )
+    def setup_ex(self, init_net, finish_net):
+        if self._shard_counter is None:
+            self._shard_counter = init_net.CreateCounter([], init_count=0)
+            # Shards without an instance reading them would be silently
+            # skipped.
+            num_readers = finish_net.RetrieveCount([self._shard_counter])
+            num_shards = finish_net.ConstantFill(
+                [], shape=[], value=self._num_shards,
+                dtype=core.DataType.INT64)
+            finish_net.Assert(
+                finish_net.GE([num_readers, num_shards]),
+                error_msg='ShardedTextFileReader has {} shards but fewer '
+                          'reader instances'.format(self._num_shards))
 
-        return (is_empty, blobs)
+    def read_ex(self, local_init_net, local_finish_net):
+        assert self._shard_counter is not None, (
+            'setup_ex must be called before read_ex')
+        shard_id = local_init_net.CountUp(
+            [self._shard_counter],
+            core.ScopedBlobReference(local_init_net.NextName('shard_id')))
+        reader = local_init_net.CreateTextFileReader(
+            [shard_id],
+            core.ScopedBlobReference(local_init_net.NextName('reader')),
+            filenames=self._filenames,
+            num_shards=self._num_shards,
+            num_passes=self._num_passes,
+            field_types=self._field_types)
+        read_net = core.Net('sharded_text_file_reader')
+        should_stop, blobs = _read_batch(
+            read_net, reader, len(self._field_types), self._batch_size)
+        return [read_net], should_stop, blobs
@@ -41,64 +41,226 @@ def CaffeBlobToNumpyArray(blob):
                 .reshape(blob.shape.dim))
 
 
-def Caffe2TensorToNumpyArray(tensor):
-    if tensor.data_type == caffe2_pb2.TensorProto.FLOAT:
-        return np.asarray(
-            tensor.float_data, dtype=np.float32).reshape(tensor.dims)
-    elif tensor.data_type == caffe2_pb2.TensorProto.DOUBLE:
-        return np.asarray(
-            tensor.double_data, dtype=np.float64).reshape(tensor.dims)
-    elif tensor.data_type == caffe2_pb2.TensorProto.INT32:
-        return np.asarray(
-            tensor.int32_data, dtype=np.int).reshape(tensor.dims)   # pb.INT32=>np.int use int32_data
-    elif tensor.data_type == caffe2_pb2.TensorProto.INT16:
-        return np.asarray(
-            tensor.int32_data, dtype=np.int16).reshape(tensor.dims)  # pb.INT16=>np.int16 use int32_data
-    elif tensor.data_type == caffe2_pb2.TensorProto.UINT16:
-        return np.asarray(
-            tensor.int32_data, dtype=np.uint16).reshape(tensor.dims)  # pb.UINT16=>np.uint16 use int32_data
-    elif tensor.data_type == caffe2_pb2.TensorProto.INT8:
-        return np.asarray(
-            tensor.int32_data, dtype=np.int8).reshape(tensor.dims)  # pb.INT8=>np.int8 use int32_data
-    elif tensor.data_type == caffe2_pb2.TensorProto.UINT8:
-        return np.asarray(
-            tensor.int32_data, dtype=np.uint8).reshape(tensor.dims)  # pb.UINT8=>np.uint8 use int32_data
+# TensorProto data types stored as little endian floating point numbers in
+# a packed repeated field.
+_TENSOR_FLOAT_FIELDS = {
+    caffe2_pb2.TensorProto.FLOAT: ('float_data', np.dtype('<f4')),
+    caffe2_pb2.TensorProto.DOUBLE: ('double_data', np.dtype('<f8')),
+}
+
+# TensorProto data types stored as varints in a packed repeated field, with
+# the numpy type they are converted to.
+_TENSOR_VARINT_FIELDS = {
+    caffe2_pb2.TensorProto.INT32: ('int32_data', np.int),
+    caffe2_pb2.TensorProto.INT16: ('int32_data', np.int16),
+    caffe2_pb2.TensorProto.UINT16: ('int32_data', np.uint16),
+    caffe2_pb2.TensorProto.INT8: ('int32_data', np.int8),
+    caffe2_pb2.TensorProto.UINT8: ('int32_data', np.uint8),
+    caffe2_pb2.TensorProto.BOOL: ('int32_data', np.bool_),
+    caffe2_pb2.TensorProto.INT64: ('int64_data', np.int64),
+}
+
+_NUMPY_TO_TENSOR_TYPE = {
+    np.dtype(np.float32): caffe2_pb2.TensorProto.FLOAT,
+    np.dtype(np.float64): caffe2_pb2.TensorProto.DOUBLE,
+    np.dtype(np.int32): caffe2_pb2.TensorProto.INT32,
+    np.dtype(np.int16): caffe2_pb2.TensorProto.INT16,
+    np.dtype(np.uint16): caffe2_pb2.TensorProto.UINT16,
+    np.dtype(np.int8): caffe2_pb2.TensorProto.INT8,
+    np.dtype(np.uint8): caffe2_pb2.TensorProto.UINT8,
+    np.dtype(np.bool_): caffe2_pb2.TensorProto.BOOL,
+    np.dtype(np.int64): caffe2_pb2.TensorProto.INT64,
+    np.dtype(np.float16): caffe2_pb2.TensorProto.FLOAT16,
+}
+
+_WIRETYPE_VARINT = 0
+_WIRETYPE_FIXED64 = 1
+_WIRETYPE_LENGTH_DELIMITED = 2
+_WIRETYPE_FIXED32 = 5
+
+
+def _TensorFieldNumber(field_name):
+    return caffe2_pb2.TensorProto.DESCRIPTOR.fields_by_name[field_name].number
+
+
+def _EncodeVarints(values):
+    """Encodes integers as concatenated protobuf varints. Negative numbers
+    are encoded as 64 bit two's complement, like protobuf does for int32 and
+    int64 fields.
+    """
+    values = np.asarray(values).astype(np.int64).view(np.uint64).ravel()
+    num_bytes = np.ones(values.shape, dtype=np.int64)
+    for i in range(1, 10):
+        num_bytes += values >= (np.uint64(1) << np.uint64(7 * i))
+    max_bytes = int(num_bytes.max()) if values.size else 0
+    # byte i of every value in column i, continuation bit set on all the
+    # bytes but the last one of each value
+    encoded = np.empty((values.size, max_bytes), dtype=np.uint8)
+    for i in range(max_bytes):
+        encoded[:, i] = (values >> np.uint64(7 * i)) & np.uint64(0x7f)
+        encoded[:, i] |= (num_bytes > i + 1).view(np.uint8) << 7
+    return encoded[np.arange(max_bytes) < num_bytes[:, None]].tobytes()
+
+
+def _DecodeVarints(buf):
+    """Decodes concatenated protobuf varints into an int64 array."""
+    data = np.frombuffer(buf, dtype=np.uint8)
+    if data.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    if ends.size == 0 or ends[-1] != data.size - 1:
+        raise DecodeError("Truncated varint.")
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    shifts = 7 * (np.arange(data.size) - np.repeat(starts, ends - starts + 1))
+    values = (data & 0x7f).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.add.reduceat(values, starts).view(np.int64)
+
+
+def _ReadVarint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = ord(buf[pos:pos + 1])
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _PackedField(field_number, payload):
+    """Returns the wire format of a packed repeated field."""
+    header = _EncodeVarints(
+        [(field_number << 3) | _WIRETYPE_LENGTH_DELIMITED, len(payload)])
+    return header + payload
+
+
+def _ReadPackedField(serialized, field_number):
+    """Returns the payload of the packed repeated field 'field_number' of a
+    serialized message, only walking the top level records. Returns None if
+    the field has records which are not packed.
+    """
+    view = memoryview(serialized)
+    payloads = []
+    pos = 0
+    while pos < len(serialized):
+        key, pos = _ReadVarint(serialized, pos)
+        wire_type = key & 0x7
+        if wire_type == _WIRETYPE_VARINT:
+            _, end = _ReadVarint(serialized, pos)
+        elif wire_type == _WIRETYPE_FIXED64:
+            end = pos + 8
+        elif wire_type == _WIRETYPE_FIXED32:
+            end = pos + 4
+        elif wire_type == _WIRETYPE_LENGTH_DELIMITED:
+            length, pos = _ReadVarint(serialized, pos)
+            end = pos + length
+        else:
+            raise DecodeError("Unexpected wire type {}.".format(wire_type))
+        if key >> 3 == field_number:
+            if wire_type != _WIRETYPE_LENGTH_DELIMITED:
+                return None
+            payloads.append(view[pos:end])
+        pos = end
+    if len(payloads) == 1:
+        return payloads[0]
+    return b''.join(p.tobytes() for p in payloads)
+
+
+def Caffe2TensorToNumpyArray(tensor, copy=True):
+    '''
+    Converts a TensorProto into a numpy array. Numeric data is read from the
+    raw bytes of the proto in bulk instead of element by element.
+
+    copy: if False, float, double, float16 and byte tensors are returned as
+          read-only views of the proto data. Other types are always copied.
+    '''
+    data_type = tensor.data_type
+    is_view = True
+    if data_type == caffe2_pb2.TensorProto.FLOAT16 and \
+            tensor.HasField('byte_data'):
+        arr = np.frombuffer(tensor.byte_data, dtype=np.dtype('<f2'))
+    elif data_type == caffe2_pb2.TensorProto.FLOAT16:
+        # float16 bits stored in int32_data, as by older serializers
+        arr = Caffe2TensorToNumpyArray(
+            _WithDataType(tensor, caffe2_pb2.TensorProto.UINT16))
+        arr = arr.view(np.float16)
+        is_view = False
+    elif data_type == caffe2_pb2.TensorProto.BYTE:
+        arr = np.frombuffer(tensor.byte_data, dtype=np.uint8)
+    elif data_type == caffe2_pb2.TensorProto.STRING:
+        arr = np.empty(len(tensor.string_data), dtype=object)
+        arr[:] = list(tensor.string_data)
+        is_view = False
+    elif data_type in _TENSOR_FLOAT_FIELDS:
+        field_name, dtype = _TENSOR_FLOAT_FIELDS[data_type]
+        payload = _ReadPackedField(
+            tensor.SerializeToString(), _TensorFieldNumber(field_name))
+        if payload is None:
+            arr = np.asarray(getattr(tensor, field_name), dtype=dtype)
+            is_view = False
+        else:
+            arr = np.frombuffer(payload, dtype=dtype)
+    elif data_type in _TENSOR_VARINT_FIELDS:
+        field_name, dtype = _TENSOR_VARINT_FIELDS[data_type]
+        payload = _ReadPackedField(
+            tensor.SerializeToString(), _TensorFieldNumber(field_name))
+        if payload is None:
+            arr = np.asarray(getattr(tensor, field_name), dtype=np.int64)
+        else:
+            arr = _DecodeVarints(payload)
+        arr = arr.astype(dtype)
+        is_view = False
     else:
-        # TODO: complete the data type: bool, float16, byte, int64, string
         raise RuntimeError(
             "Tensor data type not supported yet: " + str(tensor.data_type))
+    if is_view and copy:
+        arr = arr.copy()
+    return arr.reshape(tensor.dims)
+
+
+def _WithDataType(tensor, data_type):
+    shallow = caffe2_pb2.TensorProto()
+    shallow.CopyFrom(tensor)
+    shallow.data_type = data_type
+    return shallow
 
 
 def NumpyArrayToCaffe2Tensor(arr, name=None):
+    '''
+    Converts a numpy array into a TensorProto laid out like the C++
+    serializer does. Numeric data is written to the proto as one raw packed
+    field instead of element by element.
+    '''
+    arr = np.asarray(arr)
     tensor = caffe2_pb2.TensorProto()
     tensor.dims.extend(arr.shape)
     if name:
         tensor.name = name
-    if arr.dtype == np.float32:
-        tensor.data_type = caffe2_pb2.TensorProto.FLOAT
-        tensor.float_data.extend(list(arr.flatten().astype(float)))
-    elif arr.dtype == np.float64:
-        tensor.data_type = caffe2_pb2.TensorProto.DOUBLE
-        tensor.double_data.extend(list(arr.flatten().astype(np.float64)))
-    elif arr.dtype == np.int or arr.dtype == np.int32:
-        tensor.data_type = caffe2_pb2.TensorProto.INT32
-        tensor.int32_data.extend(arr.flatten().astype(np.int).tolist())
-    elif arr.dtype == np.int16:
-        tensor.data_type = caffe2_pb2.TensorProto.INT16
-        tensor.int32_data.extend(list(arr.flatten().astype(np.int16)))  # np.int16=>pb.INT16 use int32_data
-    elif arr.dtype == np.uint16:
-        tensor.data_type = caffe2_pb2.TensorProto.UINT16
-        tensor.int32_data.extend(list(arr.flatten().astype(np.uint16)))  # np.uint16=>pb.UNIT16 use int32_data
-    elif arr.dtype == np.int8:
-        tensor.data_type = caffe2_pb2.TensorProto.INT8
-        tensor.int32_data.extend(list(arr.flatten().astype(np.int8)))   # np.int8=>pb.INT8 use int32_data
-    elif arr.dtype == np.uint8:
-        tensor.data_type = caffe2_pb2.TensorProto.UINT8
-        tensor.int32_data.extend(list(arr.flatten().astype(np.uint8)))   # np.uint8=>pb.UNIT8 use int32_data
-    else:
-        # TODO: complete the data type: bool, float16, byte, int64, string
+    if arr.dtype.kind in ('S', 'U', 'O'):
+        tensor.data_type = caffe2_pb2.TensorProto.STRING
+        tensor.string_data.extend([
+            x if isinstance(x, binary_type) else text_type(x).encode('utf-8')
+            for x in arr.flatten()])
+        return tensor
+    data_type = _NUMPY_TO_TENSOR_TYPE.get(arr.dtype.newbyteorder('='))
+    if data_type is None:
         raise RuntimeError(
             "Numpy data type not supported yet: " + str(arr.dtype))
+    tensor.data_type = data_type
+    if data_type == caffe2_pb2.TensorProto.FLOAT16:
+        tensor.byte_data = arr.astype(np.dtype('<f2')).tobytes()
+    elif data_type in _TENSOR_FLOAT_FIELDS:
+        field_name, dtype = _TENSOR_FLOAT_FIELDS[data_type]
+        tensor.MergeFromString(_PackedField(
+            _TensorFieldNumber(field_name),
+            np.ascontiguousarray(arr, dtype=dtype).tobytes()))
+    else:
+        field_name, _ = _TENSOR_VARINT_FIELDS[data_type]
+        tensor.MergeFromString(_PackedField(
+            _TensorFieldNumber(field_name), _EncodeVarints(arr)))
     return tensor
 
 
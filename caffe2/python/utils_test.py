@@ -0,0 +1,85 @@
+# Copyright (c) 2016-present, Facebook, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##############################################################################
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from caffe2.proto import caffe2_pb2
+from caffe2.python import utils, test_util
+
+import numpy as np
+import unittest
+
+
+class TestUtils(test_util.TestCase):
+    def testTensorProtoRoundTrip(self):
+        for dtype in [np.float32, np.float64, np.int32, np.int16, np.uint16,
+                      np.int8, np.uint8, np.bool_, np.int64, np.float16]:
+            for shape in [(0,), (5,), (3, 4)]:
+                arr = (np.random.randn(*shape) * 100).astype(dtype)
+                tensor = utils.NumpyArrayToCaffe2Tensor(arr, 'x')
+                self.assertEqual(tensor.name, 'x')
+                proto = caffe2_pb2.TensorProto()
+                proto.ParseFromString(tensor.SerializeToString())
+                for copy in [True, False]:
+                    result = utils.Caffe2TensorToNumpyArray(proto, copy=copy)
+                    self.assertEqual(result.shape, arr.shape)
+                    np.testing.assert_array_equal(result.astype(dtype), arr)
+
+    def testTensorProtoLayout(self):
+        arr = np.array([[1.5, -2], [3, 4]], dtype=np.float32)
+        tensor = utils.NumpyArrayToCaffe2Tensor(arr)
+        self.assertEqual(tensor.data_type, caffe2_pb2.TensorProto.FLOAT)
+        self.assertEqual(list(tensor.dims), [2, 2])
+        self.assertEqual(list(tensor.float_data), [1.5, -2, 3, 4])
+
+        arr = np.array([-1, 2 ** 31 - 1, -2 ** 31], dtype=np.int32)
+        tensor = utils.NumpyArrayToCaffe2Tensor(arr)
+        self.assertEqual(list(tensor.int32_data), arr.tolist())
+
+        arr = np.array([2 ** 40, -3], dtype=np.int64)
+        tensor = utils.NumpyArrayToCaffe2Tensor(arr)
+        self.assertEqual(tensor.data_type, caffe2_pb2.TensorProto.INT64)
+        self.assertEqual(list(tensor.int64_data), arr.tolist())
+
+        arr = np.array([b'a', b'bc'], dtype=object)
+        tensor = utils.NumpyArrayToCaffe2Tensor(arr)
+        self.assertEqual(list(tensor.string_data), [b'a', b'bc'])
+        self.assertEqual(
+            list(utils.Caffe2TensorToNumpyArray(tensor)), [b'a', b'bc'])
+
+    def testTensorProtoFromRepeatedFields(self):
+        tensor = caffe2_pb2.TensorProto()
+        tensor.data_type = caffe2_pb2.TensorProto.INT16
+        tensor.dims.extend([3])
+        tensor.int32_data.extend([-3, 0, 7])
+        np.testing.assert_array_equal(
+            utils.Caffe2TensorToNumpyArray(tensor),
+            np.array([-3, 0, 7], dtype=np.int16))
+
+        # float16 values stored as bits in int32_data
+        arr = np.array([0.5, -1.25], dtype=np.float16)
+        tensor = caffe2_pb2.TensorProto()
+        tensor.data_type = caffe2_pb2.TensorProto.FLOAT16
+        tensor.dims.extend([2])
+        tensor.int32_data.extend(arr.view(np.uint16).tolist())
+        np.testing.assert_array_equal(
+            utils.Caffe2TensorToNumpyArray(tensor), arr)
+
+
+if __name__ == '__main__':
+    unittest.main()
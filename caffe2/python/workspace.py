@@ -23,7 +23,7 @@ import contextlib
 from google.protobuf.message import Message
 from multiprocessing import Process
 import os
-from collections import defaultdict
+from collections import OrderedDict
 import logging
 import numpy as np
 from past.builtins import basestring
@@ -41,6 +41,7 @@ logger = logging.getLogger(__name__)
 Blobs = C.blobs
 CreateBlob = C.create_blob
 CurrentWorkspace = C.current_workspace
+DeleteNet = C.delete_net
 DeserializeBlob = C.deserialize_blob
 GlobalInit = C.global_init
 HasBlob = C.has_blob
@@ -52,7 +53,80 @@ Workspaces = C.workspaces
 BenchmarkNet = C.benchmark_net
 GetStats = C.get_stats
 
-operator_tracebacks = defaultdict(dict)
+
+class _NetTracebacks(object):
+    """Read-only view of the operator tracebacks of a single net."""
+
+    def __init__(self, frames, tracebacks):
+        self._frames = frames
+        self._tracebacks = tracebacks
+
+    def __contains__(self, op_id):
+        return op_id in self._tracebacks
+
+    def __getitem__(self, op_id):
+        return [self._frames[i] for i in self._tracebacks[op_id]]
+
+    def __len__(self):
+        return len(self._tracebacks)
+
+
+class OperatorTracebacks(object):
+    """Python stack traces at which operators were added to nets, keyed by
+    net name and operator index.
+
+    Each distinct (file_name, line_number, function) frame is stored once and
+    a traceback is kept as a tuple of frame ids. At most max_tracebacks
+    tracebacks are kept; when the limit is reached, the nets that were
+    registered first are dropped.
+    """
+
+    def __init__(self, max_tracebacks=100000):
+        self.max_tracebacks = max_tracebacks
+        self.clear()
+
+    def clear(self):
+        self._frames = []
+        self._frame_ids = {}
+        self._nets = OrderedDict()
+        self._size = 0
+
+    def _intern(self, frame):
+        frame_id = self._frame_ids.get(frame)
+        if frame_id is None:
+            frame_id = len(self._frames)
+            self._frames.append(frame)
+            self._frame_ids[frame] = frame_id
+        return frame_id
+
+    def add(self, net_name, op_id, frames):
+        net_tracebacks = self._nets.get(net_name)
+        if net_tracebacks is None:
+            net_tracebacks = self._nets[net_name] = {}
+        if op_id not in net_tracebacks:
+            while self._size >= self.max_tracebacks:
+                oldest_name = next(
+                    (n for n in self._nets if n != net_name), None)
+                if oldest_name is None:
+                    return
+                self._size -= len(self._nets.pop(oldest_name))
+            self._size += 1
+        net_tracebacks[op_id] = tuple(self._intern(f) for f in frames)
+
+    def get(self, net_name, default=None):
+        net_tracebacks = self._nets.get(net_name)
+        if net_tracebacks is None:
+            return default
+        return _NetTracebacks(self._frames, net_tracebacks)
+
+    def __contains__(self, net_name):
+        return net_name in self._nets
+
+    def __len__(self):
+        return self._size
+
+
+operator_tracebacks = OperatorTracebacks()
 
 is_asan = C.is_asan
 has_gpu_support = C.has_gpu_support
@@ -294,26 +368,13 @@ def GetNetName(net):
     raise Exception("Not a Net object: {}".format(str(net)))
 
 
-def FeedBlob(name, arr, device_option=None):
-    """Feeds a blob into the workspace.
-
-    Inputs:
-      name: the name of the blob.
-      arr: either a TensorProto object or a numpy array object to be fed into
-          the workspace.
-      device_option (optional): the device option to feed the data with.
-    Returns:
-      True or False, stating whether the feed is successful.
-    """
+def _PrepareFeedArray(name, arr, device_option):
     if type(arr) is caffe2_pb2.TensorProto:
         arr = utils.Caffe2TensorToNumpyArray(arr)
     if type(arr) is np.ndarray and arr.dtype.kind in 'SU':
         # Plain NumPy strings are weird, let's use objects instead
         arr = arr.astype(np.object)
 
-    if device_option is None:
-        device_option = scope.CurrentDeviceScope()
-
     if device_option and device_option.device_type == caffe2_pb2.CUDA:
         if arr.dtype == np.dtype('float64'):
             logger.warning(
@@ -322,7 +383,24 @@ def FeedBlob(name, arr, device_option=None):
                 " Blob: {}".format(name) +
                 " type: {}".format(str(arr.dtype))
             )
+    return arr
 
+
+def FeedBlob(name, arr, device_option=None):
+    """Feeds a blob into the workspace.
+
+    Inputs:
+      name: the name of the blob.
+      arr: either a TensorProto object or a numpy array object to be fed into
+          the workspace.
+      device_option (optional): the device option to feed the data with.
+    Returns:
+      True or False, stating whether the feed is successful.
+    """
+    if device_option is None:
+        device_option = scope.CurrentDeviceScope()
+
+    arr = _PrepareFeedArray(name, arr, device_option)
     name = StringifyBlobName(name)
     if device_option is not None:
         return C.feed_blob(name, arr, StringifyProto(device_option))
@@ -330,15 +408,49 @@ def FeedBlob(name, arr, device_option=None):
         return C.feed_blob(name, arr)
 
 
-def FetchBlobs(names):
-    """Fetches a list of blobs from the workspace.
+def FeedBlobs(names, arrs, device_option=None):
+    """Feeds a list of blobs into the workspace with a single call.
+
+    Inputs:
+      names: list of names of blobs - strings or BlobReferences
+      arrs: list of TensorProto objects or numpy arrays, one per blob.
+      device_option (optional): the device option to feed all the blobs with.
+    Returns:
+      True or False, stating whether the feed is successful.
+    """
+    assert len(names) == len(arrs), \
+        "Expected one value per blob, got {} names and {} values".format(
+            len(names), len(arrs))
+    if device_option is None:
+        device_option = scope.CurrentDeviceScope()
+
+    arrs = [
+        _PrepareFeedArray(name, arr, device_option)
+        for name, arr in zip(names, arrs)
+    ]
+    names = [StringifyBlobName(name) for name in names]
+    if device_option is not None:
+        return C.feed_blobs(names, arrs, StringifyProto(device_option))
+    else:
+        return C.feed_blobs(names, arrs)
+
+
+def FetchBlobs(names, outputs=None):
+    """Fetches a list of blobs from the workspace with a single call.
 
     Inputs:
         names: list of names of blobs - strings or BlobReferences
+        outputs (optional): list of preallocated numpy arrays, one per blob,
+            to fetch the blobs into. Each array must match the shape of its
+            blob.
     Returns:
         list of fetched blobs
     """
-    return [FetchBlob(name) for name in names]
+    names = [StringifyBlobName(name) for name in names]
+    if outputs is None:
+        return C.fetch_blobs(names)
+    C.fetch_blobs_into(names, outputs)
+    return outputs
 
 
 def FetchBlob(name):
@@ -576,11 +688,16 @@ def _Workspace_create_net_with_exception_intercept(ws, net, overwrite=False):
 C.Workspace.create_net = _Workspace_create_net_with_exception_intercept
 
 
-def _Workspace_run(ws, obj):
+def _Workspace_run(ws, obj, reuse_nets=False):
+    """
+    Runs a PlanDef, NetDef or OperatorDef in the workspace. If reuse_nets is
+    set, the nets of a plan which already exist in the workspace are run as
+    they are instead of being re-created.
+    """
     if hasattr(obj, 'Proto'):
         obj = obj.Proto()
     if isinstance(obj, caffe2_pb2.PlanDef):
-        return ws._run_plan(obj.SerializeToString())
+        return ws._run_plan(obj.SerializeToString(), reuse_nets)
     if isinstance(obj, caffe2_pb2.NetDef):
         return CallWithExceptionIntercept(
             ws._run_net,
@@ -249,6 +249,31 @@ class TestWorkspace(unittest.TestCase):
         self.assertEquals(s1, fetch1)
         self.assertEquals(s2, fetch2)
 
+    def testFeedFetchBlobs(self):
+        data = np.random.randn(2, 3).astype(np.float32)
+        ids = np.arange(5).astype(np.int64)
+        self.assertTrue(workspace.FeedBlobs(
+            ['bulk_data', core.BlobReference('bulk_ids'), 'bulk_str'],
+            [data, ids, b'abc'],
+        ))
+        fetched_data, fetched_ids, fetched_str = workspace.FetchBlobs(
+            ['bulk_data', 'bulk_ids', core.BlobReference('bulk_str')])
+        np.testing.assert_array_equal(fetched_data, data)
+        np.testing.assert_array_equal(fetched_ids, ids)
+        self.assertEqual(fetched_str, b'abc')
+
+    def testFetchBlobsIntoOutputs(self):
+        data = np.random.randn(2, 3).astype(np.float32)
+        ids = np.arange(5).astype(np.int64)
+        workspace.FeedBlobs(['bulk_data', 'bulk_ids'], [data, ids])
+        outputs = [np.empty((2, 3), np.float32), np.empty(5, np.float64)]
+        result = workspace.FetchBlobs(['bulk_data', 'bulk_ids'], outputs)
+        self.assertIs(result, outputs)
+        np.testing.assert_array_equal(outputs[0], data)
+        np.testing.assert_array_equal(outputs[1], ids)
+        with self.assertRaises(RuntimeError):
+            workspace.FetchBlobs(['bulk_data'], [np.empty((3, 2), np.float32)])
+
     def testFetchFeedViaBlobDict(self):
         self.assertEqual(
             workspace.RunNetOnce(self.net.Proto().SerializeToString()), True)
@@ -113,6 +113,7 @@ bool BlobsQueue::blockingRead(
   CAFFE_SDT(queue_read_end, name, (void*)this, writer_ - reader_);
   CAFFE_EVENT(stats_, queue_dequeued_records);
   ++reader_;
+  CAFFE_EVENT(stats_, queue_size, writer_ - reader_);
   cv_.notify_all();
   CAFFE_EVENT(stats_, read_time_ns, readTimer.NanoSeconds());
   return true;
@@ -183,6 +184,7 @@ void BlobsQueue::doWrite(const std::vector<Blob*>& inputs) {
   CAFFE_SDT(
       queue_write_end, name, (void*)this, reader_ + queue_.size() - writer_);
   ++writer_;
+  CAFFE_EVENT(stats_, queue_size, writer_ - reader_);
   cv_.notify_all();
 }
 
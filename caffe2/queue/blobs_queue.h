@@ -81,6 +81,8 @@ class BlobsQueue : public std::enable_shared_from_this<BlobsQueue> {
     CAFFE_DETAILED_EXPORTED_STAT(queue_dequeued_bytes);
     CAFFE_AVG_EXPORTED_STAT(read_time_ns);
     CAFFE_AVG_EXPORTED_STAT(write_time_ns);
+    // number of records in the queue, sampled at every read and write
+    CAFFE_AVG_EXPORTED_STAT(queue_size);
   } stats_;
 };
 } // namespace caffe2
@@ -218,6 +218,19 @@ if(USE_NUMA)
   endif()
 endif()
 
+# ---[ zlib
+if(USE_ZLIB)
+  find_package(ZLIB)
+  if(ZLIB_FOUND)
+    include_directories(${ZLIB_INCLUDE_DIRS})
+    list(APPEND Caffe2_DEPENDENCY_LIBS ${ZLIB_LIBRARIES})
+    set(CAFFE2_USE_ZLIB 1)
+  else()
+    message(WARNING "Not compiling with zlib. Suppress this warning with -DUSE_ZLIB=OFF")
+    set(USE_ZLIB OFF)
+  endif()
+endif()
+
 # ---[ ZMQ
 if(USE_ZMQ)
   find_package(ZMQ)
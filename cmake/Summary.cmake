@@ -81,5 +81,6 @@ function (caffe2_print_configuration_summary)
   message(STATUS "  USE_PROF              : ${USE_PROF}")
   message(STATUS "  USE_REDIS             : ${USE_REDIS}")
   message(STATUS "  USE_ROCKSDB           : ${USE_ROCKSDB}")
+  message(STATUS "  USE_ZLIB              : ${USE_ZLIB}")
   message(STATUS "  USE_ZMQ               : ${USE_ZMQ}")
 endfunction()